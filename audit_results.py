@@ -0,0 +1,291 @@
+# audit_results.py
+"""
+结果合规审计
+检查 tu_bjl_result 中每一局是否符合补牌规则（与 BaccaratGame 相同的规则），
+发现补牌方错误、漏补、天牌后补牌、缺牌、无法识别的牌等问题时报告记录 id
+
+按 id 范围拆分给多个进程，每个进程用服务端游标分批读取、按批检查；
+安装了 numpy 时整批向量化检查，否则逐行检查
+
+用法:
+    python audit_results.py --workers 8 --out violations.csv
+    python audit_results.py --table 1 --since-id 1000000
+"""
+
+import sys
+import csv
+import time
+import argparse
+import logging
+from array import array
+from collections import Counter
+from multiprocessing import Pool
+
+from baccarat_game import player_draws, banker_draws, check_draw_rules
+from card_codec import decode_result, CARD_POINTS, CARD_CODES, EMPTY
+from database_manager import DatabaseManager
+from export_results import stream_rows
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+# 违规类型（0 表示合规）
+OK = 0
+INVALID_CARD = 1
+INCOMPLETE = 2
+NATURAL_DRAW = 3
+PLAYER_MISSING_DRAW = 4
+PLAYER_EXTRA_DRAW = 5
+BANKER_MISSING_DRAW = 6
+BANKER_EXTRA_DRAW = 7
+UNPARSABLE = 8
+
+VIOLATION_TEXT = {
+    INVALID_CARD: '无法识别的牌',
+    INCOMPLETE: '前四张牌不完整',
+    NATURAL_DRAW: '天牌后不应补牌',
+    PLAYER_MISSING_DRAW: '闲家应补牌未补',
+    PLAYER_EXTRA_DRAW: '闲家不应补牌',
+    BANKER_MISSING_DRAW: '庄家应补牌未补',
+    BANKER_EXTRA_DRAW: '庄家不应补牌',
+    UNPARSABLE: '结果无法解析',
+}
+VIOLATION_BY_TEXT = {text: code for code, text in VIOLATION_TEXT.items()}
+
+# 由 BaccaratGame 的补牌规则生成的查找表
+# 闲家: [前两张点数] -> 是否补牌
+PLAYER_DRAW_TABLE = tuple(player_draws(points) for points in range(10))
+# 庄家: [前两张点数][闲家第三张点数，10 表示闲家未补牌] -> 是否补牌
+BANKER_DRAW_TABLE = tuple(
+    tuple(banker_draws(points, third) for third in range(10)) + (banker_draws(points, None),)
+    for points in range(10)
+)
+
+_db = None
+
+
+def check_row(cards):
+    """
+    逐行检查（不依赖 numpy）
+    
+    Args:
+        cards: decode_result 的结果 (闲1-3, 庄1-3)
+    
+    Returns:
+        int: 违规类型，合规为 OK
+    """
+    if any(index < EMPTY for index in cards):
+        return INVALID_CARD
+    if cards[0] < 0 or cards[1] < 0 or cards[3] < 0 or cards[4] < 0:
+        return INCOMPLETE
+    player = [CARD_POINTS[index] for index in cards[:3] if index >= 0]
+    banker = [CARD_POINTS[index] for index in cards[3:] if index >= 0]
+    reason = check_draw_rules(player, banker)
+    return VIOLATION_BY_TEXT[reason] if reason else OK
+
+
+def check_batch(cards):
+    """
+    整批向量化检查（需要 numpy）
+    
+    Args:
+        cards: int8 数组，形状 (n, 6)
+    
+    Returns:
+        numpy.ndarray: 每行的违规类型
+    """
+    points = numpy.array(CARD_POINTS + (0, 0), dtype=numpy.int8)   # -1/-2 索引到末尾的 0
+    player_table = numpy.array(PLAYER_DRAW_TABLE, dtype=bool)
+    banker_table = numpy.array(BANKER_DRAW_TABLE, dtype=bool)
+    
+    present = cards >= 0
+    values = points[cards]
+    player_two = (values[:, 0] + values[:, 1]) % 10
+    banker_two = (values[:, 3] + values[:, 4]) % 10
+    player_third = present[:, 2]
+    banker_third = present[:, 5]
+    natural = (player_two >= 8) | (banker_two >= 8)
+    
+    player_should = player_table[player_two] & ~natural
+    third_value = numpy.where(player_third, values[:, 2], 10)
+    banker_should = banker_table[banker_two, third_value] & ~natural
+    
+    # 按优先级从低到高赋值，后赋值的覆盖先赋值的，与逐行检查的判定顺序一致
+    result = numpy.zeros(len(cards), dtype=numpy.int8)
+    result[banker_third & ~banker_should] = BANKER_EXTRA_DRAW
+    result[~banker_third & banker_should] = BANKER_MISSING_DRAW
+    result[player_third & ~player_should] = PLAYER_EXTRA_DRAW
+    result[~player_third & player_should] = PLAYER_MISSING_DRAW
+    result[natural & (player_third | banker_third)] = NATURAL_DRAW
+    result[~(present[:, 0] & present[:, 1] & present[:, 3] & present[:, 4])] = INCOMPLETE
+    result[(cards < EMPTY).any(axis=1)] = INVALID_CARD
+    return result
+
+
+def _worker_init():
+    """工作进程初始化：各自建立数据库连接（失败时该进程领到的范围都报告为未审计）"""
+    global _db
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    _db = DatabaseManager()
+    if not _db.connect():
+        logger.error("工作进程数据库连接失败")
+        _db = None
+
+
+def audit_range(task):
+    """
+    审计一个 id 范围（在工作进程中运行）
+    
+    Args:
+        task: (起始 id（不含）, 结束 id（含）, 桌号, 每批行数, 是否向量化)
+    
+    Returns:
+        tuple: (检查行数, [(id, 桌号, 违规类型, 牌), ...], 未审计完的范围 (起始, 结束)，审计完整时为None)
+    """
+    start_id, end_id, table_id, batch_size, vectorized = task
+    if _db is None:
+        return 0, [], (start_id, end_id)
+    checked = 0
+    violations = []
+    ids, tables, batch = [], [], array('b')
+    
+    def flush():
+        if not ids:
+            return
+        if vectorized:
+            codes = check_batch(numpy.frombuffer(batch, dtype=numpy.int8).reshape(-1, 6))
+        else:
+            codes = [check_row(batch[i * 6:i * 6 + 6]) for i in range(len(ids))]
+        for i, code in enumerate(codes):
+            if code:
+                violations.append((ids[i], tables[i], int(code), tuple(batch[i * 6:i * 6 + 6])))
+        ids.clear()
+        tables.clear()
+        del batch[:]
+    
+    try:
+        for result_id, row_table, result in stream_rows(_db, table_id, start_id, end_id, batch_size):
+            checked += 1
+            try:
+                cards = decode_result(result)
+            except (ValueError, TypeError, AttributeError):
+                violations.append((result_id, row_table, UNPARSABLE, ()))
+                continue
+            ids.append(result_id)
+            tables.append(row_table)
+            batch.extend(cards)
+            if len(ids) >= batch_size:
+                flush()
+        flush()
+    except Exception as e:
+        # 已检查部分的违规照常报告，整个范围记为未审计
+        logger.error(f"审计 id {start_id + 1} - {end_id} 时出错: {e}")
+        flush()
+        return checked, violations, (start_id, end_id)
+    return checked, violations, None
+
+
+def get_id_bounds(db, table_id=None, since_id=0):
+    """
+    查询待审计的 id 范围
+    
+    Returns:
+        tuple: (最小 id, 最大 id)，没有数据时返回None
+    """
+    query = "SELECT MIN(id), MAX(id) FROM tu_bjl_result WHERE id > %s"
+    params = [since_id]
+    if table_id is not None:
+        query += " AND tableId = %s"
+        params.append(str(table_id))
+    db.cursor.execute(query, params)
+    low, high = db.cursor.fetchone()
+    if low is None:
+        return None
+    return low, high
+
+
+def split_ranges(low, high, range_size):
+    """
+    把 [low, high] 拆分为 (起始（不含）, 结束（含）) 的范围列表
+    """
+    return [(start - 1, min(start + range_size - 1, high)) for start in range(low, high + 1, range_size)]
+
+
+def _format_cards(cards):
+    return ' '.join(CARD_CODES[index] if index >= 0 else ('-' if index == EMPTY else '?') for index in cards)
+
+
+def main():
+    """命令行审计"""
+    parser = argparse.ArgumentParser(description='结果合规审计 (tu_bjl_result)')
+    parser.add_argument('--table', help='只审计指定桌号')
+    parser.add_argument('--since-id', type=int, default=0, help='只审计 id 大于该值的记录')
+    parser.add_argument('--workers', type=int, default=4, help='工作进程数')
+    parser.add_argument('--range-size', type=int, default=500000, help='每个任务的 id 范围大小')
+    parser.add_argument('--batch', type=int, default=10000, help='每批检查的行数')
+    parser.add_argument('--out', help='违规明细输出 CSV 文件（默认输出到终端）')
+    parser.add_argument('--no-numpy', action='store_true', help='不使用 numpy，逐行检查')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    db = DatabaseManager()
+    if not db.connect():
+        print("❌ 数据库连接失败!")
+        return 1
+    try:
+        bounds = get_id_bounds(db, args.table, args.since_id)
+    finally:
+        db.disconnect()
+    if not bounds:
+        print("没有需要审计的记录")
+        return 0
+    
+    vectorized = numpy is not None and not args.no_numpy
+    ranges = split_ranges(bounds[0], bounds[1], args.range_size)
+    tasks = [(start, end, args.table, args.batch, vectorized) for start, end in ranges]
+    print(f"审计 id {bounds[0]} - {bounds[1]}，{len(tasks)} 个范围，{args.workers} 个进程，"
+          f"{'向量化' if vectorized else '逐行'}检查", file=sys.stderr)
+    
+    out = open(args.out, 'w', encoding='utf-8', newline='') if args.out else sys.stdout
+    writer = csv.writer(out)
+    writer.writerow(('id', 'table_id', 'violation', 'cards'))
+    
+    checked = 0
+    counts = Counter()
+    failed = []
+    started = time.monotonic()
+    try:
+        with Pool(args.workers, initializer=_worker_init) as pool:
+            for done, (rows, violations, unaudited) in enumerate(pool.imap_unordered(audit_range, tasks), 1):
+                checked += rows
+                if unaudited:
+                    failed.append(unaudited)
+                for result_id, table_id, code, cards in sorted(violations):
+                    counts[code] += 1
+                    writer.writerow((result_id, table_id, VIOLATION_TEXT[code], _format_cards(cards)))
+                elapsed = time.monotonic() - started
+                print(f"进度 {done}/{len(tasks)}，已检查 {checked} 行 ({checked / elapsed:.0f} 行/秒)", file=sys.stderr)
+    finally:
+        if args.out:
+            out.close()
+    
+    elapsed = time.monotonic() - started
+    print(f"✅ 审计完成: 检查 {checked} 行，违规 {sum(counts.values())} 行，耗时 {elapsed:.1f}秒", file=sys.stderr)
+    for code, count in counts.most_common():
+        print(f"   {VIOLATION_TEXT[code]}: {count}", file=sys.stderr)
+    if failed:
+        # 有范围未审计完时不能视为合规
+        print(f"❌ {len(failed)} 个范围未审计完（数据库连接失败或读取出错）:", file=sys.stderr)
+        for start, end in sorted(failed):
+            print(f"   id {start + 1} - {end}", file=sys.stderr)
+        return 1
+    return 0 if not counts else 2
+
+
+if __name__ == '__main__':
+    sys.exit(main())
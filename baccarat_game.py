@@ -9,6 +9,86 @@ from card_parser import CardParser
 
 logger = logging.getLogger(__name__)
 
+# 位置 -> (闲/庄, 第几张)
+POSITIONS = {
+    'xian_1': ('player', 0),
+    'xian_2': ('player', 1),
+    'xian_3': ('player', 2),
+    'zhuang_1': ('banker', 0),
+    'zhuang_2': ('banker', 1),
+    'zhuang_3': ('banker', 2),
+}
+
+# 发牌顺序：闲1 → 庄1 → 闲2 → 庄2 → 闲家补牌 → 庄家补牌
+DEAL_ORDER = ('xian_1', 'zhuang_1', 'xian_2', 'zhuang_2', 'xian_3', 'zhuang_3')
+
+# 庄家3-6点时，闲家第三张牌为这些点数则庄家不补牌
+BANKER_STANDS_ON = {
+    3: frozenset([8]),
+    4: frozenset([0, 1, 8, 9]),
+    5: frozenset([0, 1, 2, 3, 8, 9]),
+    6: frozenset([0, 1, 2, 3, 4, 5, 8, 9]),
+}
+
+
+def player_draws(player_points):
+    """闲家前两张牌为该点数时是否补牌（天牌另行判断）"""
+    return player_points <= 5
+
+
+def banker_draws(banker_points, player_third_value=None):
+    """
+    庄家前两张牌为该点数时是否补牌（天牌另行判断）
+    
+    Args:
+        banker_points: 庄家前两张牌点数
+        player_third_value: 闲家第三张牌点数，闲家未补牌时为None
+    
+    Returns:
+        bool: 是否补牌
+    """
+    if player_third_value is None:
+        # 闲家停牌时，庄家0-5点补牌，6-7点停牌
+        return banker_points <= 5
+    if banker_points <= 2:
+        return True
+    if banker_points >= 7:
+        return False
+    return player_third_value not in BANKER_STANDS_ON[banker_points]
+
+
+def check_draw_rules(player_values, banker_values):
+    """
+    检查一局的牌是否符合补牌规则
+    
+    Args:
+        player_values: 闲家各张牌的点数（按发牌顺序）
+        banker_values: 庄家各张牌的点数（按发牌顺序）
+    
+    Returns:
+        str: 违规原因，符合规则时返回None
+    """
+    if len(player_values) < 2 or len(banker_values) < 2:
+        return '前四张牌不完整'
+    if len(player_values) > 3 or len(banker_values) > 3:
+        return '牌数超过3张'
+    
+    player_points = (player_values[0] + player_values[1]) % 10
+    banker_points = (banker_values[0] + banker_values[1]) % 10
+    player_third = player_values[2] if len(player_values) == 3 else None
+    banker_third = banker_values[2] if len(banker_values) == 3 else None
+    
+    if player_points >= 8 or banker_points >= 8:
+        if player_third is not None or banker_third is not None:
+            return '天牌后不应补牌'
+        return None
+    
+    if player_draws(player_points) != (player_third is not None):
+        return '闲家应补牌未补' if player_third is None else '闲家不应补牌'
+    if banker_draws(banker_points, player_third) != (banker_third is not None):
+        return '庄家应补牌未补' if banker_third is None else '庄家不应补牌'
+    return None
+
 
 class BaccaratGame:
     """百家乐游戏类"""
@@ -27,13 +107,52 @@ class BaccaratGame:
     def add_player_card(self, card_code):
         """添加闲家卡片"""
         self.player_cards.append(card_code)
-        logger.info(f"闲家获得: {self.parser.get_card_display(card_code)}")
+        logger.info("闲家获得: %s", self.parser.get_card_display(card_code))
         
     def add_banker_card(self, card_code):
         """添加庄家卡片"""
         self.banker_cards.append(card_code)
-        logger.info(f"庄家获得: {self.parser.get_card_display(card_code)}")
+        logger.info("庄家获得: %s", self.parser.get_card_display(card_code))
         
+    def get_card_at(self, position):
+        """
+        获取指定位置的牌
+        
+        Args:
+            position: 位置 (xian_1 ... zhuang_3)
+            
+        Returns:
+            str: 卡片代码，该位置尚未发牌时返回None
+        """
+        side, index = POSITIONS[position]
+        cards = self.player_cards if side == 'player' else self.banker_cards
+        return cards[index] if index < len(cards) else None
+    
+    def restore_cards(self, cards):
+        """
+        按位置恢复牌面（用于断点恢复）
+        
+        Args:
+            cards: {位置: 卡片代码}
+            
+        Returns:
+            dict: 实际恢复的 {位置: 卡片代码}，前四张不连续时只恢复到缺口之前
+        """
+        self.reset_game()
+        restored = {}
+        for position in DEAL_ORDER:
+            card = cards.get(position)
+            if not card:
+                if position in DEAL_ORDER[:4]:
+                    break
+                continue
+            if POSITIONS[position][0] == 'player':
+                self.add_player_card(card)
+            else:
+                self.add_banker_card(card)
+            restored[position] = card
+        return restored
+    
     def get_player_points(self):
         """获取闲家点数"""
         return self.parser.calculate_points(self.player_cards)
@@ -53,7 +172,7 @@ class BaccaratGame:
         banker_points = self.get_banker_points()
         
         if player_points >= 8 or banker_points >= 8:
-            logger.info(f"天牌! 闲家:{player_points}点, 庄家:{banker_points}点")
+            logger.info("天牌! 闲家:%s点, 庄家:%s点", player_points, banker_points)
             return True
         return False
     
@@ -70,12 +189,12 @@ class BaccaratGame:
             bool: True需要补牌，False不需要
         """
         points = self.get_player_points()
-        need_card = points <= 5
+        need_card = player_draws(points)
         
         if need_card:
-            logger.info(f"闲家{points}点，需要补牌")
+            logger.info("闲家%s点，需要补牌", points)
         else:
-            logger.info(f"闲家{points}点，停牌")
+            logger.info("闲家%s点，停牌", points)
             
         return need_card
     
@@ -100,31 +219,16 @@ class BaccaratGame:
         """
         banker_points = self.get_banker_points()
         
-        # 如果闲家没有补牌
-        if player_third_card is None:
-            # 闲家停牌时，庄家0-5点补牌，6-7点停牌
-            need_card = banker_points <= 5
-        else:
-            # 获取闲家第三张牌的点数
+        # 获取闲家第三张牌的点数（闲家没有补牌时为None）
+        player_third_value = None
+        if player_third_card is not None:
             player_third_value = self.parser.get_card_value(player_third_card)
-            
-            if banker_points <= 2:
-                need_card = True
-            elif banker_points == 3:
-                need_card = player_third_value != 8
-            elif banker_points == 4:
-                need_card = player_third_value not in [0, 1, 8, 9]
-            elif banker_points == 5:
-                need_card = player_third_value not in [0, 1, 2, 3, 8, 9]
-            elif banker_points == 6:
-                need_card = player_third_value in [6, 7]
-            else:  # 7点
-                need_card = False
+        need_card = banker_draws(banker_points, player_third_value)
         
         if need_card:
-            logger.info(f"庄家{banker_points}点，需要补牌")
+            logger.info("庄家%s点，需要补牌", banker_points)
         else:
-            logger.info(f"庄家{banker_points}点，停牌")
+            logger.info("庄家%s点，停牌", banker_points)
             
         return need_card
     
@@ -167,67 +271,83 @@ class BaccaratGame:
         
         return result
     
-    def display_current_state(self):
-        """显示当前游戏状态"""
-        print("\n" + "="*50)
-        print("当前游戏状态:")
-        print("-"*50)
+    def format_current_state(self):
+        """
+        格式化当前游戏状态
+        
+        Returns:
+            str: 多行显示文本
+        """
+        lines = ["\n" + "="*50, "当前游戏状态:", "-"*50]
         
-        # 显示闲家信息
+        # 闲家信息
         player_display = self.parser.format_hand(self.player_cards)
-        print(f"闲家: {player_display}")
+        lines.append(f"闲家: {player_display}")
         
-        # 显示庄家信息
+        # 庄家信息
         banker_display = self.parser.format_hand(self.banker_cards)
-        print(f"庄家: {banker_display}")
+        lines.append(f"庄家: {banker_display}")
         
         # 如果游戏结束，显示结果
         if len(self.player_cards) >= 2 and len(self.banker_cards) >= 2:
             winner = self.determine_winner()
             if winner == 'PLAYER':
-                print("\n🎉 闲家赢!")
+                lines.append("\n🎉 闲家赢!")
             elif winner == 'BANKER':
-                print("\n🎉 庄家赢!")
+                lines.append("\n🎉 庄家赢!")
             else:
-                print("\n🤝 和局!")
+                lines.append("\n🤝 和局!")
         
-        print("="*50)
+        lines.append("="*50)
+        return "\n".join(lines)
     
-    def display_final_result(self):
-        """显示最终结果"""
-        print("\n" + "╔"*50)
-        print("║  最终结果")
-        print("╠"*50)
+    def format_final_result(self):
+        """
+        格式化最终结果
+        
+        Returns:
+            str: 多行显示文本
+        """
+        lines = ["\n" + "╔"*50, "║  最终结果", "╠"*50]
         
-        # 显示闲家详细信息
-        print("║ 闲家牌:")
+        # 闲家详细信息
+        lines.append("║ 闲家牌:")
         for i, card in enumerate(self.player_cards, 1):
             if card:
                 card_display = self.parser.get_card_display(card)
-                print(f"║   第{i}张: {card_display} ({card})")
+                lines.append(f"║   第{i}张: {card_display} ({card})")
         player_display = self.parser.format_hand(self.player_cards)
-        print(f"║ 闲家结果: {player_display}")
+        lines.append(f"║ 闲家结果: {player_display}")
         
-        print("║")
+        lines.append("║")
         
-        # 显示庄家详细信息
-        print("║ 庄家牌:")
+        # 庄家详细信息
+        lines.append("║ 庄家牌:")
         for i, card in enumerate(self.banker_cards, 1):
             if card:
                 card_display = self.parser.get_card_display(card)
-                print(f"║   第{i}张: {card_display} ({card})")
+                lines.append(f"║   第{i}张: {card_display} ({card})")
         banker_display = self.parser.format_hand(self.banker_cards)
-        print(f"║ 庄家结果: {banker_display}")
+        lines.append(f"║ 庄家结果: {banker_display}")
         
-        print("║")
+        lines.append("║")
         
-        # 显示胜负结果
+        # 胜负结果
         winner = self.determine_winner()
         if winner == 'PLAYER':
-            print("║ 🎉🎉🎉 闲家胜利! 🎉🎉🎉")
+            lines.append("║ 🎉🎉🎉 闲家胜利! 🎉🎉🎉")
         elif winner == 'BANKER':
-            print("║ 🎉🎉🎉 庄家胜利! 🎉🎉🎉")
+            lines.append("║ 🎉🎉🎉 庄家胜利! 🎉🎉🎉")
         else:
-            print("║ 🤝🤝🤝 和局! 🤝🤝🤝")
+            lines.append("║ 🤝🤝🤝 和局! 🤝🤝🤝")
         
-        print("╚"*50)
\ No newline at end of file
+        lines.append("╚"*50)
+        return "\n".join(lines)
+    
+    def display_current_state(self):
+        """显示当前游戏状态"""
+        print(self.format_current_state())
+    
+    def display_final_result(self):
+        """显示最终结果"""
+        print(self.format_final_result())
\ No newline at end of file
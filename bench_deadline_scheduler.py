@@ -0,0 +1,88 @@
+# bench_deadline_scheduler.py
+"""
+截止时间调度压测（虚拟时钟）
+模拟多张桌台按随机间隔扫牌，每次扫牌重新登记该桌的游戏超时；部分桌台中途停止扫牌，
+其游戏超时应在最后一次扫牌后恰好 GAME_TIMEOUT 秒触发。全部在虚拟时间中运行，
+输出触发误差和每个 GAME_TIMEOUT 场景的实际耗时
+
+用法: python bench_deadline_scheduler.py [--tables 200] [--rounds 50] [--stall 0.1]
+"""
+
+import time
+import random
+import argparse
+
+from config import GAME_TIMEOUT, CARD_SCAN_TIMEOUT
+from deadline_scheduler import DeadlineScheduler, VirtualClock
+
+
+def run(tables, rounds, stall_ratio, seed=1):
+    """
+    运行模拟
+    
+    Returns:
+        dict: 扫牌数、超时数、最大触发误差(秒)、虚拟时长、实际耗时
+    """
+    rng = random.Random(seed)
+    clock = VirtualClock()
+    scheduler = DeadlineScheduler(clock)
+    expected = {}   # {桌号: 预期超时时刻}
+    errors = []
+    stats = {'scans': 0, 'timeouts': 0, 'card_timeouts': 0}
+    
+    def on_game_timeout(deadline):
+        table_id = deadline.key[0]
+        errors.append(abs(clock.now() - expected.pop(table_id)))
+        stats['timeouts'] += 1
+    
+    def on_card_timeout(deadline):
+        stats['card_timeouts'] += 1
+    
+    # 事件: (时刻, 桌号)，每张桌台每局 4-6 张牌，间隔 1-8 秒；停止扫牌的桌台直接跳过剩余牌
+    events = []
+    for table_id in range(tables):
+        now = 0.0
+        for _ in range(rounds):
+            stalled = rng.random() < stall_ratio
+            for _ in range(rng.randint(1, 3) if stalled else rng.randint(4, 6)):
+                now += rng.uniform(1, 8)
+                events.append((now, table_id))
+            if stalled:
+                now += GAME_TIMEOUT + rng.uniform(1, 30)
+            now += rng.uniform(5, 20)
+    events.sort()
+    
+    started = time.perf_counter()
+    for when, table_id in events:
+        scheduler.run_until(when)
+        scheduler.schedule(GAME_TIMEOUT, on_game_timeout, (table_id, 'game'))
+        scheduler.schedule(CARD_SCAN_TIMEOUT, on_card_timeout, (table_id, 'card'))
+        expected[table_id] = when + GAME_TIMEOUT
+        stats['scans'] += 1
+    scheduler.run_until(clock.now() + GAME_TIMEOUT + 1)
+    elapsed = time.perf_counter() - started
+    
+    stats['max_error'] = max(errors) if errors else 0.0
+    stats['virtual_seconds'] = clock.now()
+    stats['wall_seconds'] = elapsed
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='截止时间调度压测（虚拟时钟）')
+    parser.add_argument('--tables', type=int, default=200, help='桌台数')
+    parser.add_argument('--rounds', type=int, default=50, help='每张桌台的局数')
+    parser.add_argument('--stall', type=float, default=0.1, help='中途停止扫牌（触发游戏超时）的局比例')
+    args = parser.parse_args()
+    
+    stats = run(args.tables, args.rounds, args.stall)
+    per_timeout = stats['wall_seconds'] / stats['timeouts'] * 1e6 if stats['timeouts'] else 0
+    print(f"桌台 {args.tables}，扫牌 {stats['scans']} 次，游戏超时 {stats['timeouts']} 次，"
+          f"单张牌超时 {stats['card_timeouts']} 次")
+    print(f"虚拟时长 {stats['virtual_seconds'] / 3600:.1f} 小时，实际耗时 {stats['wall_seconds'] * 1000:.0f}ms"
+          f"（平均每个 {GAME_TIMEOUT} 秒超时场景 {per_timeout:.1f}µs）")
+    print(f"最大触发误差 {stats['max_error'] * 1e6:.3f}µs")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+# bench_reader_jitter.py
+"""
+串口读取方式对比测试
+模拟扫描枪按固定间隔送卡，同时在游戏进程里运行占用 GIL 的负载（模拟数据库驱动解析、
+控制台渲染、日志格式化），对比两种读取方式:
+    thread  读取线程 + Queue（与游戏逻辑共用一个 GIL）
+    process 读取子进程 + 共享内存环形缓冲
+输出两项延迟的分位数:
+    到达抖动: 读取方拿到数据的时间 - 计划送达时间（读取线程被 GIL 推迟的部分）
+    交付延迟: 游戏线程取到数据的时间 - 读取方拿到数据的时间
+
+用法: python bench_reader_jitter.py [--cards 500] [--interval 20] [--load-threads 2]
+"""
+
+import time
+import queue
+import argparse
+import threading
+import multiprocessing
+
+from latency_tracer import LatencyHistogram
+from ring_buffer import SharedRingBuffer
+
+
+def _wait_until(target_ns):
+    """睡到目标时间（最后一毫秒自旋，减小睡眠本身的误差）"""
+    while True:
+        remaining = target_ns - time.perf_counter_ns()
+        if remaining <= 0:
+            return
+        if remaining > 1_000_000:
+            time.sleep((remaining - 1_000_000) / 1e9)
+
+
+def _produce(start_ns, interval_ns, cards, emit):
+    """按计划时间送卡，卡片代码即序号"""
+    for i in range(cards):
+        _wait_until(start_ns + i * interval_ns)
+        emit(str(i), time.perf_counter_ns())
+
+
+def _producer_process(ring_name, semaphore, start_ns, interval_ns, cards):
+    """子进程读取方"""
+    ring = SharedRingBuffer(ring_name)
+    
+    def emit(code, arrival_ns):
+        if ring.push(code, arrival_ns):
+            semaphore.release()
+    
+    _produce(start_ns, interval_ns, cards, emit)
+    ring.close()
+
+
+def _gil_load(stop_event, burst):
+    """纯 Python 计算负载，持续占用 GIL"""
+    while not stop_event.is_set():
+        total = 0
+        for i in range(burst):
+            total += i * i
+
+
+def run(mode, cards, interval_ms, load_threads, burst):
+    """
+    运行一种读取方式
+    
+    Returns:
+        tuple: (到达抖动直方图, 交付延迟直方图)
+    """
+    interval_ns = int(interval_ms * 1e6)
+    start_ns = time.perf_counter_ns() + 500_000_000
+    jitter = LatencyHistogram()
+    delivery = LatencyHistogram()
+    
+    stop_event = threading.Event()
+    loads = [threading.Thread(target=_gil_load, args=(stop_event, burst), daemon=True) for _ in range(load_threads)]
+    for t in loads:
+        t.start()
+    
+    if mode == 'thread':
+        data_queue = queue.Queue()
+        producer = threading.Thread(
+            target=_produce,
+            args=(start_ns, interval_ns, cards, lambda code, arrival_ns: data_queue.put((code, arrival_ns))),
+            daemon=True
+        )
+        producer.start()
+        
+        def receive():
+            return data_queue.get(timeout=5)
+    else:
+        context = multiprocessing.get_context('spawn')
+        ring = SharedRingBuffer(capacity=max(cards, 16), create=True)
+        semaphore = context.Semaphore(0)
+        producer = context.Process(
+            target=_producer_process,
+            args=(ring.name, semaphore, start_ns, interval_ns, cards),
+            daemon=True
+        )
+        producer.start()
+        
+        def receive():
+            if not semaphore.acquire(timeout=5):
+                raise queue.Empty
+            seq, code, arrival_ns = ring.pop()
+            return code, arrival_ns
+    
+    try:
+        for _ in range(cards):
+            code, arrival_ns = receive()
+            now = time.perf_counter_ns()
+            jitter.record(max(0, arrival_ns - (start_ns + int(code) * interval_ns)) // 1000)
+            delivery.record(max(0, now - arrival_ns) // 1000)
+    finally:
+        stop_event.set()
+        producer.join(timeout=5)
+        if mode == 'process':
+            ring.close()
+    
+    return jitter, delivery
+
+
+def _format(histogram):
+    summary = histogram.summary()
+    return ' '.join(f"{key}={summary[key + '_us'] / 1000:8.2f}ms" for key in ('p50', 'p99', 'max'))
+
+
+def main():
+    parser = argparse.ArgumentParser(description='串口读取方式延迟对比')
+    parser.add_argument('--cards', type=int, default=500, help='模拟扫描次数')
+    parser.add_argument('--interval', type=float, default=20, help='送卡间隔(毫秒)')
+    parser.add_argument('--load-threads', type=int, default=2, help='占用 GIL 的负载线程数')
+    parser.add_argument('--burst', type=int, default=200000, help='负载线程每轮计算量')
+    args = parser.parse_args()
+    
+    print(f"送卡 {args.cards} 次，间隔 {args.interval}ms，负载线程 {args.load_threads} 个")
+    for mode in ('thread', 'process'):
+        jitter, delivery = run(mode, args.cards, args.interval, args.load_threads, args.burst)
+        print(f"[{mode:<7}] 到达抖动 {_format(jitter)}")
+        print(f"[{mode:<7}] 交付延迟 {_format(delivery)}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+# bulk_import.py
+"""
+历史结果批量导入
+读取 JSONL 文件（每行一局），按补牌规则校验后转换为数据库格式，
+批量写入 tu_bjl_result：每批一条多行 INSERT、一次提交，不逐局提交也不清理临时表
+
+每行格式（两种均可）:
+    {"PLAYER1": "D12", "PLAYER2": "H01", "PLAYER3": "", "BANKER1": "C10", "BANKER2": "D03", "BANKER3": "H09", "table_id": "1"}
+    {"table_id": "1", "result": {"PLAYER1": "D12", ...}}
+
+用法:
+    python bulk_import.py history.jsonl --table 1
+    python bulk_import.py shoes/*.jsonl --batch 2000 --rejects rejects.jsonl
+    python bulk_import.py history.jsonl --dry-run      # 只校验不写入
+"""
+
+import sys
+import json
+import time
+import argparse
+import logging
+
+from config import CARD_MAPPING
+from baccarat_game import check_draw_rules
+from database_manager import DatabaseManager, build_result_json
+
+logger = logging.getLogger(__name__)
+
+PLAYER_KEYS = ('PLAYER1', 'PLAYER2', 'PLAYER3')
+BANKER_KEYS = ('BANKER1', 'BANKER2', 'BANKER3')
+
+
+def _hand_values(result, keys):
+    """
+    取一手牌的点数
+    
+    Returns:
+        list: 点数列表（空位之后的牌不计）；有无法识别的卡片代码时抛出 ValueError
+    """
+    values = []
+    for key in keys:
+        code = (result.get(key) or '').strip().upper()
+        if not code:
+            break
+        if code not in CARD_MAPPING:
+            raise ValueError(f"无法识别的卡片代码 {key}={code}")
+        values.append(CARD_MAPPING[code]['value'])
+    return values
+
+
+def validate_result(result):
+    """
+    校验一局结果
+    
+    Args:
+        result: {PLAYER1..3, BANKER1..3: 卡片代码}
+    
+    Returns:
+        str: 不合格原因，合格时返回None
+    """
+    try:
+        player_values = _hand_values(result, PLAYER_KEYS)
+        banker_values = _hand_values(result, BANKER_KEYS)
+    except ValueError as e:
+        return str(e)
+    # 空位之后不应再有牌
+    for side, keys, values in (('闲家', PLAYER_KEYS, player_values), ('庄家', BANKER_KEYS, banker_values)):
+        if any(result.get(key) for key in keys[len(values):]):
+            return f"{side}牌位不连续"
+    return check_draw_rules(player_values, banker_values)
+
+
+def parse_line(line, default_table_id):
+    """
+    解析一行 JSONL
+    
+    Returns:
+        tuple: (结果字典, 桌号)
+    """
+    data = json.loads(line)
+    result = data.get('result') if isinstance(data.get('result'), dict) else data
+    table_id = data.get('table_id') or data.get('tableId') or default_table_id
+    if table_id is None:
+        raise ValueError("缺少桌号（行内 table_id 或 --table）")
+    return result, str(table_id)
+
+
+def iter_rounds(paths, default_table_id):
+    """
+    逐行读取输入文件
+    
+    Yields:
+        tuple: (文件, 行号, 原始行, 结果字典或None, 桌号或错误原因)
+    """
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    result, table_id = parse_line(line, default_table_id)
+                except (ValueError, AttributeError) as e:
+                    yield path, line_no, line, None, f"无法解析: {e}"
+                    continue
+                yield path, line_no, line, result, table_id
+
+
+def bulk_import(db, paths, table_id=None, batch_size=1000, rejects=None, dry_run=False, progress_every=10000):
+    """
+    批量导入
+    
+    Args:
+        db: 已连接的 DatabaseManager（dry_run 时可为None）
+        paths: JSONL 文件列表
+        table_id: 行内没有桌号时使用的桌号
+        batch_size: 每批行数（一条多行 INSERT、一次提交）
+        rejects: 不合格行的输出文件对象（可选）
+        dry_run: 只校验不写入
+        progress_every: 每导入多少行输出一次进度
+    
+    Returns:
+        dict: 统计 {read, imported, rejected, failed, seconds}
+    """
+    stats = {'read': 0, 'imported': 0, 'rejected': 0, 'failed': 0}
+    batch = []
+    started = time.monotonic()
+    next_report = progress_every
+    
+    def flush():
+        if dry_run:
+            stats['imported'] += len(batch)
+        else:
+            written = db.insert_results_batch(batch)
+            if written < 0:
+                stats['failed'] += len(batch)
+            else:
+                stats['imported'] += written
+        batch.clear()
+    
+    for path, line_no, line, result, extra in iter_rounds(paths, table_id):
+        stats['read'] += 1
+        reason = extra if result is None else validate_result(result)
+        if reason:
+            stats['rejected'] += 1
+            logger.warning(f"{path}:{line_no} 不合格: {reason}")
+            if rejects:
+                rejects.write(json.dumps({'file': path, 'line': line_no, 'reason': reason, 'data': line},
+                                         ensure_ascii=False) + '\n')
+            continue
+        
+        batch.append((build_result_json(result), extra))
+        if len(batch) >= batch_size:
+            flush()
+            if stats['imported'] >= next_report:
+                elapsed = time.monotonic() - started
+                print(f"已导入 {stats['imported']} 行 ({stats['imported'] / elapsed:.0f} 行/秒)", file=sys.stderr)
+                next_report += progress_every
+    
+    flush()
+    stats['seconds'] = time.monotonic() - started
+    return stats
+
+
+def main():
+    """命令行导入"""
+    parser = argparse.ArgumentParser(description='历史结果批量导入 (tu_bjl_result)')
+    parser.add_argument('paths', nargs='+', help='JSONL 文件')
+    parser.add_argument('--table', help='行内没有 table_id 时使用的桌号')
+    parser.add_argument('--batch', type=int, default=1000, help='每批行数')
+    parser.add_argument('--rejects', help='不合格行输出到该 JSONL 文件')
+    parser.add_argument('--dry-run', action='store_true', help='只校验不写入数据库')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    db = None
+    if not args.dry_run:
+        db = DatabaseManager()
+        if not db.connect():
+            print("❌ 数据库连接失败!")
+            return 1
+    
+    rejects = open(args.rejects, 'w', encoding='utf-8') if args.rejects else None
+    try:
+        stats = bulk_import(db, args.paths, args.table, args.batch, rejects, args.dry_run)
+    finally:
+        if rejects:
+            rejects.close()
+        if db:
+            db.disconnect()
+    
+    rate = stats['imported'] / stats['seconds'] if stats['seconds'] else 0
+    action = '校验通过' if args.dry_run else '导入'
+    print(f"✅ 读取 {stats['read']} 行，{action} {stats['imported']} 行，不合格 {stats['rejected']} 行，"
+          f"写入失败 {stats['failed']} 行，耗时 {stats['seconds']:.1f}秒 ({rate:.0f} 行/秒)")
+    return 0 if not stats['failed'] else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
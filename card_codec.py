@@ -0,0 +1,199 @@
+# card_codec.py
+"""
+牌面编解码
+卡片代码、数据库格式、牌序号之间的互相转换，以及结果 JSON 的批量解码；
+全部使用启动时预先生成的查找表，供导出、导入、统计等批量处理使用
+
+牌序号: 0-51，按 CARD_MAPPING 定义顺序（黑桃、红桃、梅花、方块，各 A-K）；EMPTY(-1) 表示无牌
+"""
+
+import json
+
+from config import CARD_MAPPING, convert_card_to_db_format
+
+EMPTY = -1
+
+# 牌序号 -> 卡片代码 / 数据库格式 / 百家乐点数 / 牌面大小(1-13)
+CARD_CODES = tuple(CARD_MAPPING)
+DB_CARDS = tuple(convert_card_to_db_format(code) for code in CARD_CODES)
+CARD_POINTS = tuple(CARD_MAPPING[code]['value'] for code in CARD_CODES)
+CARD_RANKS = tuple(int(code[1:]) for code in CARD_CODES)
+
+# 卡片代码 / 数据库格式 -> 牌序号
+INDEX_BY_CODE = {code: index for index, code in enumerate(CARD_CODES)}
+INDEX_BY_DB_CARD = {db_card: index for index, db_card in enumerate(DB_CARDS)}
+
+# 结果 JSON 的键: "1"-"3" 庄家，"4"-"6" 闲家；解码后按 闲1-3、庄1-3 排列
+RESULT_KEYS = ('4', '5', '6', '1', '2', '3')
+SLOT_NAMES = ('player1', 'player2', 'player3', 'banker1', 'banker2', 'banker3')
+# 游戏结果字典（BaccaratGame.get_game_result）的键，顺序同上
+GAME_RESULT_KEYS = ('PLAYER1', 'PLAYER2', 'PLAYER3', 'BANKER1', 'BANKER2', 'BANKER3')
+
+# 胜负
+WINNER_PLAYER = 1
+WINNER_BANKER = 2
+WINNER_TIE = 3
+WINNER_NAMES = {WINNER_PLAYER: 'PLAYER', WINNER_BANKER: 'BANKER', WINNER_TIE: 'TIE'}
+
+# 结果 JSON 中无法识别的牌
+INVALID = -2
+
+# 紧凑编码: 6个位置各占6位（闲1在最低位），共36位，可存入 BIGINT
+# 每个位置的值: 0 无牌，1-52 为牌序号+1，63 无法识别
+PACK_BITS = 6
+PACK_MASK = (1 << PACK_BITS) - 1
+PACK_INVALID = PACK_MASK
+
+
+def code_to_index(card_code):
+    """
+    卡片代码 -> 牌序号
+    
+    Returns:
+        int: 牌序号；空返回 EMPTY，无法识别返回 INVALID（与 db_card_to_index 一致）
+    """
+    code = card_code.strip().upper() if card_code else ''
+    if not code:
+        return EMPTY
+    return INDEX_BY_CODE.get(code, INVALID)
+
+
+def db_card_to_index(db_card):
+    """
+    数据库格式 -> 牌序号
+    
+    Returns:
+        int: 牌序号；'0|0' 或空返回 EMPTY，无法识别返回 INVALID
+    """
+    if not db_card or db_card == '0|0':
+        return EMPTY
+    return INDEX_BY_DB_CARD.get(db_card, INVALID)
+
+
+def decode_result(result):
+    """
+    解码 tu_bjl_result.result
+    
+    Args:
+        result: JSON 字符串或已解析的字典 {"1": "12|f", ...}
+    
+    Returns:
+        tuple: 6个牌序号 (闲1, 闲2, 闲3, 庄1, 庄2, 庄3)
+    """
+    if isinstance(result, (str, bytes)):
+        result = json.loads(result)
+    lookup = INDEX_BY_DB_CARD
+    indexes = []
+    for key in RESULT_KEYS:
+        db_card = result.get(key)
+        if not db_card or db_card == '0|0':
+            indexes.append(EMPTY)
+        else:
+            indexes.append(lookup.get(db_card, INVALID))
+    return tuple(indexes)
+
+
+def decode_game_result(result_data):
+    """
+    解码游戏结果字典
+    
+    Args:
+        result_data: {PLAYER1..3, BANKER1..3: 卡片代码}
+    
+    Returns:
+        tuple: 6个牌序号 (闲1, 闲2, 闲3, 庄1, 庄2, 庄3)
+    """
+    return tuple(code_to_index(result_data.get(key, '')) for key in GAME_RESULT_KEYS)
+
+
+def pack_cards(cards):
+    """
+    6个牌序号 -> 紧凑编码整数
+    
+    Args:
+        cards: decode_result 的结果
+    
+    Returns:
+        int: 36位整数
+    """
+    packed = 0
+    for slot, index in enumerate(cards):
+        if index >= 0:
+            value = index + 1
+        else:
+            value = 0 if index == EMPTY else PACK_INVALID
+        packed |= value << (slot * PACK_BITS)
+    return packed
+
+
+def unpack_cards(packed):
+    """
+    紧凑编码整数 -> 6个牌序号
+    
+    Returns:
+        tuple: 6个牌序号 (闲1, 闲2, 闲3, 庄1, 庄2, 庄3)
+    """
+    cards = []
+    for slot in range(len(RESULT_KEYS)):
+        value = (packed >> (slot * PACK_BITS)) & PACK_MASK
+        if value == 0:
+            cards.append(EMPTY)
+        elif value > len(CARD_CODES):
+            cards.append(INVALID)
+        else:
+            cards.append(value - 1)
+    return tuple(cards)
+
+
+def packed_columns(cards):
+    """
+    一局的紧凑编码和汇总列
+    
+    Args:
+        cards: decode_result 的结果
+    
+    Returns:
+        tuple: 按 database_manager.PACKED_COLUMNS 顺序
+               (紧凑编码, 胜负, 闲点数, 庄点数, 是否天牌, 闲对子, 庄对子)，均为整数；
+               含无法识别的牌时汇总列为None（写入 NULL，按胜负、天牌等列筛选时不计入坏数据）
+    """
+    summary = evaluate(cards)
+    if summary is None:
+        return (pack_cards(cards),) + (None,) * 6
+    player_total, banker_total, winner, natural, player_pair, banker_pair = summary
+    return (pack_cards(cards), winner, player_total, banker_total,
+            int(natural), int(player_pair), int(banker_pair))
+
+
+def hand_total(*indexes):
+    """一手牌的百家乐点数（忽略空位）"""
+    return sum(CARD_POINTS[index] for index in indexes if index >= 0) % 10
+
+
+def evaluate(cards):
+    """
+    计算一局的汇总字段
+    
+    Args:
+        cards: decode_result 的结果
+    
+    Returns:
+        tuple: (闲点数, 庄点数, 胜负, 是否天牌, 闲对子, 庄对子)，含无法识别的牌时返回None
+    """
+    if INVALID in cards:
+        return None
+    p1, p2, p3, b1, b2, b3 = cards
+    player_total = hand_total(p1, p2, p3)
+    banker_total = hand_total(b1, b2, b3)
+    if player_total > banker_total:
+        winner = WINNER_PLAYER
+    elif banker_total > player_total:
+        winner = WINNER_BANKER
+    else:
+        winner = WINNER_TIE
+    two_card_player = hand_total(p1, p2)
+    two_card_banker = hand_total(b1, b2)
+    natural = two_card_player >= 8 or two_card_banker >= 8
+    player_pair = p1 >= 0 and p2 >= 0 and CARD_RANKS[p1] == CARD_RANKS[p2]
+    banker_pair = b1 >= 0 and b2 >= 0 and CARD_RANKS[b1] == CARD_RANKS[b2]
+    return player_total, banker_total, winner, natural, player_pair, banker_pair
@@ -24,14 +24,130 @@ SERIAL_RECONNECT_INTERVAL = 2  # 串口重连间隔(秒)
 DB_RECONNECT_INTERVAL = 5      # 数据库重连间隔(秒)
 MAX_RECONNECT_ATTEMPTS = 10    # 最大重连次数
 
+# ========== 新增：串口读取方式配置 ==========
+# thread: 在本进程的读取线程中读串口(默认)
+# process: 在独立子进程中读串口，经共享内存环形缓冲传给游戏进程，不受本进程 GIL 影响
+SERIAL_READER_MODE = 'thread'
+SCAN_RING_CAPACITY = 1024      # process 模式下环形缓冲的帧容量，满时丢弃新扫描（不受 SCAN_QUEUE_POLICY 影响）
+
+# ========== 新增：扫描队列配置 ==========
+# thread 模式及双扫描枪的数据队列容量和队列满时的策略:
+# drop_oldest 丢弃最旧的扫描 / block 读取线程阻塞等待(超时后丢弃新扫描) / spill 最旧的扫描写入事件日志后丢弃
+# spill 只是留档，被丢弃的扫描不会重新交付；须同时启用事件日志 (--journal)，否则启动时告警且等同 drop_oldest
+# process 模式不使用该队列，固定丢弃新扫描，丢弃数量同样计入 baccarat_scan_queue_dropped_total{reason="overflow"}
+SCAN_QUEUE_CAPACITY = 256
+SCAN_QUEUE_POLICY = 'drop_oldest'
+SCAN_QUEUE_BLOCK_TIMEOUT = 1.0  # block 策略下读取线程最长等待(秒)，应小于 SERIAL_STALL_TIMEOUT
+
+# ========== 新增：备用扫描枪配置 ==========
+BACKUP_COM_PORT = None          # 备用扫描枪串口号(None 表示不使用)，主备同时读取、自动切换
+SCANNER_DEDUP_WINDOW = 0.5      # 主备两路在该秒数内报告的同一张牌只交付一次
+SCANNER_SILENCE_THRESHOLD = 2   # 连续多少张牌只有另一路扫到时判定主用设备静默并切换
+
+# ========== 新增：扫描枪协议配置 ==========
+# text: 换行结尾的文本卡片代码 / binary: 0x02+长度+内容+CRC16 二进制帧 / rfid: RFID UID 文本行
+SCANNER_DECODER = 'text'        # 默认解码器
+SCANNER_DECODERS = {}           # 按串口指定解码器，如 {'COM6': 'binary', 'COM7': 'rfid'}
+RFID_UID_MAP_FILE = 'rfid_uid_map.csv'  # RFID UID 对照表(每行: uid,卡片代码)
+
+# ========== 新增：启动配置 ==========
+# 串口和数据库并行连接；从启动算起超过该时间数据库仍未连上时，先开始接收扫描，
+# 临时表写入暂存在内存中，数据库连上后补写
+STARTUP_TIME_BUDGET = 3
+
+# ========== 新增：串口看门狗配置 ==========
+SERIAL_WATCHDOG_ENABLED = True     # 监控串口读取线程，线程退出、卡死或设备重新插入时立即重启
+SERIAL_WATCHDOG_INTERVAL = 0.5     # 检查间隔(秒)
+SERIAL_STALL_TIMEOUT = 5           # 读取线程无心跳或读取调用阻塞超过该秒数视为卡死
+
 # ========== 新增：游戏超时配置 ==========
 GAME_TIMEOUT = 180  # 游戏超时时间(秒)，默认180秒
 CARD_SCAN_TIMEOUT = 60  # 单张牌扫描超时(秒)
 
+# ========== 新增：局间节奏配置 ==========
+# auto: 距上一局结束满 ROUND_MIN_INTERVAL 秒后开始(0 表示立即开始)，期间扫到牌立即开始
+# ready_scan: 荷官扫描就绪卡(READY_CARD_CODE)后开始，直接扫到有效牌也视为开始
+ROUND_START_MODE = 'auto'
+ROUND_MIN_INTERVAL = 0        # 局间最短间隔(秒)
+READY_CARD_CODE = 'READY'     # 荷官就绪卡的扫描代码
+SHOE_CARD_CODE = 'SHOE'       # 换靴卡的扫描代码(事件日志中靴号加一)
+ERROR_RETRY_DELAY = 2         # 出错或串口重连失败后重试前的等待(秒)
+
+# ========== 新增：断点恢复配置 ==========
+ROUND_SNAPSHOT_ENABLED = True # 每发一张牌保存本地快照，重启后恢复进行中的牌局
+ROUND_SNAPSHOT_DIR = '.'      # 快照目录，文件名 round_snapshot_<桌号>.json
+ROUND_SNAPSHOT_FSYNC = True   # 每次保存后刷盘(断电不丢)，关闭可降低每张牌的写入延迟
+ROUND_SNAPSHOT_MAX_AGE = 600  # 超过该秒数的快照视为过期，不再恢复
+
+# ========== 新增：事件日志配置 ==========
+JOURNAL_ENABLED = False                # 是否记录审计用事件日志(原始扫描、有效牌、局边界、数据库提交结果)
+JOURNAL_PATH = 'baccarat_journal.bin'  # 事件日志文件，索引文件为同名 .idx
+
 # 日志配置
 LOG_LEVEL = 'INFO'
 LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s'
 # LOG_FILE = 'baccarat_system.log'  # 注释掉，不生成日志文件
+LOG_QUEUE_SIZE = 10000        # 日志队列容量，满时丢弃新日志而不阻塞业务线程
+LOG_JSON_FILE = None          # JSON Lines 日志文件，如 'baccarat_system.jsonl'(None 表示不写文件)
+LOG_JSON_MAX_BYTES = 50 * 1024 * 1024  # 单个日志文件最大字节数
+LOG_JSON_BACKUP_COUNT = 5     # 保留的滚动日志文件数
+LOG_LEVEL_OVERRIDES = {}      # 按模块覆盖日志级别，如 {'database_manager': 'WARNING'}
+
+# ========== 新增：延迟追踪配置 ==========
+LATENCY_TRACE_ENABLED = False                 # 是否启用逐张卡片的分阶段延迟追踪
+LATENCY_TRACE_FILE = 'latency_trace.json'     # 追踪导出文件(Chrome Trace Event 格式)
+LATENCY_TRACE_BUFFER = 5000                   # 内存中保留的最近追踪条数
+LATENCY_HISTOGRAM_WINDOW = 60                 # 滚动直方图窗口(秒)
+
+# ========== 新增：运行指标配置 ==========
+METRICS_ENABLED = False       # 是否启动内嵌 HTTP /metrics 端点
+METRICS_HOST = '127.0.0.1'    # 指标服务监听地址
+METRICS_PORT = 9108           # 指标服务端口
+
+# ========== 新增：事件推送配置 ==========
+EVENT_FEED_ENABLED = False    # 是否启动本地事件推送服务(替代前端轮询 tu_bjl_temp / tu_bjl_result)
+EVENT_FEED_HOST = '127.0.0.1' # 推送服务监听地址
+EVENT_FEED_PORT = 9109        # 推送服务端口(4字节长度前缀 + JSON)
+EVENT_FEED_BUFFER = 256       # 每个订阅者的缓冲消息数，满时丢弃最旧的
+
+# ========== 新增：结果查询服务配置 ==========
+READ_MODEL_ENABLED = False    # 是否启动本地结果查询服务(看板读取最新结果，不再查询 MySQL)
+READ_MODEL_HOST = '127.0.0.1' # 查询服务监听地址
+READ_MODEL_PORT = 9110        # 查询服务端口
+READ_MODEL_HISTORY = 100      # 每个桌号在内存中保留的最近局数
+READ_MODEL_MAX_WAIT = 30      # 长轮询最长等待时间(秒)
+
+# ========== 新增：桌台统计配置 ==========
+TABLE_STATS_ENABLED = False       # 是否按(桌号, 小时)累加统计并写入 tu_bjl_stats_hourly
+TABLE_STATS_FLUSH_INTERVAL = 60   # 统计写入数据库的间隔(秒)
+
+# ========== 新增：结果紧凑编码配置 ==========
+# 写入结果时同时写入紧凑编码和胜负/点数/天牌/对子列(需先运行 migrate_packed_results.py 添加列)
+RESULT_PACKED_COLUMNS = False
+
+# ========== 新增：性能分析配置 ==========
+# 运行中按需分析: Linux 上 kill -USR2 <pid> 开始/提前结束，或连接本地控制端口发送命令
+PROFILING_ENABLED = False          # 是否启动本地性能分析控制端口(信号触发始终可用)
+PROFILING_HOST = '127.0.0.1'       # 控制端口监听地址(只应监听本机)
+PROFILING_PORT = 9111              # 控制端口
+PROFILING_DIR = '.'                # 报告输出目录
+PROFILING_DEFAULT_MODE = 'sample'  # 信号触发时的分析方式: sample 采样(低开销) / cprofile 确定性
+PROFILING_DEFAULT_SECONDS = 30     # 信号触发时的分析时长(秒)
+PROFILING_SAMPLE_INTERVAL = 0.005  # 采样间隔(秒)
+PROFILING_TOP = 20                 # 报告的热点函数条数
+
+# ========== 新增：桌台租约配置 ==========
+# 多台主机可为同一桌号待命，只有持有租约的主机写库；租约记录在 tu_bjl_lease，每次易主 token 加1，
+# 每次写库都核对 token，旧主机（包括恢复过来的僵死进程）的写入会被拒绝。
+# 租约时间取各主机的系统时间，主机间时钟误差应远小于 LEASE_TTL（请启用 NTP）
+TABLE_LEASE_ENABLED = False  # 是否启用桌台租约
+LEASE_TTL = 15               # 租约有效期(秒)，持有者故障后最迟约 LEASE_TTL 秒由备机接管
+LEASE_RENEW_INTERVAL = 5     # 续约间隔(秒)，也是备机尝试接管的间隔，应小于 LEASE_TTL 的一半
+LEASE_OWNER = None           # 持有者标识（None表示 主机名:进程号）
+
+# ========== 新增：控制台输出配置 ==========
+CONSOLE_HEADLESS = False      # 无界面模式：不输出发牌画面和等待状态
+CONSOLE_MAX_FPS = 10          # 控制台每秒最多刷新次数
 
 # 牌值映射
 CARD_MAPPING = {
@@ -130,4 +246,28 @@ def convert_card_to_db_format(card_code):
         except ValueError:
             return '0|0'
     
-    return '0|0'
\ No newline at end of file
+    return '0|0'
+
+def convert_db_format_to_card(db_card):
+    """
+    将数据库格式还原为卡片代码
+    例如: '12|f' -> 'D12'
+    
+    Args:
+        db_card: 数据库格式 (如 '12|f', '1|h')
+    
+    Returns:
+        str: 卡片代码，无法识别时返回空字符串
+    """
+    if not db_card or '|' not in db_card:
+        return ''
+    
+    rank, suit = db_card.split('|', 1)
+    suit_map = {'h': 'A', 'r': 'H', 'm': 'C', 'f': 'D'}
+    
+    try:
+        card_code = f"{suit_map[suit]}{int(rank):02d}"
+    except (KeyError, ValueError):
+        return ''
+    
+    return card_code if card_code in CARD_MAPPING else ''
\ No newline at end of file
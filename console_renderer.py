@@ -0,0 +1,155 @@
+# console_renderer.py
+"""
+控制台渲染器
+游戏线程只提交消息和状态快照，由独立线程按限定帧率统一输出到终端，
+避免慢速控制台（尤其是 Windows）的I/O阻塞扫描和数据库写入
+"""
+
+import sys
+import time
+import threading
+import logging
+from collections import deque
+
+from baccarat_game import BaccaratGame
+
+logger = logging.getLogger(__name__)
+
+# 输出项类型
+_ITEM_TEXT = 'text'
+_ITEM_STATE = 'state'
+_ITEM_RESULT = 'result'
+
+
+class ConsoleRenderer:
+    """限速的控制台渲染线程"""
+    
+    def __init__(self, headless=False, max_fps=10, max_pending=500, stream=None):
+        """
+        初始化渲染器
+        
+        Args:
+            headless: 无界面模式，丢弃所有游戏画面输出
+            max_fps: 每秒最多刷新次数
+            max_pending: 待输出项上限，超出时丢弃最旧的
+            stream: 输出流（默认 sys.stdout）
+        """
+        self.headless = headless
+        self.interval = 1.0 / max_fps
+        self.stream = stream or sys.stdout
+        self.pending = deque(maxlen=max_pending)
+        self.status_text = None
+        self.status_shown = False
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.running = False
+        self.thread = None
+        self.view = BaccaratGame()  # 仅在渲染线程中使用的格式化视图
+    
+    def start(self):
+        """启动渲染线程"""
+        if self.headless or self.running:
+            return
+        self.running = True
+        self.thread = threading.Thread(target=self._render_loop, name='console-renderer')
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def stop(self):
+        """停止渲染线程并输出剩余内容"""
+        if not self.running:
+            return
+        self.running = False
+        self.wakeup.set()
+        self.thread.join(timeout=2)
+        self._render_once()
+    
+    def echo(self, text):
+        """输出一行文本"""
+        if self.headless:
+            return
+        with self.lock:
+            self.pending.append((_ITEM_TEXT, text))
+        self.wakeup.set()
+    
+    def status(self, text):
+        """更新底部状态行（只保留最新一条，用 \\r 覆盖显示）"""
+        if self.headless:
+            return
+        with self.lock:
+            self.status_text = text
+    
+    def show_state(self, game):
+        """
+        提交当前游戏状态快照
+        
+        Args:
+            game: BaccaratGame 实例（在调用线程中复制牌面）
+        """
+        self._submit(_ITEM_STATE, game)
+    
+    def show_result(self, game):
+        """
+        提交最终结果快照
+        
+        Args:
+            game: BaccaratGame 实例
+        """
+        self._submit(_ITEM_RESULT, game)
+    
+    def _submit(self, kind, game):
+        if self.headless:
+            return
+        snapshot = (kind, (tuple(game.player_cards), tuple(game.banker_cards)))
+        with self.lock:
+            # 连续的状态快照只需要画最新的一帧
+            if kind == _ITEM_STATE and self.pending and self.pending[-1][0] == _ITEM_STATE:
+                self.pending[-1] = snapshot
+            else:
+                self.pending.append(snapshot)
+        self.wakeup.set()
+    
+    def _render_loop(self):
+        """渲染循环（在独立线程中运行）"""
+        last_render = 0.0
+        while self.running:
+            self.wakeup.wait(self.interval)
+            self.wakeup.clear()
+            # 限速：两次刷新之间至少间隔一帧，期间的更新合并输出
+            delay = self.interval - (time.monotonic() - last_render)
+            if delay > 0:
+                time.sleep(delay)
+            last_render = time.monotonic()
+            try:
+                self._render_once()
+            except Exception as e:
+                logger.error(f"控制台输出出错: {e}")
+    
+    def _render_once(self):
+        """把待输出内容合并为一次写入"""
+        with self.lock:
+            items = list(self.pending)
+            self.pending.clear()
+            status_text = self.status_text
+            self.status_text = None
+        
+        parts = []
+        if items and self.status_shown:
+            parts.append('\n')
+            self.status_shown = False
+        for kind, payload in items:
+            if kind == _ITEM_TEXT:
+                parts.append(payload + '\n')
+            else:
+                self.view.player_cards, self.view.banker_cards = list(payload[0]), list(payload[1])
+                if kind == _ITEM_STATE:
+                    parts.append(self.view.format_current_state() + '\n')
+                else:
+                    parts.append(self.view.format_final_result() + '\n')
+        if status_text is not None:
+            parts.append('\r' + status_text)
+            self.status_shown = True
+        
+        if parts:
+            self.stream.write(''.join(parts))
+            self.stream.flush()
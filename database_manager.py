@@ -4,7 +4,6 @@
 负责MySQL数据库连接、数据操作和自动重连
 """
 
-import pymysql
 import json
 import time
 import logging
@@ -12,11 +11,71 @@ from config import (
     DB_CONFIG, 
     DB_RECONNECT_INTERVAL, 
     MAX_RECONNECT_ATTEMPTS,
-    convert_card_to_db_format
+    RESULT_PACKED_COLUMNS,
+    convert_card_to_db_format,
+    convert_db_format_to_card
 )
+from metrics import DB_RECONNECTS, DB_STATEMENT_SECONDS, LEASE_FENCED_WRITES
+from card_codec import decode_result, decode_game_result, packed_columns
 
 logger = logging.getLogger(__name__)
 
+# tu_bjl_result 的紧凑编码和汇总列（由 migrate_packed_results.py 添加），值由 card_codec.packed_columns 计算
+PACKED_COLUMNS = ('cards_packed', 'winner', 'player_total', 'banker_total', 'is_natural', 'player_pair', 'banker_pair')
+
+# 按 (桌号, 小时) 汇总的统计表，由 table_stats.TableStats 增量写入
+STATS_TABLE = 'tu_bjl_stats_hourly'
+STATS_FIELDS = ('rounds', 'player_wins', 'banker_wins', 'ties', 'naturals', 'player_pairs', 'banker_pairs', 'cards')
+STATS_TABLE_DDL = f"""CREATE TABLE IF NOT EXISTS {STATS_TABLE} (
+    tableId VARCHAR(32) NOT NULL,
+    hour DATETIME NOT NULL,
+    rounds INT UNSIGNED NOT NULL DEFAULT 0,
+    player_wins INT UNSIGNED NOT NULL DEFAULT 0,
+    banker_wins INT UNSIGNED NOT NULL DEFAULT 0,
+    ties INT UNSIGNED NOT NULL DEFAULT 0,
+    naturals INT UNSIGNED NOT NULL DEFAULT 0,
+    player_pairs INT UNSIGNED NOT NULL DEFAULT 0,
+    banker_pairs INT UNSIGNED NOT NULL DEFAULT 0,
+    cards INT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (tableId, hour)
+)"""
+
+# 桌台租约表，由 table_lease.TableLease 维护；token 每次易主加1，writes 为当前 token 下的写库次数
+LEASE_TABLE = 'tu_bjl_lease'
+LEASE_TABLE_DDL = f"""CREATE TABLE IF NOT EXISTS {LEASE_TABLE} (
+    tableId VARCHAR(32) NOT NULL,
+    owner VARCHAR(128) NOT NULL,
+    token BIGINT UNSIGNED NOT NULL,
+    expires DOUBLE NOT NULL,
+    writes BIGINT UNSIGNED NOT NULL DEFAULT 0,
+    PRIMARY KEY (tableId)
+)"""
+
+
+class FencingError(RuntimeError):
+    """桌台租约已失效（已被其他主机接管），写入被拒绝"""
+
+
+def build_result_json(result_data):
+    """
+    游戏结果转换为 tu_bjl_result.result 的 JSON（键1-3是庄家，键4-6是闲家）
+    
+    Args:
+        result_data: 游戏结果字典 (包含 PLAYER1, PLAYER2, PLAYER3, BANKER1, BANKER2, BANKER3)
+        
+    Returns:
+        str: JSON 字符串
+    """
+    db_result = {
+        "1": convert_card_to_db_format(result_data.get('BANKER1', '')),
+        "2": convert_card_to_db_format(result_data.get('BANKER2', '')),
+        "3": convert_card_to_db_format(result_data.get('BANKER3', '')),
+        "4": convert_card_to_db_format(result_data.get('PLAYER1', '')),
+        "5": convert_card_to_db_format(result_data.get('PLAYER2', '')),
+        "6": convert_card_to_db_format(result_data.get('PLAYER3', ''))
+    }
+    return json.dumps(db_result, ensure_ascii=False)
+
 
 class DatabaseManager:
     """数据库管理器类"""
@@ -33,10 +92,15 @@ class DatabaseManager:
         self.cursor = None
         self.is_connected = False
         self.reconnect_count = 0
+        self.read_model = None  # 结果读模型（可选），写库成功后同步更新
+        self.packed_columns = RESULT_PACKED_COLUMNS  # 写入结果时是否同时写入紧凑编码和汇总列
+        self.lease = None  # 桌台租约（可选），设置后写入该桌号前先核对 fencing token
         
     def connect(self):
         """连接数据库"""
         try:
+            # 首次连接时才导入 pymysql，缩短程序启动时间
+            import pymysql
             self.connection = pymysql.connect(**self.config)
             self.cursor = self.connection.cursor()
             self.is_connected = True
@@ -78,6 +142,7 @@ class DatabaseManager:
         """尝试重新连接数据库"""
         while self.reconnect_count < MAX_RECONNECT_ATTEMPTS:
             self.reconnect_count += 1
+            DB_RECONNECTS.inc()
             logger.info(f"尝试重新连接数据库... (第{self.reconnect_count}次)")
             
             if self.connect():
@@ -100,13 +165,16 @@ class DatabaseManager:
         Returns:
             bool: True表示存在数据，False表示不存在
         """
+        if self.read_model and self.read_model.is_loaded(table_id):
+            return self.read_model.has_rounds(table_id)
         if not self.ensure_connection():
             return False
         
         try:
             query = "SELECT COUNT(*) FROM tu_bjl_result WHERE tableId = %s"
-            self.cursor.execute(query, (str(table_id),))
-            count = self.cursor.fetchone()[0]
+            with DB_STATEMENT_SECONDS.time(operation='check_table_exists'):
+                self.cursor.execute(query, (str(table_id),))
+                count = self.cursor.fetchone()[0]
             return count > 0
         except Exception as e:
             logger.error(f"检查数据时出错: {e}")
@@ -133,18 +201,24 @@ class DatabaseManager:
             # 转换卡片格式
             db_card_format = convert_card_to_db_format(card_code)
             
-            # 先删除该位置的旧数据（如果存在）
-            delete_query = "DELETE FROM tu_bjl_temp WHERE tableId = %s AND position = %s"
-            self.cursor.execute(delete_query, (str(table_id), position))
-            
-            # 插入新数据
-            insert_query = "INSERT INTO tu_bjl_temp (tableId, position, card) VALUES (%s, %s, %s)"
-            self.cursor.execute(insert_query, (str(table_id), position, db_card_format))
+            with DB_STATEMENT_SECONDS.time(operation='insert_temp_card'):
+                self._fence(table_id, 'insert_temp_card')
+                
+                # 先删除该位置的旧数据（如果存在）
+                delete_query = "DELETE FROM tu_bjl_temp WHERE tableId = %s AND position = %s"
+                self.cursor.execute(delete_query, (str(table_id), position))
+                
+                # 插入新数据
+                insert_query = "INSERT INTO tu_bjl_temp (tableId, position, card) VALUES (%s, %s, %s)"
+                self.cursor.execute(insert_query, (str(table_id), position, db_card_format))
+                
+                # 提交事务
+                self.connection.commit()
             
-            # 提交事务
-            self.connection.commit()
-            
-            logger.info(f"临时数据插入成功 - Table: {table_id}, Position: {position}, Card: {card_code} -> {db_card_format}")
+            if self.read_model:
+                self.read_model.set_temp_card(table_id, position, db_card_format)
+            logger.info("临时数据插入成功 - Table: %s, Position: %s, Card: %s -> %s",
+                        table_id, position, card_code, db_card_format)
             return True
             
         except Exception as e:
@@ -155,6 +229,34 @@ class DatabaseManager:
                 pass
             return False
     
+    def get_temp_cards(self, table_id):
+        """
+        读取指定桌号临时表中已发的牌（用于断点恢复）
+        
+        Args:
+            table_id: 桌号
+            
+        Returns:
+            dict: {位置: 卡片代码}，失败时返回None
+        """
+        if not self.ensure_connection():
+            return None
+        
+        try:
+            query = "SELECT position, card FROM tu_bjl_temp WHERE tableId = %s"
+            with DB_STATEMENT_SECONDS.time(operation='get_temp_cards'):
+                self.cursor.execute(query, (str(table_id),))
+                rows = self.cursor.fetchall()
+            cards = {}
+            for position, db_card in rows:
+                card_code = convert_db_format_to_card(db_card)
+                if card_code:
+                    cards[position] = card_code
+            return cards
+        except Exception as e:
+            logger.error(f"读取临时数据时出错: {e}")
+            return None
+    
     # ========== 新增：清理数据方法 ==========
     def clear_table_data(self, table_id):
         """
@@ -171,19 +273,24 @@ class DatabaseManager:
             return False
         
         try:
-            # 清理临时表
-            temp_query = "DELETE FROM tu_bjl_temp WHERE tableId = %s"
-            self.cursor.execute(temp_query, (str(table_id),))
-            temp_deleted = self.cursor.rowcount
-            
-            # 清理结果表
-            result_query = "DELETE FROM tu_bjl_result WHERE tableId = %s"
-            self.cursor.execute(result_query, (str(table_id),))
-            result_deleted = self.cursor.rowcount
-            
-            # 提交事务
-            self.connection.commit()
+            with DB_STATEMENT_SECONDS.time(operation='clear_table_data'):
+                self._fence(table_id, 'clear_table_data')
+                
+                # 清理临时表
+                temp_query = "DELETE FROM tu_bjl_temp WHERE tableId = %s"
+                self.cursor.execute(temp_query, (str(table_id),))
+                temp_deleted = self.cursor.rowcount
+                
+                # 清理结果表
+                result_query = "DELETE FROM tu_bjl_result WHERE tableId = %s"
+                self.cursor.execute(result_query, (str(table_id),))
+                result_deleted = self.cursor.rowcount
+                
+                # 提交事务
+                self.connection.commit()
             
+            if self.read_model:
+                self.read_model.invalidate(table_id)
             logger.info(f"数据清理完成 - Table ID: {table_id}, 临时表删除: {temp_deleted}条, 结果表删除: {result_deleted}条")
             return True
             
@@ -212,33 +319,32 @@ class DatabaseManager:
             return False
         
         try:
-            # 转换为新的数据库格式
-            # 键1-3是庄家，键4-6是闲家
-            db_result = {
-                "1": convert_card_to_db_format(result_data.get('BANKER1', '')),
-                "2": convert_card_to_db_format(result_data.get('BANKER2', '')),
-                "3": convert_card_to_db_format(result_data.get('BANKER3', '')),
-                "4": convert_card_to_db_format(result_data.get('PLAYER1', '')),
-                "5": convert_card_to_db_format(result_data.get('PLAYER2', '')),
-                "6": convert_card_to_db_format(result_data.get('PLAYER3', ''))
-            }
-            
-            # 将结果转换为JSON字符串
-            result_json = json.dumps(db_result, ensure_ascii=False)
+            # 转换为新的数据库格式（JSON字符串）
+            result_json = build_result_json(result_data)
             
             # 插入数据
             query = "INSERT INTO tu_bjl_result (result, tableId) VALUES (%s, %s)"
-            self.cursor.execute(query, (result_json, str(table_id)))
+            params = (result_json, str(table_id))
+            if self.packed_columns:
+                query = self._packed_insert_query()
+                params += packed_columns(decode_game_result(result_data))
+            with DB_STATEMENT_SECONDS.time(operation='insert_result'):
+                self._fence(table_id, 'insert_result')
+                self.cursor.execute(query, params)
+                result_id = self.cursor.lastrowid
+                
+                # 提交事务
+                self.connection.commit()
             
-            # 提交事务
-            self.connection.commit()
+            if self.read_model:
+                self.read_model.add_round(table_id, result_id, json.loads(result_json))
             
             # 清理该桌的临时表数据
             self.clear_temp_data(table_id)
             
-            logger.info(f"数据插入成功 - Table ID: {table_id}")
-            logger.info(f"原始结果: {result_data}")
-            logger.info(f"转换结果: {result_json}")
+            logger.info("数据插入成功 - Table ID: %s", table_id)
+            logger.info("原始结果: %s", result_data)
+            logger.info("转换结果: %s", result_json)
             return True
             
         except Exception as e:
@@ -249,6 +355,47 @@ class DatabaseManager:
                 pass
             return False
     
+    def insert_results_batch(self, rows):
+        """
+        批量插入游戏结果（一条多行 INSERT，一次提交；用于历史数据导入，不清理临时表）
+        
+        Args:
+            rows: [(result_json, table_id), ...]
+            
+        Returns:
+            int: 插入的行数，失败时返回-1
+        """
+        if not rows:
+            return 0
+        if not self.ensure_connection():
+            logger.error("数据库连接失败，无法批量插入数据")
+            return -1
+        
+        try:
+            # pymysql 会把 INSERT ... VALUES 的 executemany 合并为多行 INSERT
+            query = "INSERT INTO tu_bjl_result (result, tableId) VALUES (%s, %s)"
+            params = [(result_json, str(table_id)) for result_json, table_id in rows]
+            if self.packed_columns:
+                query = self._packed_insert_query()
+                params = [row + packed_columns(decode_result(row[0])) for row in params]
+            with DB_STATEMENT_SECONDS.time(operation='insert_results_batch'):
+                self.cursor.executemany(query, params)
+                self.connection.commit()
+            return len(rows)
+        except Exception as e:
+            logger.error(f"批量插入数据时出错: {e}")
+            try:
+                self.connection.rollback()
+            except:
+                pass
+            return -1
+    
+    @staticmethod
+    def _packed_insert_query():
+        """同时写入紧凑编码和汇总列的 INSERT 语句"""
+        placeholders = ', '.join(['%s'] * (len(PACKED_COLUMNS) + 2))
+        return f"INSERT INTO tu_bjl_result (result, tableId, {', '.join(PACKED_COLUMNS)}) VALUES ({placeholders})"
+    
     # ========== 新增：清理临时表数据 ==========
     def clear_temp_data(self, table_id):
         """
@@ -265,9 +412,13 @@ class DatabaseManager:
         
         try:
             query = "DELETE FROM tu_bjl_temp WHERE tableId = %s"
-            self.cursor.execute(query, (str(table_id),))
-            self.connection.commit()
-            logger.info(f"临时表数据已清理 - Table ID: {table_id}")
+            with DB_STATEMENT_SECONDS.time(operation='clear_temp_data'):
+                self._fence(table_id, 'clear_temp_data')
+                self.cursor.execute(query, (str(table_id),))
+                self.connection.commit()
+            if self.read_model:
+                self.read_model.clear_temp(table_id)
+            logger.info("临时表数据已清理 - Table ID: %s", table_id)
             return True
         except Exception as e:
             logger.error(f"清理临时表数据时出错: {e}")
@@ -287,6 +438,10 @@ class DatabaseManager:
         Returns:
             dict: 结果数据
         """
+        # 读模型已加载该桌号时直接返回内存中的数据
+        if table_id and self.read_model and self.read_model.is_loaded(table_id):
+            return self.read_model.latest(table_id)
+        
         if not self.ensure_connection():
             return None
         
@@ -311,6 +466,366 @@ class DatabaseManager:
             logger.error(f"获取数据时出错: {e}")
             return None
     
+    def fetch_results_since(self, last_id, table_id=None, batch_size=500):
+        """
+        读取 id 大于 last_id 的一批结果（按主键 id 翻页，不用 OFFSET）
+        
+        Args:
+            last_id: 上次处理到的记录 id（从头读取传 0）
+            table_id: 桌号（可选）
+            batch_size: 本批最多行数
+            
+        Returns:
+            list: [{'id', 'table_id', 'cards'}]，按 id 升序；cards 为 card_codec.decode_result 的
+                  6个牌序号 (闲1-3, 庄1-3)，结果无法解析时为None；失败时返回None
+        """
+        if not self.ensure_connection():
+            return None
+        
+        try:
+            if table_id:
+                query = ("SELECT id, tableId, result FROM tu_bjl_result WHERE id > %s AND tableId = %s "
+                         "ORDER BY id LIMIT %s")
+                params = (last_id, str(table_id), batch_size)
+            else:
+                query = "SELECT id, tableId, result FROM tu_bjl_result WHERE id > %s ORDER BY id LIMIT %s"
+                params = (last_id, batch_size)
+            with DB_STATEMENT_SECONDS.time(operation='fetch_results_since'):
+                self.cursor.execute(query, params)
+                rows = self.cursor.fetchall()
+        except Exception as e:
+            logger.error(f"读取增量结果时出错: {e}")
+            return None
+        
+        results = []
+        for result_id, row_table_id, result in rows:
+            try:
+                cards = decode_result(result)
+            except (ValueError, TypeError, AttributeError) as e:
+                # 仍然返回该行，调用方据此推进 last_id，不会卡在坏数据上
+                logger.warning(f"结果无法解析 id={result_id}: {e}")
+                cards = None
+            results.append({'id': result_id, 'table_id': row_table_id, 'cards': cards})
+        return results
+    
+    def iter_results_since(self, last_id, table_id=None, batch_size=500):
+        """
+        逐批读取 id 大于 last_id 的全部结果，直到追上最新记录
+        
+        调用方处理完每一批后保存该批最后一条的 id，断线重启后从该 id 继续，每局恰好处理一次
+        
+        Args:
+            last_id: 上次处理到的记录 id
+            table_id: 桌号（可选）
+            batch_size: 每批行数
+            
+        Yields:
+            list: 一批结果（格式同 fetch_results_since）；读取失败时抛出 RuntimeError
+        """
+        while True:
+            batch = self.fetch_results_since(last_id, table_id, batch_size)
+            if batch is None:
+                raise RuntimeError(f"读取 id > {last_id} 的结果失败")
+            if not batch:
+                return
+            yield batch
+            last_id = batch[-1]['id']
+            if len(batch) < batch_size:
+                return
+    
+    def ensure_stats_table(self):
+        """
+        创建统计表（已存在时不变）
+        
+        Returns:
+            bool: 是否成功
+        """
+        if not self.ensure_connection():
+            return False
+        
+        try:
+            self.cursor.execute(STATS_TABLE_DDL)
+            self.connection.commit()
+            return True
+        except Exception as e:
+            logger.error(f"创建统计表时出错: {e}")
+            return False
+    
+    def upsert_table_stats(self, rows):
+        """
+        累加按小时的统计（同一桌号同一小时已有记录时在原值上累加）
+        
+        Args:
+            rows: [(table_id, hour, {字段: 增量}), ...]，字段见 STATS_FIELDS
+            
+        Returns:
+            bool: 是否成功
+        """
+        if not rows:
+            return True
+        if not self.ensure_connection():
+            logger.error("数据库连接失败，无法写入统计")
+            return False
+        
+        try:
+            columns = ', '.join(STATS_FIELDS)
+            placeholders = ', '.join(['%s'] * (len(STATS_FIELDS) + 2))
+            updates = ', '.join(f"{field} = {field} + VALUES({field})" for field in STATS_FIELDS)
+            query = (f"INSERT INTO {STATS_TABLE} (tableId, hour, {columns}) VALUES ({placeholders}) "
+                     f"ON DUPLICATE KEY UPDATE {updates}")
+            params = [(str(table_id), hour) + tuple(counts.get(field, 0) for field in STATS_FIELDS)
+                      for table_id, hour, counts in rows]
+            with DB_STATEMENT_SECONDS.time(operation='upsert_table_stats'):
+                for table_id in {row[0] for row in params}:
+                    self._fence(table_id, 'upsert_table_stats')
+                self.cursor.executemany(query, params)
+                self.connection.commit()
+            return True
+        except Exception as e:
+            logger.error(f"写入统计时出错: {e}")
+            try:
+                self.connection.rollback()
+            except:
+                pass
+            return False
+    
+    def get_table_stats(self, table_id=None, since=None, until=None):
+        """
+        读取按小时的统计
+        
+        Args:
+            table_id: 桌号（可选）
+            since: 起始小时（含，可选）
+            until: 结束小时（不含，可选）
+            
+        Returns:
+            list: [{'table_id', 'hour', 字段...}]，按桌号、小时排序；失败时返回None
+        """
+        if not self.ensure_connection():
+            return None
+        
+        try:
+            query = f"SELECT tableId, hour, {', '.join(STATS_FIELDS)} FROM {STATS_TABLE} WHERE 1 = 1"
+            params = []
+            if table_id:
+                query += " AND tableId = %s"
+                params.append(str(table_id))
+            if since:
+                query += " AND hour >= %s"
+                params.append(since)
+            if until:
+                query += " AND hour < %s"
+                params.append(until)
+            query += " ORDER BY tableId, hour"
+            with DB_STATEMENT_SECONDS.time(operation='get_table_stats'):
+                self.cursor.execute(query, params)
+                rows = self.cursor.fetchall()
+            return [dict(zip(('table_id', 'hour') + STATS_FIELDS, row)) for row in rows]
+        except Exception as e:
+            logger.error(f"读取统计时出错: {e}")
+            return None
+    
+    # ========== 新增：桌台租约 ==========
+    def ensure_lease_table(self):
+        """
+        创建租约表（已存在时不变）
+        
+        Returns:
+            bool: 是否成功
+        """
+        if not self.ensure_connection():
+            return False
+        
+        try:
+            self.cursor.execute(LEASE_TABLE_DDL)
+            self.connection.commit()
+            return True
+        except Exception as e:
+            logger.error(f"创建租约表时出错: {e}")
+            return False
+    
+    def acquire_lease(self, table_id, owner, now, ttl, force=False):
+        """
+        取得桌台租约：租约不存在、已过期或本来就由 owner 持有时取得，token 加1
+        
+        时间由调用方传入（不用数据库的 NOW()），MySQL 和本地数据库使用相同的语句
+        
+        Args:
+            table_id: 桌号
+            owner: 持有者标识
+            now: 当前时间（time.time()）
+            ttl: 有效期（秒）
+            force: 不等过期，强制接管
+            
+        Returns:
+            int: 取得的 fencing token，租约由其他主机持有或失败时返回None
+        """
+        if not self.ensure_connection():
+            return None
+        
+        try:
+            query = f"UPDATE {LEASE_TABLE} SET owner = %s, token = token + 1, expires = %s, writes = 0 WHERE tableId = %s"
+            params = (owner, now + ttl, str(table_id))
+            if not force:
+                query += " AND (expires < %s OR owner = %s)"
+                params += (now, owner)
+            with DB_STATEMENT_SECONDS.time(operation='acquire_lease'):
+                self.cursor.execute(query, params)
+                if self.cursor.rowcount == 0:
+                    self.cursor.execute(f"SELECT COUNT(*) FROM {LEASE_TABLE} WHERE tableId = %s", (str(table_id),))
+                    if self.cursor.fetchone()[0]:
+                        # 由其他主机持有且未过期
+                        self.connection.rollback()
+                        return None
+                    # 该桌号第一次使用租约；两台主机同时插入时主键冲突，后插入的一方失败
+                    self.cursor.execute(f"INSERT INTO {LEASE_TABLE} (tableId, owner, token, expires) VALUES (%s, %s, 1, %s)",
+                                        (str(table_id), owner, now + ttl))
+                self.cursor.execute(f"SELECT token FROM {LEASE_TABLE} WHERE tableId = %s", (str(table_id),))
+                token = self.cursor.fetchone()[0]
+                self.connection.commit()
+            return token
+        except Exception as e:
+            logger.error(f"取得租约时出错: {e}")
+            try:
+                self.connection.rollback()
+            except:
+                pass
+            return None
+    
+    def renew_lease(self, table_id, owner, token, now, ttl):
+        """
+        续约（token 不变）
+        
+        Args:
+            table_id: 桌号
+            owner: 持有者标识
+            token: 持有的 fencing token
+            now: 当前时间（time.time()）
+            ttl: 有效期（秒）
+            
+        Returns:
+            bool: True续约成功，False租约已被接管，数据库不可用时返回None
+        """
+        if not self.ensure_connection():
+            return None
+        
+        try:
+            query = f"UPDATE {LEASE_TABLE} SET expires = %s WHERE tableId = %s AND owner = %s AND token = %s"
+            with DB_STATEMENT_SECONDS.time(operation='renew_lease'):
+                self.cursor.execute(query, (now + ttl, str(table_id), owner, token))
+                renewed = self.cursor.rowcount > 0
+                self.connection.commit()
+            return renewed
+        except Exception as e:
+            logger.error(f"续约时出错: {e}")
+            try:
+                self.connection.rollback()
+            except:
+                pass
+            return None
+    
+    def release_lease(self, table_id, owner, token):
+        """
+        释放租约（标记为已过期，备机可立即接管）
+        
+        Args:
+            table_id: 桌号
+            owner: 持有者标识
+            token: 持有的 fencing token
+            
+        Returns:
+            bool: 是否成功（租约已被接管时返回False）
+        """
+        if not self.ensure_connection():
+            return False
+        
+        try:
+            query = f"UPDATE {LEASE_TABLE} SET expires = 0 WHERE tableId = %s AND owner = %s AND token = %s"
+            self.cursor.execute(query, (str(table_id), owner, token))
+            released = self.cursor.rowcount > 0
+            self.connection.commit()
+            return released
+        except Exception as e:
+            logger.error(f"释放租约时出错: {e}")
+            try:
+                self.connection.rollback()
+            except:
+                pass
+            return False
+    
+    def get_lease(self, table_id):
+        """
+        读取桌台租约
+        
+        Args:
+            table_id: 桌号
+            
+        Returns:
+            dict: {'owner', 'token', 'expires', 'writes'}，没有租约或失败时返回None
+        """
+        if not self.ensure_connection():
+            return None
+        
+        try:
+            query = f"SELECT owner, token, expires, writes FROM {LEASE_TABLE} WHERE tableId = %s"
+            self.cursor.execute(query, (str(table_id),))
+            row = self.cursor.fetchone()
+            return dict(zip(('owner', 'token', 'expires', 'writes'), row)) if row else None
+        except Exception as e:
+            logger.error(f"读取租约时出错: {e}")
+            return None
+    
+    def _fence(self, table_id, operation):
+        """
+        写入前在同一事务中核对 fencing token（MySQL 中同时锁住租约行，接管要等本次写入提交）
+        
+        Args:
+            table_id: 桌号
+            operation: 写入操作名称（指标标签）
+            
+        Raises:
+            FencingError: 租约已被接管或尚未取得
+        """
+        if not self.lease or str(table_id) != self.lease.table_id:
+            return
+        token = self.lease.token
+        if token is not None:
+            query = f"UPDATE {LEASE_TABLE} SET writes = writes + 1 WHERE tableId = %s AND token = %s"
+            self.cursor.execute(query, (str(table_id), token))
+            if self.cursor.rowcount > 0:
+                return
+            self.lease.fenced()
+        LEASE_FENCED_WRITES.inc(table_id=str(table_id), operation=operation)
+        raise FencingError(f"桌号 {table_id} 的租约已失效 (token {token})，拒绝写入")
+    
+    def load_read_model(self, table_id):
+        """
+        从数据库加载指定桌号的最近结果和临时表到读模型（启动时及接管桌台租约后调用）
+        
+        Args:
+            table_id: 桌号
+            
+        Returns:
+            bool: 是否成功
+        """
+        if not self.read_model or not self.ensure_connection():
+            return False
+        
+        try:
+            with DB_STATEMENT_SECONDS.time(operation='load_read_model'):
+                query = "SELECT id, result, tableId FROM tu_bjl_result WHERE tableId = %s ORDER BY id DESC LIMIT %s"
+                self.cursor.execute(query, (str(table_id), self.read_model.history))
+                rows = self.cursor.fetchall()
+                self.cursor.execute("SELECT position, card FROM tu_bjl_temp WHERE tableId = %s", (str(table_id),))
+                temp = dict(self.cursor.fetchall())
+            rounds = [{'id': row[0], 'result': json.loads(row[1]), 'table_id': row[2]} for row in reversed(rows)]
+            self.read_model.load(table_id, rounds, temp)
+            logger.info(f"读模型已加载 - Table ID: {table_id}, 结果: {len(rounds)}局, 临时牌: {len(temp)}张")
+            return True
+        except Exception as e:
+            logger.error(f"加载读模型时出错: {e}")
+            return False
+    
     def delete_result(self, result_id):
         """
         删除指定ID的结果（用于测试）
@@ -328,6 +843,8 @@ class DatabaseManager:
             query = "DELETE FROM tu_bjl_result WHERE id = %s"
             self.cursor.execute(query, (result_id,))
             self.connection.commit()
+            if self.read_model:
+                self.read_model.remove_round(result_id)
             logger.info(f"已删除记录 ID: {result_id}")
             return True
         except Exception as e:
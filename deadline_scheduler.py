@@ -0,0 +1,213 @@
+# deadline_scheduler.py
+"""
+截止时间调度
+按截止时间排序的最小堆，统一管理各桌的游戏超时、单张牌超时等定时事件；
+等待方只需睡到 time_until_next() 为止再调用 run_due()，不再按秒轮询
+
+时钟可注入:
+    MonotonicClock  真实时间 (time.monotonic)
+    VirtualClock    虚拟时间，由测试或压测手动推进，180秒的超时场景可在微秒内跑完
+"""
+
+import time
+import heapq
+import itertools
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MonotonicClock:
+    """真实时钟"""
+    
+    def now(self):
+        return time.monotonic()
+    
+    def sleep(self, seconds):
+        if seconds > 0:
+            time.sleep(seconds)
+
+
+class VirtualClock:
+    """虚拟时钟：sleep() 直接推进时间，不真正等待"""
+    
+    def __init__(self, start=0.0):
+        self.current = start
+        self.lock = threading.Lock()
+    
+    def now(self):
+        return self.current
+    
+    def sleep(self, seconds):
+        self.advance(seconds)
+    
+    def advance(self, seconds):
+        """推进时间"""
+        with self.lock:
+            self.current += max(0.0, seconds)
+    
+    def set(self, when):
+        """把时间设为 when（不会倒退）"""
+        with self.lock:
+            self.current = max(self.current, when)
+
+
+class Deadline:
+    """一个已登记的截止时间"""
+    
+    __slots__ = ('when', 'key', 'callback', 'cancelled')
+    
+    def __init__(self, when, key, callback):
+        self.when = when
+        self.key = key
+        self.callback = callback
+        self.cancelled = False
+
+
+class DeadlineScheduler:
+    """截止时间调度器（最小堆，线程安全）"""
+    
+    def __init__(self, clock=None):
+        """
+        Args:
+            clock: 时钟（默认 MonotonicClock）
+        """
+        self.clock = clock or MonotonicClock()
+        self.heap = []      # [(when, seq, Deadline)]
+        self.by_key = {}    # {key: Deadline}，同一 key 只保留最新的一个
+        self.counter = itertools.count()
+        self.stale = 0      # 堆中已取消、尚未弹出的条目数
+        self.lock = threading.Lock()
+    
+    def schedule(self, delay, callback, key=None):
+        """
+        登记截止时间；key 已存在时替换原来的（例如每次扫描后重新计算游戏超时）
+        
+        Args:
+            delay: 距现在的秒数
+            callback: 到期时调用 callback(deadline)
+            key: 标识，如 (桌号, 'game')
+        
+        Returns:
+            Deadline: 登记的截止时间
+        """
+        deadline = Deadline(self.clock.now() + delay, key, callback)
+        with self.lock:
+            if key is not None:
+                self._cancel_locked(self.by_key.get(key))
+                self.by_key[key] = deadline
+            heapq.heappush(self.heap, (deadline.when, next(self.counter), deadline))
+            self._compact_locked()
+        return deadline
+    
+    def cancel(self, key):
+        """
+        取消截止时间
+        
+        Args:
+            key: 标识或 Deadline
+        
+        Returns:
+            bool: 是否有被取消的截止时间
+        """
+        with self.lock:
+            deadline = key if isinstance(key, Deadline) else self.by_key.get(key)
+            return self._cancel_locked(deadline)
+    
+    def _cancel_locked(self, deadline):
+        if deadline is None or deadline.cancelled:
+            return False
+        deadline.cancelled = True
+        self.stale += 1
+        if self.by_key.get(deadline.key) is deadline:
+            del self.by_key[deadline.key]
+        return True
+    
+    def _compact_locked(self):
+        """已取消的条目超过一半时重建堆，避免频繁重新登记时堆无限增长"""
+        if self.stale > 64 and self.stale * 2 > len(self.heap):
+            self.heap = [item for item in self.heap if not item[2].cancelled]
+            heapq.heapify(self.heap)
+            self.stale = 0
+    
+    def _peek_locked(self):
+        """堆顶的有效条目（顺带弹出已取消的）"""
+        heap = self.heap
+        while heap and heap[0][2].cancelled:
+            heapq.heappop(heap)
+            self.stale -= 1
+        return heap[0][2] if heap else None
+    
+    def remaining(self, key):
+        """
+        距截止时间的秒数
+        
+        Returns:
+            float: 秒数（已过期为0），未登记时返回None
+        """
+        with self.lock:
+            deadline = self.by_key.get(key)
+        if deadline is None:
+            return None
+        return max(0.0, deadline.when - self.clock.now())
+    
+    def next_deadline(self):
+        """最早的截止时间（时钟读数），没有时返回None"""
+        with self.lock:
+            deadline = self._peek_locked()
+        return deadline.when if deadline else None
+    
+    def time_until_next(self, default=None):
+        """
+        距最早截止时间的秒数
+        
+        Args:
+            default: 没有截止时间时的返回值
+        """
+        when = self.next_deadline()
+        if when is None:
+            return default
+        return max(0.0, when - self.clock.now())
+    
+    def run_due(self):
+        """
+        执行所有已到期的回调（在调用线程中执行，回调可重新登记）
+        
+        Returns:
+            int: 执行的回调数
+        """
+        fired = 0
+        while True:
+            with self.lock:
+                deadline = self._peek_locked()
+                if deadline is None or deadline.when > self.clock.now():
+                    return fired
+                heapq.heappop(self.heap)
+                if self.by_key.get(deadline.key) is deadline:
+                    del self.by_key[deadline.key]
+            fired += 1
+            try:
+                deadline.callback(deadline)
+            except Exception as e:
+                logger.error(f"定时回调出错 ({deadline.key}): {e}")
+    
+    def run_until(self, when):
+        """
+        虚拟时钟专用：按顺序跳到每个截止时间并执行回调，直到时钟到达 when
+        
+        Returns:
+            int: 执行的回调数
+        """
+        fired = 0
+        while True:
+            next_when = self.next_deadline()
+            if next_when is None or next_when > when:
+                self.clock.set(when)
+                return fired + self.run_due()
+            self.clock.set(next_when)
+            fired += self.run_due()
+    
+    def __len__(self):
+        with self.lock:
+            return len(self.heap) - self.stale
@@ -0,0 +1,180 @@
+# dual_serial_manager.py
+"""
+双扫描枪热备
+同一张桌接主、备两把扫描枪，两路同时读取:
+    - 哪一路先扫到就先交付，另一路在去重窗口内报告的同一张牌被丢弃，
+      任何一路故障都不会丢牌或增加延迟
+    - 当前主用设备断开，或连续若干张牌只有另一路扫到（主用设备静默）时切换主用设备，
+      切换只影响状态显示和指标，不中断发牌
+对外接口与 SerialManager 一致，可直接替换
+"""
+
+import time
+import threading
+import logging
+from functools import partial
+
+from config import SCAN_QUEUE_CAPACITY, SCAN_QUEUE_POLICY, SCAN_QUEUE_BLOCK_TIMEOUT
+from serial_manager import SerialManager, SPILL_RECORD_TYPES
+from scan_queue import ScanQueue
+from event_journal import RAW_SCAN, SCAN_CLEARED
+from metrics import SCANNER_FAILOVERS, DUPLICATE_SCANS
+
+logger = logging.getLogger(__name__)
+
+
+class DualSerialManager:
+    """主备双扫描枪串口管理器"""
+    
+    def __init__(self, primary_port, backup_port, baudrate, dedup_window=0.5, silence_threshold=2,
+                 decoders=(None, None)):
+        """
+        初始化
+        
+        Args:
+            primary_port: 主扫描枪串口号
+            backup_port: 备用扫描枪串口号
+            baudrate: 波特率
+            dedup_window: 去重窗口（秒），两路在此时间内报告的同一张牌只交付一次
+            silence_threshold: 连续多少张牌只有备用设备扫到时判定主用设备静默
+            decoders: (主, 备) 扫描枪协议解码器名称，None 时按串口取配置
+        """
+        self.port = primary_port
+        self.ports = (primary_port, backup_port)
+        self.managers = [
+            SerialManager(port, baudrate, sink=partial(self._on_scan, index), decoder=decoders[index])
+            for index, port in enumerate(self.ports)
+        ]
+        self.dedup_window = dedup_window
+        self.silence_threshold = silence_threshold
+        self.data_queue = ScanQueue(SCAN_QUEUE_CAPACITY, SCAN_QUEUE_POLICY, SCAN_QUEUE_BLOCK_TIMEOUT,
+                                    name=primary_port, spill=self._spill)
+        self.last_entry = None
+        self.lock = threading.Lock()
+        self.recent = []          # 已交付、等待另一路确认的扫描 [(卡片代码, 来源, 时间)]
+        self.missed = 0           # 主用设备连续漏扫的张数
+        self.active = 0           # 当前主用设备 (0 主, 1 备)
+        self.tracer = None
+        self.last_trace = None
+        self.journal = None
+    
+    @property
+    def active_port(self):
+        """当前主用设备的串口号"""
+        return self.ports[self.active]
+    
+    def start_reading(self):
+        """启动两路读取，至少一路成功即可"""
+        started = [manager.start_reading() for manager in self.managers]
+        if not started[0]:
+            logger.warning(f"主扫描枪启动失败: {self.ports[0]}")
+        if not started[1]:
+            logger.warning(f"备用扫描枪启动失败: {self.ports[1]}")
+        if started[0] or started[1]:
+            self._check_active()
+            return True
+        return False
+    
+    def _on_scan(self, source, data, arrival_ns):
+        """读取线程回调：去重后放入数据队列"""
+        if self.journal:
+            self.journal.append(RAW_SCAN, data)
+        
+        now = time.monotonic()
+        with self.lock:
+            self._expire(now)
+            for i, (code, other, ts) in enumerate(self.recent):
+                if code == data and other != source:
+                    # 另一路已经交付过这张牌；两路都扫到，说明主用设备正常
+                    del self.recent[i]
+                    DUPLICATE_SCANS.inc(port=self.ports[source])
+                    self.missed = 0
+                    logger.debug("丢弃重复扫描: %s (%s)", data, self.ports[source])
+                    return
+            self.recent.append((data, source, now))
+        
+        trace = None
+        if self.tracer:
+            trace = self.tracer.start(data, arrival_ns)
+            trace.mark('enqueue')
+        self.data_queue.put(data, arrival_ns, trace)
+    
+    def _spill(self, entry, reason):
+        """被丢弃的扫描写入事件日志"""
+        if self.journal:
+            self.journal.append(SPILL_RECORD_TYPES.get(reason, SCAN_CLEARED), f"#{entry.seq} {entry.data}")
+    
+    def _expire(self, now):
+        """清理超出去重窗口的扫描，统计主用设备漏扫（调用方持有锁）"""
+        while self.recent and now - self.recent[0][2] > self.dedup_window:
+            code, source, ts = self.recent.pop(0)
+            if source == self.active:
+                # 另一路没有扫到，不计入主用设备的漏扫
+                continue
+            self.missed += 1
+            if self.missed >= self.silence_threshold:
+                self._failover(source, f"连续{self.missed}张牌只有备用设备扫到")
+    
+    def _failover(self, target, reason):
+        """切换主用设备（调用方持有锁）"""
+        if target == self.active:
+            return
+        logger.warning(f"扫描枪切换: {self.ports[self.active]} -> {self.ports[target]} ({reason})")
+        self.active = target
+        self.missed = 0
+        SCANNER_FAILOVERS.inc(port=self.ports[target])
+    
+    def _check_active(self):
+        """主用设备断开而另一路正常时立即切换"""
+        with self.lock:
+            self._expire(time.monotonic())
+            other = 1 - self.active
+            if not self.managers[self.active].is_running() and self.managers[other].is_running():
+                self._failover(other, "主用设备已断开")
+    
+    def read_card(self, timeout=30):
+        """
+        读取一张卡片数据
+        
+        Args:
+            timeout: 超时时间（秒）
+        
+        Returns:
+            str: 卡片代码，如 'D12'
+        """
+        self._check_active()
+        entry = self.data_queue.get(timeout=timeout)
+        self.last_entry = entry
+        if entry is None:
+            self.last_trace = None
+            logger.debug("等待卡片超时 (%s秒)", timeout)
+            return None
+        self.last_trace = entry.trace
+        if entry.trace:
+            entry.trace.mark('dequeue')
+        logger.info("读取到卡片: %s (#%s)", entry.data, entry.seq)
+        return entry.data
+    
+    def clear_queue(self):
+        """清空数据队列（丢弃的扫描记录日志并写入事件日志）"""
+        discarded = self.data_queue.clear()
+        with self.lock:
+            self.recent.clear()
+        logger.debug("数据队列已清空 (丢弃%s条)", len(discarded))
+    
+    def is_running(self):
+        """至少一路扫描枪正常即视为运行中"""
+        return any(manager.is_running() for manager in self.managers)
+    
+    def get_queue_size(self):
+        """获取队列中待处理的数据数量"""
+        return self.data_queue.qsize()
+    
+    def get_queue_stats(self):
+        """获取队列统计（容量、策略、历史最大长度、各原因丢弃数量）"""
+        return self.data_queue.stats()
+    
+    def disconnect(self):
+        """断开两路串口"""
+        for manager in self.managers:
+            manager.disconnect()
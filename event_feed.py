@@ -0,0 +1,204 @@
+# event_feed.py
+"""
+事件推送服务
+在本地 TCP 端口上推送发牌、结果和超时重置事件，下游前端订阅即可，无需轮询数据库
+
+协议: 每条消息 = 4字节大端长度 + UTF-8 JSON
+    {"seq": 12, "type": "card", "ts": 1700000000.123, "data": {...}}
+每个订阅者有独立的有界缓冲，缓冲满时丢弃最旧的消息，客户端可根据 seq 跳号发现丢失
+"""
+
+import json
+import time
+import socket
+import struct
+import threading
+import logging
+from collections import deque
+from metrics import EVENT_FEED_DROPPED
+
+logger = logging.getLogger(__name__)
+
+HEADER = struct.Struct('>I')
+
+# 事件类型
+EVENT_CARD = 'card'
+EVENT_ROUND_COMPLETE = 'round_complete'
+EVENT_TIMEOUT_RESET = 'timeout_reset'
+
+
+class _Subscriber:
+    """单个订阅连接"""
+    
+    def __init__(self, conn, address, buffer_size):
+        self.conn = conn
+        self.address = address
+        self.buffer = deque(maxlen=buffer_size)
+        self.condition = threading.Condition()
+        self.closed = False
+        self.dropped = 0
+    
+    def offer(self, message):
+        """放入一条消息（不阻塞，缓冲满时挤掉最旧的）"""
+        with self.condition:
+            if len(self.buffer) == self.buffer.maxlen:
+                self.dropped += 1
+                EVENT_FEED_DROPPED.inc()
+            self.buffer.append(message)
+            self.condition.notify()
+    
+    def close(self):
+        """关闭连接"""
+        with self.condition:
+            self.closed = True
+            self.condition.notify()
+        try:
+            self.conn.close()
+        except OSError:
+            pass
+    
+    def send_loop(self, on_exit):
+        """发送循环（在订阅者自己的线程中运行）"""
+        try:
+            while True:
+                with self.condition:
+                    while not self.buffer and not self.closed:
+                        self.condition.wait()
+                    if self.closed:
+                        break
+                    messages = list(self.buffer)
+                    self.buffer.clear()
+                self.conn.sendall(b''.join(messages))
+        except OSError as e:
+            logger.info(f"订阅者断开: {self.address} ({e})")
+        finally:
+            self.close()
+            on_exit(self)
+
+
+class EventFeedServer:
+    """事件推送服务器"""
+    
+    def __init__(self, host='127.0.0.1', port=9109, buffer_size=256):
+        """
+        初始化推送服务
+        
+        Args:
+            host: 监听地址
+            port: 监听端口
+            buffer_size: 每个订阅者的缓冲消息数
+        """
+        self.host = host
+        self.port = port
+        self.buffer_size = buffer_size
+        self.server_socket = None
+        self.accept_thread = None
+        self.subscribers = set()
+        self.lock = threading.Lock()
+        self.seq = 0
+        self.running = False
+    
+    def start(self):
+        """启动服务"""
+        try:
+            self.server_socket = socket.create_server((self.host, self.port))
+        except OSError as e:
+            logger.error(f"事件推送服务启动失败: {e}")
+            return False
+        
+        self.running = True
+        self.accept_thread = threading.Thread(target=self._accept_loop, name='event-feed')
+        self.accept_thread.daemon = True
+        self.accept_thread.start()
+        logger.info(f"事件推送服务已启动: tcp://{self.host}:{self.port}")
+        return True
+    
+    def _accept_loop(self):
+        """接受订阅连接"""
+        while self.running:
+            try:
+                conn, address = self.server_socket.accept()
+            except OSError:
+                break
+            conn.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+            subscriber = _Subscriber(conn, address, self.buffer_size)
+            with self.lock:
+                self.subscribers.add(subscriber)
+            thread = threading.Thread(target=subscriber.send_loop, args=(self._remove,),
+                                      name=f'event-feed-{address[1]}')
+            thread.daemon = True
+            thread.start()
+            logger.info(f"新的订阅者: {address}")
+    
+    def _remove(self, subscriber):
+        with self.lock:
+            self.subscribers.discard(subscriber)
+    
+    def publish(self, event_type, **data):
+        """
+        发布事件（不阻塞调用线程）
+        
+        Args:
+            event_type: 事件类型 (card, round_complete, timeout_reset)
+            **data: 事件数据
+        """
+        with self.lock:
+            self.seq += 1
+            if not self.subscribers:
+                return
+            subscribers = list(self.subscribers)
+            payload = json.dumps({
+                'seq': self.seq,
+                'type': event_type,
+                'ts': time.time(),
+                'data': data,
+            }, ensure_ascii=False).encode('utf-8')
+        message = HEADER.pack(len(payload)) + payload
+        for subscriber in subscribers:
+            subscriber.offer(message)
+    
+    def subscriber_count(self):
+        """当前订阅者数量"""
+        with self.lock:
+            return len(self.subscribers)
+    
+    def stop(self):
+        """停止服务并断开所有订阅者"""
+        self.running = False
+        if self.server_socket:
+            try:
+                self.server_socket.close()
+            except OSError:
+                pass
+            self.server_socket = None
+        with self.lock:
+            subscribers = list(self.subscribers)
+            self.subscribers.clear()
+        for subscriber in subscribers:
+            subscriber.close()
+        logger.info("事件推送服务已停止")
+
+
+def subscribe(host='127.0.0.1', port=9109, timeout=None):
+    """
+    订阅事件流（客户端辅助函数）
+    
+    Args:
+        host: 服务地址
+        port: 服务端口
+        timeout: 套接字超时（秒）
+    
+    Yields:
+        dict: 事件
+    """
+    with socket.create_connection((host, port), timeout=timeout) as conn:
+        stream = conn.makefile('rb')
+        while True:
+            header = stream.read(HEADER.size)
+            if len(header) < HEADER.size:
+                return
+            (length,) = HEADER.unpack(header)
+            payload = stream.read(length)
+            if len(payload) < length:
+                return
+            yield json.loads(payload.decode('utf-8'))
@@ -0,0 +1,400 @@
+# event_journal.py
+"""
+事件日志（审计用）
+以定长记录追加写入内存映射文件，记录所有原始扫描、有效卡片、牌局边界和数据库提交结果；
+另有按局号/靴号的稀疏索引文件，便于争议时快速定位，流式读取不需要把整个文件载入内存
+
+文件格式:
+    头部 64 字节: 魔数、版本、记录长度、已提交记录数
+    记录 64 字节: 见 RECORD 定义
+索引文件 (<日志>.idx): 每局一条 (局号, 靴号, 记录序号)
+"""
+
+import os
+import sys
+import mmap
+import time
+import struct
+import argparse
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+MAGIC = b'BJLJRNL1'
+VERSION = 1
+
+# 头部: 魔数, 版本, 记录长度, 已提交记录数
+HEADER = struct.Struct('<8sHHxxxxQ40x')
+# 记录: 序号, 时间戳, 类型, 位置, 状态, 局号, 靴号, 桌号, 内容
+RECORD = struct.Struct('<QdBBbxII8s24s4x')
+# 索引: 局号, 靴号, 记录序号
+INDEX_ENTRY = struct.Struct('<IIQ')
+
+# 记录类型
+RAW_SCAN = 1        # 串口收到的原始扫描
+CARD_ACCEPTED = 2   # 校验通过并计入牌局的卡片
+ROUND_START = 3     # 开局
+ROUND_END = 4       # 一局结束（内容为结果摘要）
+DB_COMMIT = 5       # 数据库提交结果（状态: 1成功 0失败）
+TIMEOUT_RESET = 6   # 超时重置
+SHOE_START = 7      # 换靴
+SCAN_SPILLED = 8    # 扫描队列满，未交付的扫描（内容为 #序号 卡片代码）
+SCAN_CLEARED = 9    # 清空扫描队列时丢弃的扫描（内容同上）
+
+RECORD_TYPE_NAMES = {
+    RAW_SCAN: 'raw_scan',
+    CARD_ACCEPTED: 'card',
+    ROUND_START: 'round_start',
+    ROUND_END: 'round_end',
+    DB_COMMIT: 'db_commit',
+    TIMEOUT_RESET: 'timeout_reset',
+    SHOE_START: 'shoe_start',
+    SCAN_SPILLED: 'scan_spilled',
+    SCAN_CLEARED: 'scan_cleared',
+}
+
+# 位置编码（0 表示无位置）
+POSITION_CODES = {
+    'xian_1': 1, 'zhuang_1': 2, 'xian_2': 3, 'zhuang_2': 4, 'xian_3': 5, 'zhuang_3': 6,
+}
+POSITION_NAMES = {code: name for name, code in POSITION_CODES.items()}
+
+STATUS_NONE = -1
+STATUS_FAIL = 0
+STATUS_OK = 1
+
+
+def _encode_text(text, size):
+    """编码为定长字节串（超长截断）"""
+    return (text or '').encode('utf-8')[:size]
+
+
+def _decode_text(raw):
+    """定长字节串解码为文本"""
+    return raw.rstrip(b'\x00').decode('utf-8', errors='replace')
+
+
+def decode_record(index, values):
+    """
+    将解包后的记录转换为字典
+    
+    Args:
+        index: 记录序号（从0开始）
+        values: RECORD.unpack 的结果
+    
+    Returns:
+        dict: 记录
+    """
+    seq, ts, record_type, position, status, round_no, shoe_no, table_id, payload = values
+    return {
+        'index': index,
+        'seq': seq,
+        'ts': ts,
+        'type': RECORD_TYPE_NAMES.get(record_type, str(record_type)),
+        'position': POSITION_NAMES.get(position, ''),
+        'status': status,
+        'round_no': round_no,
+        'shoe_no': shoe_no,
+        'table_id': _decode_text(table_id),
+        'payload': _decode_text(payload),
+    }
+
+
+class EventJournal:
+    """内存映射的追加写事件日志（线程安全）"""
+    
+    def __init__(self, path, table_id, grow_records=65536):
+        """
+        初始化事件日志
+        
+        Args:
+            path: 日志文件路径
+            table_id: 桌号
+            grow_records: 文件每次扩容的记录数
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self.table_id = _encode_text(str(table_id), 8)
+        self.grow_bytes = grow_records * RECORD.size
+        self.lock = threading.Lock()
+        self.file = None
+        self.mm = None
+        self.index_file = None
+        self.count = 0
+        self.round_no = 0
+        self.shoe_no = 0
+    
+    def open(self):
+        """打开（或创建）日志文件"""
+        try:
+            exists = os.path.exists(self.path) and os.path.getsize(self.path) >= HEADER.size
+            self.file = open(self.path, 'r+b' if exists else 'w+b')
+            if not exists:
+                self.file.truncate(HEADER.size + self.grow_bytes)
+            self.mm = mmap.mmap(self.file.fileno(), 0)
+            
+            if exists:
+                magic, version, record_size, count = HEADER.unpack_from(self.mm, 0)
+                if magic != MAGIC or record_size != RECORD.size:
+                    raise ValueError(f"不是有效的事件日志文件: {self.path}")
+                self.count = self._recover_count(count)
+            else:
+                self.count = 0
+                self._write_header()
+            
+            self.index_file = open(self.index_path, 'ab')
+            self._load_last_round()
+            logger.info(f"事件日志已打开: {self.path} (已有{self.count}条记录, 第{self.round_no}局)")
+            return True
+        except Exception as e:
+            logger.error(f"打开事件日志失败: {e}")
+            self.close()
+            return False
+    
+    def _recover_count(self, count):
+        """头部计数之后若有已写入但未更新计数的记录（进程在两步之间退出），一并恢复"""
+        capacity = (len(self.mm) - HEADER.size) // RECORD.size
+        while count < capacity:
+            seq = struct.unpack_from('<Q', self.mm, HEADER.size + count * RECORD.size)[0]
+            if seq != count + 1:
+                break
+            count += 1
+        return count
+    
+    def _load_last_round(self):
+        """从最后一条记录恢复局号、靴号"""
+        if self.count:
+            values = RECORD.unpack_from(self.mm, HEADER.size + (self.count - 1) * RECORD.size)
+            self.round_no, self.shoe_no = values[5], values[6]
+    
+    def _write_header(self):
+        HEADER.pack_into(self.mm, 0, MAGIC, VERSION, RECORD.size, self.count)
+    
+    def _ensure_capacity(self):
+        """空间不足时扩容并重新映射"""
+        needed = HEADER.size + (self.count + 1) * RECORD.size
+        if needed <= len(self.mm):
+            return
+        new_size = len(self.mm) + self.grow_bytes
+        self.mm.flush()
+        self.mm.close()
+        self.file.truncate(new_size)
+        self.mm = mmap.mmap(self.file.fileno(), new_size)
+    
+    def append(self, record_type, payload='', position=None, status=STATUS_NONE):
+        """
+        追加一条记录
+        
+        Args:
+            record_type: 记录类型
+            payload: 内容（卡片代码、原始扫描或结果摘要，最长24字节）
+            position: 位置 (xian_1 ... zhuang_3)
+            status: 状态
+        
+        Returns:
+            int: 记录序号，日志未打开时返回-1
+        """
+        with self.lock:
+            if not self.mm:
+                return -1
+            self._ensure_capacity()
+            index = self.count
+            RECORD.pack_into(
+                self.mm, HEADER.size + index * RECORD.size,
+                index + 1, time.time(), record_type, POSITION_CODES.get(position, 0), status,
+                self.round_no, self.shoe_no, self.table_id, _encode_text(payload, 24)
+            )
+            # 先写记录再更新计数，计数只会落后不会超前
+            self.count = index + 1
+            self._write_header()
+            return index
+    
+    def begin_round(self):
+        """
+        记录开局并写入稀疏索引
+        
+        Returns:
+            int: 日志中的局号（跨进程重启连续递增）
+        """
+        with self.lock:
+            self.round_no += 1
+            round_no = self.round_no
+        index = self.append(ROUND_START)
+        if index >= 0:
+            self.index_file.write(INDEX_ENTRY.pack(round_no, self.shoe_no, index))
+            self.index_file.flush()
+        return round_no
+    
+    def end_round(self, summary):
+        """记录一局结束并刷盘"""
+        self.append(ROUND_END, summary)
+        self.flush()
+    
+    def new_shoe(self):
+        """记录换靴"""
+        with self.lock:
+            self.shoe_no += 1
+        self.append(SHOE_START)
+    
+    def flush(self):
+        """把映射内容刷到磁盘"""
+        with self.lock:
+            if self.mm:
+                self.mm.flush()
+    
+    def close(self):
+        """关闭日志"""
+        with self.lock:
+            if self.mm:
+                self.mm.flush()
+                self.mm.close()
+                self.mm = None
+            if self.file:
+                # 去掉预分配但未使用的空间
+                self.file.truncate(HEADER.size + self.count * RECORD.size)
+                self.file.close()
+                self.file = None
+            if self.index_file:
+                self.index_file.close()
+                self.index_file = None
+
+
+class JournalReader:
+    """事件日志流式读取器"""
+    
+    def __init__(self, path, chunk_records=4096):
+        """
+        初始化读取器
+        
+        Args:
+            path: 日志文件路径
+            chunk_records: 每次读取的记录数
+        """
+        self.path = path
+        self.index_path = path + '.idx'
+        self.chunk_records = chunk_records
+        with open(path, 'rb') as f:
+            magic, version, record_size, count = HEADER.unpack(f.read(HEADER.size))
+        if magic != MAGIC or record_size != RECORD.size:
+            raise ValueError(f"不是有效的事件日志文件: {path}")
+        self.count = count
+    
+    def load_index(self):
+        """
+        读取稀疏索引
+        
+        Returns:
+            list: [(局号, 靴号, 记录序号), ...]，按局号递增
+        """
+        try:
+            with open(self.index_path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            return []
+        usable = len(data) - len(data) % INDEX_ENTRY.size
+        return list(INDEX_ENTRY.iter_unpack(data[:usable]))
+    
+    def iter_records(self, start=0, stop=None, types=None):
+        """
+        按顺序流式读取记录
+        
+        Args:
+            start: 起始记录序号
+            stop: 结束记录序号（不含），默认到末尾
+            types: 只返回这些类型的记录（集合），默认全部
+        
+        Yields:
+            dict: 记录
+        """
+        stop = self.count if stop is None else min(stop, self.count)
+        buffer = bytearray(self.chunk_records * RECORD.size)
+        view = memoryview(buffer)
+        with open(self.path, 'rb') as f:
+            f.seek(HEADER.size + start * RECORD.size)
+            index = start
+            while index < stop:
+                want = min(self.chunk_records, stop - index) * RECORD.size
+                got = f.readinto(view[:want])
+                if not got:
+                    break
+                for values in RECORD.iter_unpack(view[:got - got % RECORD.size]):
+                    if types is None or values[2] in types:
+                        yield decode_record(index, values)
+                    index += 1
+    
+    def find_round(self, round_no):
+        """
+        通过索引定位某一局的记录范围
+        
+        Returns:
+            tuple: (起始序号, 结束序号)，找不到时返回None
+        """
+        entries = self.load_index()
+        lo, hi = 0, len(entries)
+        while lo < hi:
+            mid = (lo + hi) // 2
+            if entries[mid][0] < round_no:
+                lo = mid + 1
+            else:
+                hi = mid
+        if lo == len(entries) or entries[lo][0] != round_no:
+            return None
+        end = entries[lo + 1][2] if lo + 1 < len(entries) else self.count
+        return entries[lo][2], end
+    
+    def find_shoe(self, shoe_no):
+        """
+        通过索引定位某一靴的记录范围
+        
+        从该靴的换靴记录开始（包括换靴后、第一局开局前的原始扫描），到下一靴的换靴记录为止
+        
+        Returns:
+            tuple: (起始序号, 结束序号)，找不到时返回None
+        """
+        entries = self.load_index()
+        rows = [i for i, entry in enumerate(entries) if entry[1] == shoe_no]
+        if not rows:
+            return None
+        first, last = rows[0], rows[-1]
+        # 索引只记录开局；换靴记录在上一局开局与本靴第一局开局之间
+        start = entries[first][2]
+        shoe_start = self._find_shoe_start(shoe_no, entries[first - 1][2] if first else 0, start)
+        end = entries[last + 1][2] if last + 1 < len(entries) else self.count
+        next_shoe_start = self._find_shoe_start(shoe_no + 1, entries[last][2], end)
+        return (start if shoe_start is None else shoe_start), (end if next_shoe_start is None else next_shoe_start)
+    
+    def _find_shoe_start(self, shoe_no, start, stop):
+        """在 [start, stop) 中查找某一靴的换靴记录序号，没有时返回None"""
+        for record in self.iter_records(start, stop, types={SHOE_START}):
+            if record['shoe_no'] == shoe_no:
+                return record['index']
+        return None
+
+
+def main():
+    """命令行查看事件日志"""
+    parser = argparse.ArgumentParser(description='百家乐事件日志查看')
+    parser.add_argument('path', help='事件日志文件')
+    parser.add_argument('--round', type=int, help='只显示指定局号')
+    parser.add_argument('--shoe', type=int, help='只显示指定靴号')
+    args = parser.parse_args()
+    
+    reader = JournalReader(args.path)
+    start, stop = 0, None
+    if args.round is not None or args.shoe is not None:
+        found = reader.find_round(args.round) if args.round is not None else reader.find_shoe(args.shoe)
+        if not found:
+            print("索引中找不到指定的局/靴")
+            return 1
+        start, stop = found
+    
+    for record in reader.iter_records(start, stop):
+        print(f"{record['index']:>10} {time.strftime('%Y-%m-%d %H:%M:%S', time.localtime(record['ts']))} "
+              f"桌{record['table_id']} 靴{record['shoe_no']} 局{record['round_no']} "
+              f"{record['type']:<13} {record['position']:<8} {record['status']:>2} {record['payload']}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,247 @@
+# export_results.py
+"""
+牌局历史导出
+通过服务端游标（不缓冲）分批读取 tu_bjl_result，解码结果并计算点数、胜负、天牌、对子，
+按分片写出列式文件，内存占用只与分片大小有关，与表大小无关
+
+输出列: id, table_id, player1-3, banker1-3（牌序号，-1 无牌，-2 无法识别）,
+       player_total, banker_total, winner(1闲 2庄 3和), natural, player_pair, banker_pair
+       （含无法识别的牌时这6列均为 -1，不能当作有效的点数和胜负）
+
+用法:
+    python export_results.py --out export/ --format csv
+    python export_results.py --out export/ --format npz --table 1 --since-id 100000
+"""
+
+import os
+import sys
+import csv
+import time
+import argparse
+import logging
+from array import array
+
+import pymysql
+
+from database_manager import DatabaseManager
+from card_codec import decode_result, evaluate, SLOT_NAMES
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+logger = logging.getLogger(__name__)
+
+COLUMNS = ('id', 'table_id') + SLOT_NAMES + (
+    'player_total', 'banker_total', 'winner', 'natural', 'player_pair', 'banker_pair'
+)
+
+# 含无法识别的牌时汇总列的取值
+UNKNOWN_SUMMARY = (-1,) * 6
+
+
+def stream_rows(db, table_id=None, since_id=0, until_id=None, chunk_size=5000):
+    """
+    用服务端游标流式读取结果表
+    
+    Args:
+        db: 已连接的 DatabaseManager
+        table_id: 只导出指定桌号（可选）
+        since_id: 只导出 id 大于该值的记录
+        until_id: 只导出 id 不大于该值的记录（可选）
+        chunk_size: 每次 fetchmany 的行数
+    
+    Yields:
+        tuple: (id, tableId, result)
+    """
+    query = "SELECT id, tableId, result FROM tu_bjl_result WHERE id > %s"
+    params = [since_id]
+    if until_id is not None:
+        query += " AND id <= %s"
+        params.append(until_id)
+    if table_id is not None:
+        query += " AND tableId = %s"
+        params.append(str(table_id))
+    query += " ORDER BY id"
+    
+    cursor = db.connection.cursor(pymysql.cursors.SSCursor)
+    try:
+        cursor.execute(query, params)
+        while True:
+            rows = cursor.fetchmany(chunk_size)
+            if not rows:
+                break
+            yield from rows
+    finally:
+        # 未读完就关闭时 SSCursor 会读掉剩余数据，保证连接可继续使用
+        cursor.close()
+
+
+def convert_row(row):
+    """
+    一行结果转换为导出列
+    
+    Returns:
+        tuple: 按 COLUMNS 顺序，结果无法解析时返回None
+    """
+    result_id, table_id, result = row
+    try:
+        cards = decode_result(result)
+    except (ValueError, TypeError, AttributeError) as e:
+        logger.warning(f"跳过无法解析的结果 id={result_id}: {e}")
+        return None
+    summary = evaluate(cards)
+    if summary is None:
+        return (result_id, table_id) + cards + UNKNOWN_SUMMARY
+    return (result_id, table_id) + cards + tuple(int(value) for value in summary)
+
+
+class CsvShardWriter:
+    """CSV 分片写出"""
+    
+    extension = 'csv'
+    
+    def __init__(self, directory, prefix, shard_rows):
+        self.directory = directory
+        self.prefix = prefix
+        self.shard_rows = shard_rows
+        self.shard = 0
+        self.rows_in_shard = 0
+        self.file = None
+        self.writer = None
+        self.paths = []
+    
+    def _path(self):
+        return os.path.join(self.directory, f'{self.prefix}_{self.shard:05d}.{self.extension}')
+    
+    def write(self, values):
+        if self.file is None:
+            path = self._path()
+            self.file = open(path, 'w', encoding='utf-8', newline='')
+            self.writer = csv.writer(self.file)
+            self.writer.writerow(COLUMNS)
+            self.paths.append(path)
+        self.writer.writerow(values)
+        self.rows_in_shard += 1
+        if self.rows_in_shard >= self.shard_rows:
+            self.flush()
+    
+    def flush(self):
+        """结束当前分片"""
+        if self.file:
+            self.file.close()
+            self.file = None
+            self.shard += 1
+            self.rows_in_shard = 0
+    
+    def close(self):
+        self.flush()
+
+
+class NpzShardWriter(CsvShardWriter):
+    """NumPy .npz 分片写出（每列一个数组，压缩保存）"""
+    
+    extension = 'npz'
+    
+    def __init__(self, directory, prefix, shard_rows):
+        super().__init__(directory, prefix, shard_rows)
+        self._reset_columns()
+    
+    def _reset_columns(self):
+        # 用 array 按列暂存，比逐行保存元组紧凑得多
+        self.columns = [array('q'), []] + [array('b') for _ in COLUMNS[2:]]
+    
+    def write(self, values):
+        for column, value in zip(self.columns, values):
+            column.append(value)
+        self.rows_in_shard += 1
+        if self.rows_in_shard >= self.shard_rows:
+            self.flush()
+    
+    def flush(self):
+        if not self.rows_in_shard:
+            return
+        arrays = {}
+        for name, column in zip(COLUMNS, self.columns):
+            if name == 'table_id':
+                arrays[name] = numpy.array(column, dtype=str)
+            else:
+                arrays[name] = numpy.frombuffer(column, dtype=numpy.int64 if name == 'id' else numpy.int8)
+        path = self._path()
+        numpy.savez_compressed(path, **arrays)
+        self.paths.append(path)
+        self.shard += 1
+        self.rows_in_shard = 0
+        self._reset_columns()
+
+
+def export(db, writer, table_id=None, since_id=0, until_id=None, chunk_size=5000, progress_every=50000):
+    """
+    导出结果表
+    
+    Returns:
+        tuple: (导出行数, 跳过行数, 最后一条 id)
+    """
+    exported = skipped = 0
+    last_id = since_id
+    started = time.monotonic()
+    for row in stream_rows(db, table_id, since_id, until_id, chunk_size):
+        values = convert_row(row)
+        last_id = row[0]
+        if values is None:
+            skipped += 1
+            continue
+        writer.write(values)
+        exported += 1
+        if exported % progress_every == 0:
+            elapsed = time.monotonic() - started
+            print(f"已导出 {exported} 行 (id ≤ {last_id}, {exported / elapsed:.0f} 行/秒)", file=sys.stderr)
+    writer.close()
+    return exported, skipped, last_id
+
+
+def main():
+    """命令行导出"""
+    parser = argparse.ArgumentParser(description='导出牌局历史 (tu_bjl_result)')
+    parser.add_argument('--out', default='export', help='输出目录')
+    parser.add_argument('--format', choices=['csv', 'npz'], default='csv', help='输出格式')
+    parser.add_argument('--prefix', default='results', help='分片文件名前缀')
+    parser.add_argument('--table', help='只导出指定桌号')
+    parser.add_argument('--since-id', type=int, default=0, help='只导出 id 大于该值的记录（增量导出）')
+    parser.add_argument('--until-id', type=int, help='只导出 id 不大于该值的记录')
+    parser.add_argument('--shard-rows', type=int, default=1000000, help='每个分片的行数')
+    parser.add_argument('--chunk', type=int, default=5000, help='每次从数据库读取的行数')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    if args.format == 'npz' and numpy is None:
+        print("❌ 导出 npz 需要安装 numpy (pip install numpy)，或改用 --format csv")
+        return 1
+    
+    os.makedirs(args.out, exist_ok=True)
+    writer_class = NpzShardWriter if args.format == 'npz' else CsvShardWriter
+    writer = writer_class(args.out, args.prefix, args.shard_rows)
+    
+    db = DatabaseManager()
+    if not db.connect():
+        print("❌ 数据库连接失败!")
+        return 1
+    
+    started = time.monotonic()
+    try:
+        exported, skipped, last_id = export(db, writer, args.table, args.since_id, args.until_id, args.chunk)
+    finally:
+        db.disconnect()
+    
+    elapsed = time.monotonic() - started
+    print(f"✅ 导出完成: {exported} 行，跳过 {skipped} 行，最后 id {last_id}，"
+          f"耗时 {elapsed:.1f}秒，{len(writer.paths)} 个文件")
+    for path in writer.paths:
+        print(f"   {path}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
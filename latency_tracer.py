@@ -0,0 +1,267 @@
+# latency_tracer.py
+"""
+延迟追踪器
+为每张扫描到的卡片记录各阶段时间戳，维护分阶段的滚动直方图，
+并可按需导出为 Chrome Trace Event 格式（可用 chrome://tracing 或 Perfetto 打开）
+"""
+
+import json
+import time
+import threading
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+# 卡片处理阶段（按发生顺序）
+STAGES = (
+    'arrival',    # 串口收到字节
+    'enqueue',    # 放入数据队列
+    'dequeue',    # read_card 取出
+    'validate',   # 卡片代码校验完成
+    'db_start',   # 开始写入数据库
+    'db_commit',  # 数据库提交完成
+    'display',    # 控制台显示完成
+)
+
+
+class LatencyHistogram:
+    """
+    HDR风格直方图
+    
+    按2的幂分段，每段内线性细分，相对误差约为 1/sub_bucket_half，
+    内存占用固定，记录操作为 O(1)
+    """
+    
+    def __init__(self, precision_bits=7, max_value=60_000_000):
+        """
+        初始化直方图
+        
+        Args:
+            precision_bits: 每段细分位数（7位约1.5%误差）
+            max_value: 可记录的最大值（微秒），超出按最大值计
+        """
+        self.sub_bucket_count = 1 << precision_bits
+        self.sub_bucket_half = self.sub_bucket_count >> 1
+        self.precision_bits = precision_bits
+        self.max_value = max_value
+        self.counts = [0] * (self._index_of(max_value) + 1)
+        self.total_count = 0
+        self.min_value = None
+        self.max_seen = 0
+    
+    def _index_of(self, value):
+        """计算数值所在的桶序号"""
+        shift = max(value.bit_length() - self.precision_bits, 0)
+        return shift * self.sub_bucket_half + (value >> shift)
+    
+    def _value_of(self, index):
+        """桶序号对应的数值上界"""
+        if index < self.sub_bucket_count:
+            return index
+        shift = index // self.sub_bucket_half - 1
+        mantissa = index - shift * self.sub_bucket_half
+        return ((mantissa + 1) << shift) - 1
+    
+    def record(self, value):
+        """
+        记录一个数值
+        
+        Args:
+            value: 非负整数（微秒）
+        """
+        value = min(max(int(value), 0), self.max_value)
+        self.counts[self._index_of(value)] += 1
+        self.total_count += 1
+        if self.min_value is None or value < self.min_value:
+            self.min_value = value
+        if value > self.max_seen:
+            self.max_seen = value
+    
+    def merge(self, other):
+        """合并另一个同规格直方图"""
+        for i, count in enumerate(other.counts):
+            if count:
+                self.counts[i] += count
+        self.total_count += other.total_count
+        if other.min_value is not None and (self.min_value is None or other.min_value < self.min_value):
+            self.min_value = other.min_value
+        self.max_seen = max(self.max_seen, other.max_seen)
+    
+    def percentile(self, pct):
+        """
+        获取百分位数值
+        
+        Args:
+            pct: 百分位 (0-100)
+        
+        Returns:
+            int: 数值（微秒），无数据时返回0
+        """
+        if self.total_count == 0:
+            return 0
+        target = max(1, int(self.total_count * pct / 100.0 + 0.5))
+        seen = 0
+        for i, count in enumerate(self.counts):
+            seen += count
+            if seen >= target:
+                return min(self._value_of(i), self.max_seen)
+        return self.max_seen
+    
+    def summary(self):
+        """获取统计摘要"""
+        return {
+            'count': self.total_count,
+            'min_us': self.min_value or 0,
+            'p50_us': self.percentile(50),
+            'p90_us': self.percentile(90),
+            'p99_us': self.percentile(99),
+            'p999_us': self.percentile(99.9),
+            'max_us': self.max_seen,
+        }
+
+
+class RollingHistogram:
+    """滚动窗口直方图：由若干时间片组成，过期时间片整体丢弃"""
+    
+    def __init__(self, window_seconds=60, slots=6):
+        """
+        初始化滚动直方图
+        
+        Args:
+            window_seconds: 窗口总时长（秒）
+            slots: 时间片数量
+        """
+        self.slot_seconds = max(window_seconds / slots, 0.001)
+        self.slots = deque(maxlen=slots)
+        self.current_slot_start = None
+    
+    def record(self, value, now=None):
+        """记录一个数值（微秒）"""
+        now = time.monotonic() if now is None else now
+        if self.current_slot_start is None or now - self.current_slot_start >= self.slot_seconds:
+            self.slots.append(LatencyHistogram())
+            self.current_slot_start = now
+        self.slots[-1].record(value)
+    
+    def snapshot(self):
+        """合并窗口内所有时间片"""
+        merged = LatencyHistogram()
+        for slot in self.slots:
+            merged.merge(slot)
+        return merged
+
+
+class CardTrace:
+    """单张卡片的追踪记录"""
+    
+    __slots__ = ('trace_id', 'card', 'stamps')
+    
+    def __init__(self, trace_id, card, arrival_ns):
+        self.trace_id = trace_id
+        self.card = card
+        self.stamps = [('arrival', arrival_ns)]
+    
+    def mark(self, stage):
+        """记录阶段时间戳"""
+        self.stamps.append((stage, time.perf_counter_ns()))
+
+
+class LatencyTracer:
+    """延迟追踪器（线程安全）"""
+    
+    def __init__(self, buffer_size=5000, window_seconds=60):
+        """
+        初始化追踪器
+        
+        Args:
+            buffer_size: 内存中保留的已完成追踪条数
+            window_seconds: 滚动直方图窗口（秒）
+        """
+        self.lock = threading.Lock()
+        self.next_id = 0
+        self.completed = deque(maxlen=buffer_size)
+        self.histograms = {stage: RollingHistogram(window_seconds) for stage in STAGES[1:]}
+        self.histograms['total'] = RollingHistogram(window_seconds)
+    
+    def start(self, card, arrival_ns):
+        """
+        开始追踪一张卡片（串口线程调用）
+        
+        Args:
+            card: 卡片代码
+            arrival_ns: 收到字节时的 perf_counter_ns
+        
+        Returns:
+            CardTrace: 追踪记录
+        """
+        with self.lock:
+            self.next_id += 1
+            return CardTrace(self.next_id, card, arrival_ns)
+    
+    def finish(self, trace):
+        """
+        结束追踪，计入各阶段直方图
+        
+        Args:
+            trace: 追踪记录
+        """
+        now = time.monotonic()
+        stamps = trace.stamps
+        with self.lock:
+            for (_, prev_ns), (stage, stage_ns) in zip(stamps, stamps[1:]):
+                histogram = self.histograms.get(stage)
+                if histogram:
+                    histogram.record((stage_ns - prev_ns) // 1000, now)
+            self.histograms['total'].record((stamps[-1][1] - stamps[0][1]) // 1000, now)
+            self.completed.append(trace)
+    
+    def summary(self):
+        """
+        获取各阶段延迟摘要
+        
+        Returns:
+            dict: {阶段: {count, p50_us, p99_us, ...}}
+        """
+        with self.lock:
+            return {stage: histogram.snapshot().summary() for stage, histogram in self.histograms.items()}
+    
+    def dump(self, path):
+        """
+        导出追踪到文件（Chrome Trace Event 格式）
+        
+        Args:
+            path: 输出文件路径
+        
+        Returns:
+            bool: 是否成功
+        """
+        with self.lock:
+            traces = list(self.completed)
+        
+        events = []
+        for trace in traces:
+            for (_, prev_ns), (stage, stage_ns) in zip(trace.stamps, trace.stamps[1:]):
+                events.append({
+                    'name': stage,
+                    'cat': 'card',
+                    'ph': 'X',
+                    'ts': prev_ns / 1000.0,
+                    'dur': (stage_ns - prev_ns) / 1000.0,
+                    'pid': 1,
+                    'tid': 1,
+                    'args': {'trace_id': trace.trace_id, 'card': trace.card},
+                })
+        
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({
+                    'traceEvents': events,
+                    'displayTimeUnit': 'ms',
+                    'otherData': {'stage_summary': self.summary()},
+                }, f, ensure_ascii=False)
+            logger.info(f"延迟追踪已导出: {path} ({len(traces)}条)")
+            return True
+        except Exception as e:
+            logger.error(f"导出延迟追踪失败: {e}")
+            return False
@@ -0,0 +1,172 @@
+# local_db.py
+"""
+本地数据库（sqlite3）
+与 DatabaseManager 接口相同的进程内数据库，SQL 语句照常由 DatabaseManager 执行
+（%s 占位符和 ON DUPLICATE KEY UPDATE 在这里转换），用于浸泡测试、压测和没有 MySQL 时的联调；
+可按比例模拟连接断开，走一遍重连和回滚路径
+"""
+
+import re
+import random
+import sqlite3
+import logging
+import threading
+from datetime import datetime
+
+from database_manager import DatabaseManager, PACKED_COLUMNS, STATS_TABLE_DDL, LEASE_TABLE_DDL
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = (
+    """CREATE TABLE IF NOT EXISTS tu_bjl_temp (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        tableId VARCHAR(32) NOT NULL,
+        position VARCHAR(16) NOT NULL,
+        card VARCHAR(16) NOT NULL
+    )""",
+    f"""CREATE TABLE IF NOT EXISTS tu_bjl_result (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        result TEXT NOT NULL,
+        tableId VARCHAR(32) NOT NULL,
+        {', '.join(f'{name} INTEGER NULL' for name in PACKED_COLUMNS)}
+    )""",
+    STATS_TABLE_DDL,
+    LEASE_TABLE_DDL,
+)
+
+_UPSERT_VALUES = re.compile(r'VALUES\((\w+)\)')
+
+sqlite3.register_adapter(datetime, lambda value: value.isoformat(' '))
+
+
+def translate(query):
+    """MySQL 语句转换为 sqlite3 语句"""
+    query = query.replace('%s', '?')
+    if 'ON DUPLICATE KEY UPDATE' in query:
+        head, tail = query.split('ON DUPLICATE KEY UPDATE', 1)
+        query = head + 'ON CONFLICT DO UPDATE SET' + _UPSERT_VALUES.sub(r'excluded.\1', tail)
+    return query
+
+
+class LocalCursor:
+    """游标（pymysql 游标的子集）"""
+    
+    def __init__(self, connection):
+        self.connection = connection
+        self.cursor = connection.store.cursor()
+    
+    def execute(self, query, params=()):
+        self.connection.check()
+        with self.connection.lock:
+            return self.cursor.execute(translate(query), tuple(params))
+    
+    def executemany(self, query, params):
+        self.connection.check()
+        with self.connection.lock:
+            return self.cursor.executemany(translate(query), [tuple(row) for row in params])
+    
+    def fetchone(self):
+        return self.cursor.fetchone()
+    
+    def fetchall(self):
+        return self.cursor.fetchall()
+    
+    @property
+    def rowcount(self):
+        return self.cursor.rowcount
+    
+    @property
+    def lastrowid(self):
+        return self.cursor.lastrowid
+    
+    def close(self):
+        self.cursor.close()
+
+
+class LocalConnection:
+    """一次连接（pymysql 连接的子集），断开后需重新 connect"""
+    
+    def __init__(self, manager):
+        self.manager = manager
+        self.store = manager.store
+        self.lock = manager.lock
+        self.closed = False
+    
+    def check(self):
+        """连接已断开时抛出异常；按比例模拟断开"""
+        if self.closed:
+            raise sqlite3.OperationalError("连接已断开")
+        if self.manager.drop_rate and self.manager.rng.random() < self.manager.drop_rate:
+            self.close()
+            self.manager.drops += 1
+            raise sqlite3.OperationalError("模拟连接断开")
+    
+    def cursor(self):
+        return LocalCursor(self)
+    
+    def ping(self, reconnect=False):
+        if self.closed:
+            raise sqlite3.OperationalError("连接已断开")
+    
+    def commit(self):
+        self.check()
+        with self.lock:
+            self.store.commit()
+    
+    def rollback(self):
+        if self.closed:
+            raise sqlite3.OperationalError("连接已断开")
+        with self.lock:
+            self.store.rollback()
+    
+    def close(self):
+        # 与 MySQL 一致：断开时未提交的修改作废
+        if not self.closed:
+            self.closed = True
+            with self.lock:
+                self.store.rollback()
+
+
+class LocalDatabaseManager(DatabaseManager):
+    """使用本地 sqlite3 的 DatabaseManager，数据在断开重连之间保留"""
+    
+    def __init__(self, path=':memory:', drop_rate=0.0, seed=None):
+        """
+        初始化本地数据库
+        
+        Args:
+            path: sqlite3 数据库文件（默认在内存中）
+            drop_rate: 每条语句模拟连接断开的概率
+            seed: 模拟断开用的随机种子
+        """
+        super().__init__({'host': 'local', 'port': path})
+        self.store = sqlite3.connect(path, check_same_thread=False)
+        self.lock = threading.Lock()
+        for ddl in SCHEMA:
+            self.store.execute(ddl)
+        self.store.commit()
+        self.drop_rate = drop_rate
+        self.rng = random.Random(seed)
+        self.drops = 0  # 已模拟的断开次数
+    
+    def connect(self):
+        """连接本地数据库"""
+        self.connection = LocalConnection(self)
+        self.cursor = self.connection.cursor()
+        self.is_connected = True
+        self.reconnect_count = 0
+        logger.info(f"本地数据库连接成功: {self.config['port']}")
+        return True
+    
+    def row_counts(self):
+        """
+        各表行数
+        
+        Returns:
+            dict: {表名: 行数}
+        """
+        counts = {}
+        with self.lock:
+            for table in ('tu_bjl_temp', 'tu_bjl_result'):
+                counts[table] = self.store.execute(f"SELECT COUNT(*) FROM {table}").fetchone()[0]
+        return counts
@@ -0,0 +1,142 @@
+# log_setup.py
+"""
+日志配置
+业务线程只把日志记录放入有界队列，格式化和输出都由后台监听线程完成；
+可选输出 JSON Lines 滚动文件，并支持按模块覆盖日志级别
+"""
+
+import json
+import queue
+import logging
+import logging.handlers
+from datetime import datetime
+
+from config import (
+    LOG_LEVEL, LOG_FORMAT, LOG_QUEUE_SIZE, LOG_JSON_FILE,
+    LOG_JSON_MAX_BYTES, LOG_JSON_BACKUP_COUNT, LOG_LEVEL_OVERRIDES
+)
+from metrics import LOG_RECORDS_DROPPED
+
+# 可以延迟到监听线程格式化的参数类型；其余参数（dict、list 等）可能在输出前被业务线程修改
+IMMUTABLE_ARG_TYPES = (str, int, float, bool, bytes, type(None))
+
+
+class JsonLinesFormatter(logging.Formatter):
+    """每条日志输出为一行 JSON"""
+    
+    def format(self, record):
+        entry = {
+            'ts': datetime.fromtimestamp(record.created).isoformat(timespec='milliseconds'),
+            'level': record.levelname,
+            'logger': record.name,
+            'thread': record.threadName,
+            'message': record.getMessage(),
+        }
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            entry['exc'] = record.exc_text
+        return json.dumps(entry, ensure_ascii=False)
+
+
+class NonBlockingQueueHandler(logging.handlers.QueueHandler):
+    """
+    不阻塞的队列日志处理器
+    
+    与标准 QueueHandler 不同，参数都是不可变类型时入队前不做消息格式化（交给监听线程），
+    队列满时直接丢弃并计数，不会卡住业务线程
+    """
+    
+    def __init__(self, log_queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+    
+    def prepare(self, record):
+        # 异常堆栈必须在当前线程渲染，其余格式化延迟到监听线程
+        if record.exc_info:
+            record.exc_text = logging.Formatter().formatException(record.exc_info)
+            record.exc_info = None
+        # 可变参数在当前线程渲染，否则监听线程输出的是之后被修改的状态
+        args = record.args
+        if args and (not isinstance(args, tuple) or not all(isinstance(arg, IMMUTABLE_ARG_TYPES) for arg in args)):
+            record.msg = record.getMessage()
+            record.args = None
+        return record
+    
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+            LOG_RECORDS_DROPPED.inc()
+
+
+class FlushingQueueListener(logging.handlers.QueueListener):
+    """
+    停止时不丢日志的队列监听器
+    
+    标准实现用 put_nowait 放入结束标记，队列满时抛出 queue.Full，退出流程被异常打断且队列中的日志全部丢失；
+    这里阻塞等待监听线程腾出空位，队列中剩余的日志输出完后再结束
+    """
+    
+    def __init__(self, log_queue, *handlers, respect_handler_level=False, stop_timeout=5):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.stop_timeout = stop_timeout
+    
+    def enqueue_sentinel(self):
+        self.queue.put(self._sentinel, timeout=self.stop_timeout)
+    
+    def stop(self):
+        """停止监听线程（输出阻塞导致超时仍放不进结束标记时放弃剩余日志，不抛出异常）"""
+        if not self._thread:
+            return
+        try:
+            super().stop()
+        except queue.Full:
+            self._thread = None
+
+
+def setup_logging(level=LOG_LEVEL, fmt=LOG_FORMAT, json_file=LOG_JSON_FILE,
+                  level_overrides=LOG_LEVEL_OVERRIDES, queue_size=LOG_QUEUE_SIZE):
+    """
+    配置全局日志
+    
+    Args:
+        level: 根日志级别，如 'INFO'
+        fmt: 控制台日志格式
+        json_file: JSON Lines 日志文件路径（None表示不写文件）
+        level_overrides: 按模块覆盖的日志级别，如 {'database_manager': 'WARNING'}
+        queue_size: 日志队列容量
+    
+    Returns:
+        FlushingQueueListener: 已启动的监听器，程序退出前调用 stop() 输出剩余日志
+    """
+    console_handler = logging.StreamHandler()
+    console_handler.setFormatter(logging.Formatter(fmt))
+    handlers = [console_handler]
+    
+    if json_file:
+        file_handler = logging.handlers.RotatingFileHandler(
+            json_file,
+            maxBytes=LOG_JSON_MAX_BYTES,
+            backupCount=LOG_JSON_BACKUP_COUNT,
+            encoding='utf-8'
+        )
+        file_handler.setFormatter(JsonLinesFormatter())
+        handlers.append(file_handler)
+    
+    log_queue = queue.Queue(maxsize=queue_size)
+    queue_handler = NonBlockingQueueHandler(log_queue)
+    
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    root.addHandler(queue_handler)
+    root.setLevel(getattr(logging, level))
+    
+    for name, override_level in (level_overrides or {}).items():
+        logging.getLogger(name).setLevel(getattr(logging, override_level))
+    
+    listener = FlushingQueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
@@ -3,38 +3,96 @@
 百家乐发牌系统主程序 - 永久循环版本
 """
 
-import sys
 import time
+_IMPORT_STARTED = time.perf_counter()  # 启动计时起点（含模块导入）
+
+import sys
+import signal
 import logging
 import argparse
+import threading
+from collections import deque
 from datetime import datetime
 
 from config import (
-    LOG_LEVEL, LOG_FORMAT,
+    LOG_JSON_FILE,
     DEFAULT_COM_PORT, DEFAULT_BAUD_RATE,
-    GAME_TIMEOUT, CARD_SCAN_TIMEOUT
+    SERIAL_READER_MODE, SCAN_RING_CAPACITY,
+    SERIAL_WATCHDOG_ENABLED, SERIAL_WATCHDOG_INTERVAL, SERIAL_STALL_TIMEOUT, STARTUP_TIME_BUDGET,
+    BACKUP_COM_PORT, SCANNER_DEDUP_WINDOW, SCANNER_SILENCE_THRESHOLD,
+    GAME_TIMEOUT, CARD_SCAN_TIMEOUT,
+    ROUND_START_MODE, ROUND_MIN_INTERVAL, READY_CARD_CODE, SHOE_CARD_CODE, ERROR_RETRY_DELAY,
+    JOURNAL_ENABLED, JOURNAL_PATH,
+    ROUND_SNAPSHOT_ENABLED, ROUND_SNAPSHOT_DIR, ROUND_SNAPSHOT_FSYNC, ROUND_SNAPSHOT_MAX_AGE,
+    LATENCY_TRACE_ENABLED, LATENCY_TRACE_FILE,
+    LATENCY_TRACE_BUFFER, LATENCY_HISTOGRAM_WINDOW,
+    METRICS_ENABLED, METRICS_HOST, METRICS_PORT,
+    EVENT_FEED_ENABLED, EVENT_FEED_HOST, EVENT_FEED_PORT, EVENT_FEED_BUFFER,
+    READ_MODEL_ENABLED, READ_MODEL_HOST, READ_MODEL_PORT, READ_MODEL_HISTORY, READ_MODEL_MAX_WAIT,
+    TABLE_STATS_ENABLED, TABLE_STATS_FLUSH_INTERVAL,
+    PROFILING_ENABLED, PROFILING_HOST, PROFILING_PORT, PROFILING_DIR, PROFILING_DEFAULT_MODE,
+    PROFILING_DEFAULT_SECONDS, PROFILING_SAMPLE_INTERVAL, PROFILING_TOP,
+    TABLE_LEASE_ENABLED, LEASE_OWNER, LEASE_TTL,
+    CONSOLE_HEADLESS, CONSOLE_MAX_FPS,
+    convert_card_to_db_format
 )
 from serial_manager import SerialManager
+from dual_serial_manager import DualSerialManager
+from scan_queue import POLICY_SPILL
+from serial_watchdog import SerialWatchdog
+from scanner_decoders import DECODERS
 from database_manager import DatabaseManager
-from baccarat_game import BaccaratGame
+from baccarat_game import BaccaratGame, DEAL_ORDER
 from card_parser import CardParser
-
-# 配置日志 - 只输出到控制台
-logging.basicConfig(
-    level=getattr(logging, LOG_LEVEL),
-    format=LOG_FORMAT,
-    handlers=[
-        logging.StreamHandler()  # 只保留控制台输出
-    ]
+from latency_tracer import LatencyTracer
+from console_renderer import ConsoleRenderer
+from round_snapshot import RoundSnapshot
+from event_journal import (
+    EventJournal, CARD_ACCEPTED, DB_COMMIT, TIMEOUT_RESET, STATUS_OK, STATUS_FAIL
 )
+from log_setup import setup_logging
+from metrics import (
+    MetricsServer, SCAN_QUEUE_DEPTH, INVALID_CARDS, ROUND_DURATION_SECONDS,
+    ROUND_CYCLE_SECONDS, ROUNDS, TIMEOUT_RESETS, GAME_COUNT, EVENT_FEED_SUBSCRIBERS
+)
+from event_feed import (
+    EventFeedServer, EVENT_CARD, EVENT_ROUND_COMPLETE, EVENT_TIMEOUT_RESET
+)
+from read_model import ReadModel, ReadModelServer
+from table_stats import TableStats
+from startup_timer import StartupTimer
+from deadline_scheduler import DeadlineScheduler, MonotonicClock
+from profiling_hooks import ProfilingControl, ProfilingServer
+from table_lease import TableLease
 
 logger = logging.getLogger(__name__)
 
+_IMPORT_FINISHED = time.perf_counter()
+
+# 信号请求（信号处理函数只记录，由后台线程执行）
+SIGNAL_TRACE_DUMP = 'trace_dump'
+SIGNAL_PROFILE_TOGGLE = 'profile_toggle'
+SIGNAL_REQUEST_INTERVAL = 0.2  # 检查信号请求的间隔(秒)
+
+# 各位置的扫描提示
+POSITION_PROMPTS = {
+    'xian_1': '闲家第1张牌',
+    'zhuang_1': '庄家第1张牌',
+    'xian_2': '闲家第2张牌',
+    'zhuang_2': '庄家第2张牌',
+    'xian_3': '闲家补牌',
+    'zhuang_3': '庄家补牌',
+}
+
 
 class BaccaratSystem:
     """百家乐系统主类"""
     
-    def __init__(self, com_port, baud_rate, table_id):
+    def __init__(self, com_port, baud_rate, table_id, trace_latency=LATENCY_TRACE_ENABLED,
+                 metrics_port=None, event_port=None, headless=False, journal_path=None,
+                 reader_mode=SERIAL_READER_MODE, backup_port=None, decoder=None, backup_decoder=None,
+                 read_port=None, table_stats=TABLE_STATS_ENABLED, clock=None, scheduler=None,
+                 profile_port=None, table_lease=TABLE_LEASE_ENABLED, take_lease=False):
         """
         初始化系统
         
@@ -42,217 +100,781 @@ class BaccaratSystem:
             com_port: 串口号
             baud_rate: 波特率
             table_id: 桌号
+            trace_latency: 是否启用分阶段延迟追踪
+            metrics_port: 指标服务端口（None表示不启动 /metrics 端点）
+            event_port: 事件推送端口（None表示不启动推送服务）
+            headless: 无界面模式，不输出发牌画面和等待状态
+            journal_path: 事件日志文件（None表示不记录）
+            reader_mode: 串口读取方式 thread/process
+            backup_port: 备用扫描枪串口号（None表示单扫描枪）
+            decoder: 主扫描枪协议解码器（None表示按串口取配置）
+            backup_decoder: 备用扫描枪协议解码器（None表示按串口取配置）
+            read_port: 结果查询服务端口（None表示不启动查询服务）
+            table_stats: 是否按小时累加桌台统计
+            clock: 超时计时用的时钟（默认真实时钟，测试可传入 VirtualClock）
+            scheduler: 共用的截止时间调度器（多桌共用时传入，默认每桌一个）
+            profile_port: 性能分析控制端口（None表示只能用信号触发）
+            table_lease: 是否启用桌台租约（多台主机待命同一桌号）
+            take_lease: 启动时不等租约过期，强制接管
         """
         self.com_port = com_port
         self.baud_rate = baud_rate
         self.table_id = table_id
         
+        self.backup_port = backup_port
+        
         # 初始化各个组件
-        self.serial_manager = SerialManager(com_port, baud_rate)
+        if backup_port:
+            # 主备双扫描枪固定使用读取线程
+            if reader_mode == 'process':
+                logger.warning("主备双扫描枪不支持 process 读取方式，改用读取线程")
+            self.serial_manager = DualSerialManager(
+                com_port, backup_port, baud_rate, SCANNER_DEDUP_WINDOW, SCANNER_SILENCE_THRESHOLD,
+                decoders=(decoder, backup_decoder)
+            )
+        elif reader_mode == 'process':
+            # 只有 process 模式才需要 multiprocessing 和共享内存
+            from serial_process import ProcessSerialManager
+            self.serial_manager = ProcessSerialManager(com_port, baud_rate, SCAN_RING_CAPACITY, decoder=decoder)
+        else:
+            self.serial_manager = SerialManager(com_port, baud_rate, decoder=decoder)
+        self.watchdogs = []  # 串口看门狗（每个串口一个），串口连接成功后启动
         self.db_manager = DatabaseManager()
         self.game = BaccaratGame()
         self.parser = CardParser()
         
         self.is_running = False
         
+        # 信号处理函数中不能取锁或写文件，只记录请求，由后台线程执行
+        self.signal_requests = {}
+        self.signal_worker = None
+        
+        # 控制台输出由独立线程限速渲染，不占用游戏线程
+        self.console = ConsoleRenderer(headless=headless, max_fps=CONSOLE_MAX_FPS)
+        
         # 游戏状态跟踪
         self.game_start_time = None  # 游戏开始时间
         self.last_scan_time = None   # 最后扫描时间
+        
+        # 超时：游戏超时（距开局或最后一次扫描）和单张牌超时由截止时间调度器触发
+        self.clock = clock or (scheduler.clock if scheduler else MonotonicClock())
+        self.scheduler = scheduler or DeadlineScheduler(self.clock)
+        self.game_timeout_key = (table_id, 'game')
+        self.card_timeout_key = (table_id, 'card')
+        self.game_timed_out = False
         self.game_count = 0          # 游戏局数统计
         
+        # 局间节奏与吞吐统计
+        self.last_round_start = None  # 上一局开始时间
+        self.last_round_end = None    # 上一局结束时间
+        self.cycle_times = deque(maxlen=50)  # 最近若干局的开局间隔(秒)
+        self.early_card = None        # 局间提前扫到的牌 (card, trace)，作为下一局第一张
+        
+        # 断点恢复
+        self.snapshot = RoundSnapshot(ROUND_SNAPSHOT_DIR, table_id, ROUND_SNAPSHOT_FSYNC) if ROUND_SNAPSHOT_ENABLED else None
+        self.round_cards = []         # 本局已发的牌 [{'position', 'card', 'ts'}]
+        self.resumed = False          # 下一次 run_game 是否继续恢复的牌局
+        
+        # 审计用事件日志（可选）
+        self.journal = EventJournal(journal_path, table_id) if journal_path else None
+        
+        # 延迟追踪（可选）
+        self.tracer = None
+        self.current_trace = None    # 当前卡片的追踪记录
+        if trace_latency:
+            self.tracer = LatencyTracer(LATENCY_TRACE_BUFFER, LATENCY_HISTOGRAM_WINDOW)
+            self.serial_manager.tracer = self.tracer
+            self._register_trace_dump_signal()
+        
+        # 运行指标（采集始终开启，HTTP端点可选）
+        self.metrics_server = MetricsServer(METRICS_HOST, metrics_port) if metrics_port else None
+        SCAN_QUEUE_DEPTH.set_function(self.serial_manager.get_queue_size, table_id=table_id)
+        GAME_COUNT.set_function(lambda: self.game_count, table_id=table_id)
+        
+        # 事件推送（可选）
+        self.event_feed = EventFeedServer(EVENT_FEED_HOST, event_port, EVENT_FEED_BUFFER) if event_port else None
+        if self.event_feed:
+            EVENT_FEED_SUBSCRIBERS.set_function(self.event_feed.subscriber_count)
+        
+        # 结果读模型与查询服务（可选），数据库连接成功后加载
+        self.read_model = ReadModel(READ_MODEL_HISTORY) if read_port else None
+        self.read_server = None
+        if self.read_model:
+            self.read_server = ReadModelServer(self.read_model, READ_MODEL_HOST, read_port, READ_MODEL_MAX_WAIT)
+        
+        # 按小时的桌台统计（可选）
+        self.table_stats = TableStats(TABLE_STATS_FLUSH_INTERVAL) if table_stats else None
+        
+        # 按需性能分析（信号或本地控制端口触发，不中断游戏循环）
+        self.profiler = ProfilingControl(PROFILING_DIR, table_id, PROFILING_SAMPLE_INTERVAL, PROFILING_TOP,
+                                         echo=lambda text: self.console.echo(text))
+        self.profiling_server = None
+        if profile_port:
+            self.profiling_server = ProfilingServer(self.profiler, PROFILING_HOST, profile_port,
+                                                    PROFILING_DEFAULT_MODE, PROFILING_DEFAULT_SECONDS)
+        self._register_profile_signal()
+        
+        # 桌台租约（可选）：只有持有者写库，写入时核对 fencing token
+        self.lease = TableLease(self.db_manager, table_id, LEASE_OWNER) if table_lease else None
+        self.take_lease = take_lease
+        if self.lease:
+            self.db_manager.lease = self.lease
+        
+        # 启动：串口和数据库并行连接，数据库未就绪时临时表写入先暂存
+        self.startup_timer = StartupTimer(_IMPORT_STARTED)
+        self.startup_timer.record('模块导入', _IMPORT_STARTED, _IMPORT_FINISHED)
+        self.db_ready = threading.Event()  # 数据库启动流程已结束（无论成功与否）
+        self.db_connected = False
+        self.db_startup_notes = []         # 数据库启动流程的输出，就绪后显示
+        self.db_startup_deferred = False   # 初始化已先行结束，数据库启动流程的输出改由控制台显示
+        self.startup_lock = threading.Lock()
+        self.deferred_temp_cards = []      # 数据库就绪前暂存的临时表写入 [(position, card)]
+        
     def initialize(self):
         """初始化系统连接"""
         print("\n" + "="*50)
         print("百家乐发牌系统启动中...")
         print("="*50)
         
+        # 启动指标服务（失败不影响游戏）
+        if self.metrics_server and self.metrics_server.start():
+            print(f"📊 指标服务: http://{METRICS_HOST}:{self.metrics_server.port}/metrics")
+        
+        # 启动事件推送服务（失败不影响游戏）
+        if self.event_feed and self.event_feed.start():
+            print(f"📡 事件推送: tcp://{EVENT_FEED_HOST}:{self.event_feed.port}")
+        
+        # 启动性能分析控制端口（失败不影响游戏）
+        if self.profiling_server and self.profiling_server.start():
+            print(f"🔥 性能分析控制: tcp://{PROFILING_HOST}:{self.profiling_server.port}")
+        
+        # 打开事件日志（失败不影响游戏）
+        if self.journal:
+            if self.journal.open():
+                self.serial_manager.journal = self.journal
+                print(f"📒 事件日志: {self.journal.path}")
+            else:
+                self.journal = None
+        
+        # spill 策略把被丢弃的扫描写入事件日志留档（不会重新交付），没有事件日志时等同 drop_oldest
+        scan_queue = getattr(self.serial_manager, 'data_queue', None)
+        if scan_queue and scan_queue.policy == POLICY_SPILL and not self.journal:
+            logger.warning("扫描队列策略为 spill 但未启用事件日志，队列满时被丢弃的扫描不会留档")
+            print("⚠️  扫描队列策略为 spill 但未启用事件日志 (--journal)，被丢弃的扫描不会留档")
+        
+        # 数据库在后台线程中连接，与串口连接并行
+        db_thread = threading.Thread(target=self._start_database, name='db-startup')
+        db_thread.daemon = True
+        db_thread.start()
+        
         # 连接串口
         print(f"\n正在连接串口 {self.com_port} (波特率: {self.baud_rate})...")
-        if not self.serial_manager.start_reading():
+        with self.startup_timer.phase('串口'):
+            serial_connected = self.serial_manager.start_reading()
+        if not serial_connected:
             print("❌ 串口连接失败!")
             return False
         print("✅ 串口连接成功!")
+        if SERIAL_WATCHDOG_ENABLED:
+            # 读取线程退出或卡死时立即重启；双扫描枪时每一路各自监控
+            if isinstance(self.serial_manager, DualSerialManager):
+                managers = self.serial_manager.managers
+            else:
+                managers = [self.serial_manager]
+            for manager in managers:
+                watchdog = SerialWatchdog(manager, SERIAL_WATCHDOG_INTERVAL, SERIAL_STALL_TIMEOUT)
+                watchdog.start()
+                self.watchdogs.append(watchdog)
         
-        # 连接数据库
+        # 在启动时间预算内等待数据库；超出预算时先开始接收扫描，数据库在后台继续连接
         print("\n正在连接数据库...")
-        if not self.db_manager.connect():
-            print("❌ 数据库连接失败!")
-            return False
-        print("✅ 数据库连接成功!")
-        
-        # 检查是否已有数据
-        print(f"\n检查桌号 {self.table_id} 的数据...")
-        if self.db_manager.check_table_exists(self.table_id):
-            print(f"⚠️  桌号 {self.table_id} 已有数据存在")
+        self.db_ready.wait(max(0, STARTUP_TIME_BUDGET - self.startup_timer.elapsed()))
+        with self.startup_lock:
+            db_finished = self.db_ready.is_set()
+            self.db_startup_deferred = not db_finished
+        if db_finished:
+            if not self.db_connected:
+                print("❌ 数据库连接失败!")
+                return False
+            for note in self.db_startup_notes:
+                print(note)
         else:
-            print(f"✅ 桌号 {self.table_id} 无数据，可以开始新游戏")
+            print(f"⏳ 数据库仍在连接，先开始接收扫描（临时表写入在连接后补写）")
         
         print("\n" + "="*50)
-        print(f"系统初始化完成")
+        print(f"系统初始化完成 (耗时 {self.startup_timer.elapsed() * 1000:.0f}ms)")
+        for line in self.startup_timer.report():
+            print(line)
         print(f"游戏超时设置: {GAME_TIMEOUT}秒")
         print(f"系统将永久运行，按 Ctrl+C 退出")
         print("="*50)
         
+        self.console.start()
         self.is_running = True
         return True
     
-    def check_game_timeout(self):
+    def _start_database(self):
+        """数据库启动流程（在后台线程中运行）：连接、加载读模型、创建统计表、检查已有数据"""
+        notes = self.db_startup_notes
+        with self.startup_timer.phase('数据库连接'):
+            self.db_connected = self.db_manager.connect()
+        
+        if self.db_connected:
+            notes.append("✅ 数据库连接成功!")
+            
+            # 取得桌台租约；由其他主机持有时主循环开始前进入待命
+            if self.lease:
+                with self.startup_timer.phase('桌台租约'):
+                    acquired = self.db_manager.ensure_lease_table() and self.lease.acquire(self.take_lease)
+                if acquired:
+                    notes.append(f"🔑 已取得桌号 {self.table_id} 的租约 (token {self.lease.token})")
+                else:
+                    notes.append(f"⏸  桌号 {self.table_id} 的租约由 {self.lease.describe_holder()} 持有，将进入待命")
+            
+            # 加载读模型并启动查询服务（失败不影响游戏）
+            if self.read_model:
+                self.db_manager.read_model = self.read_model
+                with self.startup_timer.phase('读模型'):
+                    loaded = self.db_manager.load_read_model(self.table_id) and self.read_server.start()
+                if loaded:
+                    notes.append(f"🔎 结果查询: http://{READ_MODEL_HOST}:{self.read_server.port}/tables/{self.table_id}")
+                else:
+                    self.db_manager.read_model = None
+            
+            # 创建统计表（失败不影响游戏）
+            if self.table_stats and not self.db_manager.ensure_stats_table():
+                notes.append("⚠️  统计表创建失败，本次不记录桌台统计")
+                self.table_stats = None
+            
+            # 检查是否已有数据
+            with self.startup_timer.phase('数据检查'):
+                exists = self.db_manager.check_table_exists(self.table_id)
+            if exists:
+                notes.append(f"⚠️  桌号 {self.table_id} 已有数据存在")
+            else:
+                notes.append(f"✅ 桌号 {self.table_id} 无数据，可以开始新游戏")
+        else:
+            notes.append("❌ 数据库连接失败，写入时将自动重连")
+        
+        with self.startup_lock:
+            self.db_ready.set()
+            deferred = self.db_startup_deferred
+        if deferred:
+            for note in notes:
+                self.console.echo(note)
+            self.console.echo(f"   数据库启动流程完成 (启动后 {self.startup_timer.elapsed() * 1000:.0f}ms)")
+    
+    def _write_temp_card(self, position, card):
         """
-        检查游戏是否超时
+        写入临时表；数据库启动流程未结束时先暂存，之后按顺序补写
         
         Returns:
-            bool: True表示超时，False表示未超时
+            bool: 是否写入成功，暂存时返回None
         """
-        if self.game_start_time is None:
+        if not self.db_ready.is_set():
+            self.deferred_temp_cards.append((position, card))
+            return None
+        self._flush_deferred_temp_cards()
+        return self.db_manager.insert_temp_card(self.table_id, position, card)
+    
+    def _flush_deferred_temp_cards(self):
+        """补写数据库就绪前暂存的临时表写入"""
+        if not self.deferred_temp_cards:
+            return
+        cards, self.deferred_temp_cards = self.deferred_temp_cards, []
+        for position, card in cards:
+            committed = self.db_manager.insert_temp_card(self.table_id, position, card)
+            if self.journal:
+                self.journal.append(DB_COMMIT, 'tu_bjl_temp', position, STATUS_OK if committed else STATUS_FAIL)
+        logger.info(f"已补写数据库就绪前暂存的 {len(cards)} 张临时牌")
+    
+    def _wait_for_database(self):
+        """等待数据库启动流程结束并补写暂存的临时表写入（保存结果、清理数据前调用）"""
+        if not self.db_ready.is_set():
+            self.console.echo("⏳ 等待数据库连接...")
+            self.db_ready.wait()
+        self._flush_deferred_temp_cards()
+    
+    def _wait_for_lease(self, reload=False):
+        """
+        等待取得桌台租约（待命：持有者释放租约或租约过期后接管）
+        
+        Args:
+            reload: 是否在取得租约后重新加载读模型（失去租约后重新取得时为True）
+        
+        Returns:
+            bool: 是否取得租约（程序停止时返回False）
+        """
+        self.db_ready.wait()
+        waited = False
+        while not self.lease.acquire():
+            if not waited:
+                self.console.echo(f"\n⏸  桌号 {self.table_id} 的租约由 {self.lease.describe_holder()} 持有，待命中...")
+                waited = True
+            self.console.status(f"待命中... 持有者: {self.lease.describe_holder()}")
+            self.profiler.poll()
+            time.sleep(self.lease.renew_interval)
+            if not self.is_running:
+                return False
+        if waited:
+            # 待命期间扫到的牌属于原持有者的牌局
+            self.serial_manager.clear_queue()
+            self.console.echo(f"🔑 已接管桌号 {self.table_id} (token {self.lease.token})")
+        if waited or reload:
+            self._reload_read_model()
+        return True
+    
+    def _reload_read_model(self):
+        """接管租约后按数据库重新加载读模型（待命期间的结果由其他主机写入）"""
+        if not self.db_manager.read_model:
+            return
+        if not self.db_manager.load_read_model(self.table_id):
+            # 加载失败时清空本桌视图，不再对外提供过时的结果
+            logger.warning(f"接管后重新加载读模型失败，已清空桌号 {self.table_id} 的读模型")
+            self.db_manager.read_model.invalidate(self.table_id)
+    
+    def _on_lease_lost(self):
+        """失去租约：放弃本地进行中的牌局，由新持有者按临时表继续"""
+        self.console.echo(f"\n⛔ 桌号 {self.table_id} 的租约已失效，停止写库并放弃本局")
+        self.game.reset_game()
+        self.round_cards = []
+        # 本地快照已过时，不能在重新取得租约后覆盖新持有者写入的临时表
+        if self.snapshot:
+            self.snapshot.clear()
+        self.game_start_time = None
+        self.last_scan_time = None
+        self.early_card = None
+        self._clear_timeouts()
+    
+    def _register_trace_dump_signal(self):
+        """注册导出追踪的信号（Linux: SIGUSR1，Windows: Ctrl+Break）"""
+        dump_signal = getattr(signal, 'SIGUSR1', None) or getattr(signal, 'SIGBREAK', None)
+        if dump_signal is None:
+            return
+        try:
+            signal.signal(dump_signal, lambda signum, frame: self._request_from_signal(SIGNAL_TRACE_DUMP))
+        except ValueError:
+            # 非主线程中无法注册信号
+            logger.warning("无法注册追踪导出信号")
+            return
+        self._start_signal_worker()
+    
+    def _request_from_signal(self, name):
+        """信号处理函数：只记录请求（字典赋值不取锁、不做I/O），由信号请求线程执行"""
+        self.signal_requests[name] = True
+    
+    def _start_signal_worker(self):
+        """启动执行信号请求的后台线程（只启动一次）"""
+        if self.signal_worker:
+            return
+        self.signal_worker = threading.Thread(target=self._serve_signal_requests, name='signal-requests')
+        self.signal_worker.daemon = True
+        self.signal_worker.start()
+    
+    def _serve_signal_requests(self):
+        """执行信号记录的请求；在后台线程中取锁和写文件，不会与被信号打断的游戏线程互相等待"""
+        while True:
+            time.sleep(SIGNAL_REQUEST_INTERVAL)
+            if self.signal_requests.pop(SIGNAL_TRACE_DUMP, None):
+                try:
+                    self.dump_latency_trace()
+                except Exception as e:
+                    logger.error(f"导出延迟追踪失败: {e}")
+            if self.signal_requests.pop(SIGNAL_PROFILE_TOGGLE, None):
+                try:
+                    self.console.echo(self.profiler.toggle(PROFILING_DEFAULT_MODE, PROFILING_DEFAULT_SECONDS))
+                except Exception as e:
+                    logger.error(f"性能分析开关失败: {e}")
+    
+    def _register_profile_signal(self):
+        """注册性能分析开关信号（仅 Linux: SIGUSR2，Windows 使用控制端口）"""
+        profile_signal = getattr(signal, 'SIGUSR2', None)
+        if profile_signal is None:
+            return
+        try:
+            # 开关和输出报告都要取锁，交给信号请求线程（cProfile 仍由游戏线程在 poll() 中启停）
+            signal.signal(profile_signal, lambda signum, frame: self._request_from_signal(SIGNAL_PROFILE_TOGGLE))
+        except ValueError:
+            logger.warning("无法注册性能分析信号")
+            return
+        self._start_signal_worker()
+    
+    def dump_latency_trace(self, path=LATENCY_TRACE_FILE, echo=None):
+        """
+        导出延迟追踪并显示各阶段摘要
+        
+        Args:
+            path: 输出文件路径
+            echo: 显示摘要的函数（None表示经控制台渲染线程输出；渲染线程停止后传入 print）
+        """
+        if not self.tracer:
             return False
         
-        elapsed = time.time() - self.game_start_time
+        echo = echo or self.console.echo
+        echo("\n📈 分阶段延迟 (p50 / p99 / max, 毫秒):")
+        for stage, stats in self.tracer.summary().items():
+            if stats['count']:
+                echo(f"   {stage:<10} {stats['p50_us'] / 1000:>8.2f} / {stats['p99_us'] / 1000:>8.2f} / "
+                     f"{stats['max_us'] / 1000:>8.2f}  ({stats['count']}张)")
+        return self.tracer.dump(path)
+    
+    def publish_event(self, event_type, **data):
+        """发布事件到推送服务（未启用时忽略）"""
+        if self.event_feed:
+            self.event_feed.publish(event_type, table_id=self.table_id, **data)
+    
+    def process_card(self, position, card):
+        """
+        处理一张已校验的卡片：更新游戏状态、写入临时表并显示
         
-        # 如果有最后扫描时间，使用最后扫描时间
-        if self.last_scan_time:
-            elapsed = time.time() - self.last_scan_time
+        Args:
+            position: 位置 (xian_1, xian_2, xian_3, zhuang_1, zhuang_2, zhuang_3)
+            card: 卡片代码
+        """
+        trace = self.current_trace
+        self.current_trace = None
         
-        if elapsed > GAME_TIMEOUT:
-            logger.warning(f"游戏超时: {elapsed:.1f}秒无操作")
-            return True
+        if position.startswith('xian'):
+            self.game.add_player_card(card)
+        else:
+            self.game.add_banker_card(card)
         
-        return False
+        # 先落本地快照，进程意外退出后可恢复本局
+        self.round_cards.append({'position': position, 'card': card, 'ts': time.time()})
+        if self.snapshot:
+            self.snapshot.save(self.game_count, self.game_start_time, self.round_cards)
+        
+        # 先推送再写库，前端显示不受远程数据库延迟影响
+        self.publish_event(EVENT_CARD, game_count=self.game_count, position=position,
+                           card=card, db_card=convert_card_to_db_format(card))
+        
+        if self.journal:
+            self.journal.append(CARD_ACCEPTED, card, position)
+        
+        if trace:
+            trace.mark('db_start')
+        committed = self._write_temp_card(position, card)
+        if trace:
+            trace.mark('db_commit')
+        if self.journal and committed is not None:
+            self.journal.append(DB_COMMIT, 'tu_bjl_temp', position, STATUS_OK if committed else STATUS_FAIL)
+        
+        self.console.show_state(self.game)
+        if trace:
+            trace.mark('display')
+            self.tracer.finish(trace)
+    
+    def check_game_timeout(self):
+        """
+        检查游戏是否超时（执行已到期的定时回调）
+        
+        Returns:
+            bool: True表示超时，False表示未超时
+        """
+        self.scheduler.run_due()
+        return self.game_timed_out
+    
+    def _arm_game_timeout(self):
+        """开局或扫到牌后重新计算游戏超时"""
+        self.game_timed_out = False
+        self.scheduler.schedule(GAME_TIMEOUT, self._on_game_timeout, self.game_timeout_key)
+    
+    def _clear_timeouts(self):
+        """本局结束，取消本桌的超时"""
+        self.scheduler.cancel(self.game_timeout_key)
+        self.scheduler.cancel(self.card_timeout_key)
+        self.game_timed_out = False
+    
+    def _on_game_timeout(self, deadline):
+        logger.warning("游戏超时: %s秒无操作", GAME_TIMEOUT)
+        self.game_timed_out = True
+    
+    def _on_card_timeout(self, deadline):
+        self.console.echo(f"\n⚠️  单张牌扫描超时 ({CARD_SCAN_TIMEOUT}秒)")
+        # 游戏未超时则继续等待，重新计算单张牌超时
+        if not self.game_timed_out:
+            self.scheduler.schedule(CARD_SCAN_TIMEOUT, self._on_card_timeout, self.card_timeout_key)
+            self.console.echo("继续等待扫描...")
     
     def handle_game_timeout(self):
         """处理游戏超时"""
-        print("\n" + "⚠️"*25)
-        print(f"游戏超时！{GAME_TIMEOUT}秒内未扫描到任何牌")
-        print("正在重置游戏并清理数据...")
-        print("⚠️"*25)
+        self.console.echo("\n" + "⚠️"*25)
+        self.console.echo(f"游戏超时！{GAME_TIMEOUT}秒内未扫描到任何牌")
+        self.console.echo("正在重置游戏并清理数据...")
+        self.console.echo("⚠️"*25)
+        TIMEOUT_RESETS.inc(table_id=self.table_id)
+        self.publish_event(EVENT_TIMEOUT_RESET, game_count=self.game_count)
+        if self.journal:
+            self.journal.append(TIMEOUT_RESET)
         
         # 清理远程数据库数据
+        self._wait_for_database()
         if self.db_manager.clear_table_data(self.table_id):
-            print(f"✅ 已清理桌号 {self.table_id} 的所有数据")
+            self.console.echo(f"✅ 已清理桌号 {self.table_id} 的所有数据")
         else:
-            print(f"❌ 清理数据失败")
+            self.console.echo(f"❌ 清理数据失败")
         
         # 重置本地游戏状态
         self.game.reset_game()
+        self.round_cards = []
+        if self.snapshot:
+            self.snapshot.clear()
         self.game_start_time = None
         self.last_scan_time = None
+        self._clear_timeouts()
+        self.last_round_end = time.time()
         
-        print("游戏已重置，3秒后自动开始新游戏...")
-        time.sleep(3)  # 短暂等待，让操作员看到消息
+        self.console.echo("游戏已重置，即将开始新游戏...")
     
-    def run_game(self):
-        """运行一局游戏"""
-        try:
-            self.game_count += 1
-            print("\n" + "🎮"*25)
-            print(f"第 {self.game_count} 局 - 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
-            print("🎮"*25)
-            
-            # 重置游戏
+    def resume_round(self):
+        """
+        根据本地快照和临时表恢复进行中的牌局
+        
+        Returns:
+            bool: 是否恢复了牌局
+        """
+        snapshot_data = self.snapshot.load(ROUND_SNAPSHOT_MAX_AGE) if self.snapshot else None
+        snapshot_cards = {item['position']: item['card'] for item in snapshot_data['cards']} if snapshot_data else {}
+        # 数据库尚未就绪时只按本地快照恢复
+        db_cards = (self.db_manager.get_temp_cards(self.table_id) if self.db_ready.is_set() else None) or {}
+        
+        # 以本地快照为准（先于数据库写入），快照缺失的位置用临时表补齐
+        cards = dict(db_cards)
+        cards.update(snapshot_cards)
+        if not cards:
+            return False
+        
+        restored = self.game.restore_cards(cards)
+        if not restored:
             self.game.reset_game()
+            return False
+        
+        # 快照中有但临时表没写进去的牌，补写到临时表
+        for position, card in restored.items():
+            if db_cards.get(position) != card:
+                self._write_temp_card(position, card)
+        
+        now = time.time()
+        stamps = {item['position']: item['ts'] for item in snapshot_data['cards']} if snapshot_data else {}
+        self.round_cards = [{'position': position, 'card': card, 'ts': stamps.get(position, now)}
+                            for position, card in restored.items()]
+        if snapshot_data:
+            self.game_count = snapshot_data.get('game_count', 0)
+            self.game_start_time = snapshot_data.get('round_start') or now
+        else:
+            self.game_count += 1
+            self.game_start_time = now
+        # 超时从恢复时刻重新计算
+        self.last_scan_time = now
+        self._arm_game_timeout()
+        self.last_round_start = self.game_start_time
+        self.resumed = True
+        
+        if self.snapshot:
+            self.snapshot.save(self.game_count, self.game_start_time, self.round_cards)
+        
+        logger.info("已恢复第%s局: %s", self.game_count, restored)
+        self.console.echo(f"\n♻️  已恢复进行中的第 {self.game_count} 局 ({len(restored)} 张牌，"
+                          f"来源: {'本地快照' if snapshot_data else '临时表'})")
+        return True
+    
+    def record_round_start(self, now):
+        """记录开局时间并统计开局间隔"""
+        if self.last_round_start is not None:
+            cycle = now - self.last_round_start
+            self.cycle_times.append(cycle)
+            ROUND_CYCLE_SECONDS.observe(cycle, table_id=self.table_id)
+        self.last_round_start = now
+    
+    def wait_for_round_start(self):
+        """
+        等待下一局开始（不丢弃局间扫到的牌）
+        
+        - auto: 距上一局结束满 ROUND_MIN_INTERVAL 秒即开始，期间扫到有效牌立即开始
+        - ready_scan: 扫描就绪卡后开始，直接扫到有效牌也视为开始
+        """
+        ready_mode = ROUND_START_MODE == 'ready_scan'
+        if self.last_round_end is None or (not ready_mode and ROUND_MIN_INTERVAL <= 0):
+            return
+        
+        if ready_mode:
+            self.console.echo(f"\n请扫描就绪卡 ({READY_CARD_CODE}) 开始下一局...")
+        deadline = self.last_round_end + ROUND_MIN_INTERVAL
+        
+        while self.is_running and self.serial_manager.is_running():
+            if self.lease and not self.lease.poll():
+                return
+            remaining = deadline - time.time()
+            if not ready_mode and remaining <= 0:
+                return
             
-            # 设置游戏开始时间
-            self.game_start_time = time.time()
-            self.last_scan_time = None
+            card = self.serial_manager.read_card(timeout=1 if ready_mode else min(remaining, 1))
+            if not card:
+                continue
+            if self.handle_control_code(card):
+                if card.strip().upper() == READY_CARD_CODE:
+                    return
+                continue
+            trace = self.serial_manager.last_trace
+            if self.accept_scan(card, trace):
+                self.early_card = (card, trace)
+                return
+    
+    def handle_control_code(self, card):
+        """
+        处理荷官控制卡（就绪卡、换靴卡）
+        
+        Args:
+            card: 扫描代码
             
-            # 第一轮发牌：闲1 → 庄1 → 闲2 → 庄2
-            print("\n📤 开始发牌...")
-            print("-"*30)
+        Returns:
+            bool: True表示是控制卡（不作为牌处理）
+        """
+        code = card.strip().upper()
+        if code == SHOE_CARD_CODE:
+            self.console.echo("\n🂠 换靴")
+            if self.journal:
+                self.journal.new_shoe()
+            return True
+        return code == READY_CARD_CODE
+    
+    def accept_scan(self, card, trace):
+        """
+        校验扫描到的卡片代码
+        
+        Args:
+            card: 卡片代码
+            trace: 延迟追踪记录（可为None）
             
-            # 闲家第一张
-            print("请扫描闲家第1张牌...")
-            card = self.wait_for_card_with_timeout()
-            if not card:
-                if self.check_game_timeout():
-                    self.handle_game_timeout()
-                return False
-            self.game.add_player_card(card)
-            self.db_manager.insert_temp_card(self.table_id, 'xian_1', card)
-            self.game.display_current_state()
+        Returns:
+            bool: 是否为有效卡片
+        """
+        valid = self.parser.parse_card(card) is not None
+        if trace:
+            trace.mark('validate')
+        if valid:
+            return True
+        self.console.echo(f"⚠️  无效的卡片代码: {card}")
+        INVALID_CARDS.inc(table_id=self.table_id)
+        if trace:
+            self.tracer.finish(trace)
+        return False
+    
+    def deal_card(self, position):
+        """
+        发一张牌：提示扫描、等待并处理（断点恢复时已发的位置直接跳过）
+        
+        Args:
+            position: 位置 (xian_1 ... zhuang_3)
             
-            # 庄家第一张
-            print("\n请扫描庄家第1张牌...")
-            card = self.wait_for_card_with_timeout()
-            if not card:
-                if self.check_game_timeout():
-                    self.handle_game_timeout()
-                return False
-            self.game.add_banker_card(card)
-            self.db_manager.insert_temp_card(self.table_id, 'zhuang_1', card)
-            self.game.display_current_state()
+        Returns:
+            bool: True表示该位置已有牌，False表示超时或中断
+        """
+        if self.game.get_card_at(position):
+            return True
+        
+        self.console.echo(f"\n请扫描{POSITION_PROMPTS[position]}...")
+        card = self.wait_for_card_with_timeout()
+        if not card:
+            if self.check_game_timeout():
+                self.handle_game_timeout()
+            return False
+        self.process_card(position, card)
+        return True
+    
+    def run_game(self):
+        """运行一局游戏"""
+        try:
+            if self.resumed:
+                # 断点恢复：沿用恢复的牌面、局数和开局时间
+                self.resumed = False
+                self.console.echo("\n" + "🎮"*25)
+                self.console.echo(f"第 {self.game_count} 局 (断点恢复) - 已发 {len(self.round_cards)} 张牌")
+                self.console.echo("🎮"*25)
+                self.console.show_state(self.game)
+            else:
+                self.game_count += 1
+                self.console.echo("\n" + "🎮"*25)
+                self.console.echo(f"第 {self.game_count} 局 - 时间: {datetime.now().strftime('%Y-%m-%d %H:%M:%S')}")
+                self.console.echo("🎮"*25)
+                
+                # 重置游戏
+                self.game.reset_game()
+                self.round_cards = []
+                
+                # 设置游戏开始时间
+                self.game_start_time = time.time()
+                self.last_scan_time = None
+                self._arm_game_timeout()
+                self.record_round_start(self.game_start_time)
+                if self.journal:
+                    self.journal.begin_round()
             
-            # 闲家第二张
-            print("\n请扫描闲家第2张牌...")
-            card = self.wait_for_card_with_timeout()
-            if not card:
-                if self.check_game_timeout():
-                    self.handle_game_timeout()
-                return False
-            self.game.add_player_card(card)
-            self.db_manager.insert_temp_card(self.table_id, 'xian_2', card)
-            self.game.display_current_state()
+            # 第一轮发牌：闲1 → 庄1 → 闲2 → 庄2
+            self.console.echo("\n📤 开始发牌...")
+            self.console.echo("-"*30)
             
-            # 庄家第二张
-            print("\n请扫描庄家第2张牌...")
-            card = self.wait_for_card_with_timeout()
-            if not card:
-                if self.check_game_timeout():
-                    self.handle_game_timeout()
-                return False
-            self.game.add_banker_card(card)
-            self.db_manager.insert_temp_card(self.table_id, 'zhuang_2', card)
-            self.game.display_current_state()
+            for position in DEAL_ORDER[:4]:
+                if not self.deal_card(position):
+                    return False
             
             # 检查天牌
             if self.game.check_natural():
-                print("\n🎊 天牌！游戏结束！")
+                self.console.echo("\n🎊 天牌！游戏结束！")
             else:
                 # 判断是否需要补牌
-                print("\n📊 判断是否需要补牌...")
-                print("-"*30)
-                
-                player_third_card = None
+                self.console.echo("\n📊 判断是否需要补牌...")
+                self.console.echo("-"*30)
                 
                 # 闲家补牌判断
                 if self.game.player_need_third_card():
-                    print("\n请扫描闲家补牌...")
-                    card = self.wait_for_card_with_timeout()
-                    if not card:
-                        if self.check_game_timeout():
-                            self.handle_game_timeout()
+                    if not self.deal_card('xian_3'):
                         return False
-                    self.game.add_player_card(card)
-                    player_third_card = card
-                    self.db_manager.insert_temp_card(self.table_id, 'xian_3', card)
-                    self.game.display_current_state()
                 
                 # 庄家补牌判断
+                player_third_card = self.game.get_card_at('xian_3')
                 if self.game.banker_need_third_card(player_third_card):
-                    print("\n请扫描庄家补牌...")
-                    card = self.wait_for_card_with_timeout()
-                    if not card:
-                        if self.check_game_timeout():
-                            self.handle_game_timeout()
+                    if not self.deal_card('zhuang_3'):
                         return False
-                    self.game.add_banker_card(card)
-                    self.db_manager.insert_temp_card(self.table_id, 'zhuang_3', card)
-                    self.game.display_current_state()
             
             # 显示最终结果
-            self.game.display_final_result()
+            self.console.show_result(self.game)
             
-            # 保存到数据库
-            self.save_result()
+            # 推送结果并保存到数据库
+            self.publish_event(EVENT_ROUND_COMPLETE, game_count=self.game_count,
+                               result=self.game.get_game_result(),
+                               winner=self.game.determine_winner(),
+                               player_points=self.game.get_player_points(),
+                               banker_points=self.game.get_banker_points())
+            saved = self.save_result()
+            if saved and self.table_stats:
+                self.table_stats.record_round(self.table_id, self.game.get_game_result())
+                if self.table_stats.due():
+                    self.table_stats.flush(self.db_manager)
+            if self.journal:
+                self.journal.append(DB_COMMIT, 'tu_bjl_result', status=STATUS_OK if saved else STATUS_FAIL)
+                self.journal.end_round(f"{self.game.determine_winner()} "
+                                       f"{self.game.get_player_points()}:{self.game.get_banker_points()}")
+            self.round_cards = []
+            if self.snapshot:
+                self.snapshot.clear()
+            ROUND_DURATION_SECONDS.observe(time.time() - self.game_start_time, table_id=self.table_id)
+            ROUNDS.inc(table_id=self.table_id)
             
             # 重置时间记录
+            self.last_round_end = time.time()
+            round_seconds = self.last_round_end - self.game_start_time
             self.game_start_time = None
             self.last_scan_time = None
+            self._clear_timeouts()
             
-            # 短暂等待，让操作员看到结果
-            print("\n" + "="*50)
-            print(f"✅ 第 {self.game_count} 局完成")
-            print("5秒后自动开始下一局...")
-            print("="*50)
-            time.sleep(5)
+            self.console.echo("\n" + "="*50)
+            self.console.echo(f"✅ 第 {self.game_count} 局完成，用时 {round_seconds:.1f}秒")
+            if self.cycle_times:
+                avg_cycle = sum(self.cycle_times) / len(self.cycle_times)
+                self.console.echo(f"   最近{len(self.cycle_times)}局平均开局间隔 {avg_cycle:.1f}秒 "
+                                  f"(约 {3600 / avg_cycle:.0f} 局/小时)")
+            self.console.echo("="*50)
             
             return True
             
@@ -261,9 +883,9 @@ class BaccaratSystem:
             raise
         except Exception as e:
             logger.error(f"游戏运行出错: {e}")
-            print(f"\n❌ 游戏出错: {e}")
-            print("5秒后自动重试...")
-            time.sleep(5)
+            self.console.echo(f"\n❌ 游戏出错: {e}")
+            self.console.echo(f"{ERROR_RETRY_DELAY}秒后自动重试...")
+            time.sleep(ERROR_RETRY_DELAY)
             return False
     
     def wait_for_card_with_timeout(self):
@@ -273,67 +895,93 @@ class BaccaratSystem:
         Returns:
             str: 卡片代码，或None（超时）
         """
-        start_time = time.time()
+        # 局间提前扫到的牌直接作为本张
+        if self.early_card:
+            card, trace = self.early_card
+            self.early_card = None
+            self.last_scan_time = time.time()
+            self._arm_game_timeout()
+            self.current_trace = trace
+            return card
         
+        self.scheduler.schedule(CARD_SCAN_TIMEOUT, self._on_card_timeout, self.card_timeout_key)
         while True:
-            # 检查游戏总超时
-            if self.check_game_timeout():
+            # cProfile 须在游戏线程中启停
+            self.profiler.poll()
+            
+            # 续约；失去租约时放弃本局（由主循环回到待命）
+            if self.lease and not self.lease.poll():
+                self.scheduler.cancel(self.card_timeout_key)
                 return None
             
-            # 检查单张牌扫描超时
-            if time.time() - start_time > CARD_SCAN_TIMEOUT:
-                print(f"\n⚠️  单张牌扫描超时 ({CARD_SCAN_TIMEOUT}秒)")
-                # 继续检查游戏总超时
-                if self.check_game_timeout():
-                    return None
-                # 如果游戏未超时，继续等待
-                start_time = time.time()  # 重置单张牌超时计时
-                print("继续等待扫描...")
+            # 执行到期的超时回调，检查游戏总超时
+            if self.check_game_timeout():
+                self.scheduler.cancel(self.card_timeout_key)
+                return None
             
             if not self.serial_manager.is_running():
-                print("\n❌ 串口连接已断开，尝试重连...")
+                if self.watchdogs:
+                    # 由看门狗负责重启，这里只提示并继续等待
+                    self.console.status("❌ 串口连接已断开，等待自动恢复...")
+                    self.clock.sleep(min(1, self.scheduler.time_until_next(default=1)))
+                    continue
+                self.console.echo("\n❌ 串口连接已断开，尝试重连...")
                 if not self.serial_manager.start_reading():
-                    print("串口重连失败，5秒后重试...")
-                    time.sleep(5)
+                    self.console.echo(f"串口重连失败，{ERROR_RETRY_DELAY}秒后重试...")
+                    self.clock.sleep(ERROR_RETRY_DELAY)
                     continue
             
-            # 尝试读取卡片
-            card = self.serial_manager.read_card(timeout=1)
-            if card:
+            # 等到扫到牌或最近的截止时间为止；有界面或正在性能分析时至少每秒一次
+            wait = self.scheduler.time_until_next(default=1)
+            if not self.console.headless or self.profiler.active:
+                wait = min(wait, 1)
+            # 不能错过续约时间（无界面时等待可长达 CARD_SCAN_TIMEOUT，超过 LEASE_TTL）
+            if self.lease:
+                wait = min(wait, max(0, self.lease.next_renew - self.lease.clock()))
+            card = self.serial_manager.read_card(timeout=wait)
+            if card and not self.handle_control_code(card):
+                trace = self.serial_manager.last_trace
                 # 验证卡片代码是否有效
-                if self.parser.parse_card(card):
-                    # 更新最后扫描时间
+                if self.accept_scan(card, trace):
+                    # 更新最后扫描时间，重新计算游戏超时
                     self.last_scan_time = time.time()
+                    self._arm_game_timeout()
+                    self.scheduler.cancel(self.card_timeout_key)
+                    self.current_trace = trace
                     return card
-                else:
-                    print(f"⚠️  无效的卡片代码: {card}")
             
             # 显示等待状态
-            elapsed = int(time.time() - start_time)
-            game_elapsed = int(time.time() - self.game_start_time) if self.game_start_time else 0
-            remaining = CARD_SCAN_TIMEOUT - elapsed
-            game_remaining = GAME_TIMEOUT - game_elapsed
-            
-            print(f"\r等待扫描... (单张牌: {remaining}秒 | 游戏总计: {game_remaining}秒)", end='', flush=True)
+            remaining = self.scheduler.remaining(self.card_timeout_key) or 0
+            game_remaining = self.scheduler.remaining(self.game_timeout_key) or 0
+            self.console.status(f"等待扫描... (单张牌: {remaining:.0f}秒 | 游戏总计: {game_remaining:.0f}秒)")
     
     def save_result(self):
-        """保存游戏结果到数据库"""
-        print("\n💾 保存结果到数据库...")
+        """
+        保存游戏结果到数据库
+        
+        Returns:
+            bool: 是否成功
+        """
+        self.console.echo("\n💾 保存结果到数据库...")
         
         result_data = self.game.get_game_result()
         
+        self._wait_for_database()
+        
         # 先检查是否已有数据
         if self.db_manager.check_table_exists(self.table_id):
-            print(f"⚠️  桌号 {self.table_id} 已有数据，清理后重新保存...")
+            self.console.echo(f"⚠️  桌号 {self.table_id} 已有数据，清理后重新保存...")
             # 清理旧数据
             self.db_manager.clear_table_data(self.table_id)
         
         # 保存新数据
         if self.db_manager.insert_result(result_data, self.table_id):
-            print("✅ 结果已保存到数据库")
-            print(f"   数据: {result_data}")
-        else:
-            print("❌ 保存到数据库失败")
+            self.console.echo("✅ 结果已保存到数据库")
+            self.console.echo(f"   数据: {result_data}")
+            return True
+        
+        self.console.echo("❌ 保存到数据库失败")
+        return False
     
     def run(self):
         """运行主循环 - 永久运行"""
@@ -348,11 +996,30 @@ class BaccaratSystem:
             print("按 Ctrl+C 退出程序")
             print("🎰"*25)
             
+            # 清空启动前残留的串口数据；此后局间扫到的牌全部保留
+            self.serial_manager.clear_queue()
+            
+            # 启用租约时先取得租约，备机在此待命
+            if self.lease and not self._wait_for_lease():
+                return
+            
+            # 恢复意外退出前（或原持有者故障前）进行中的牌局
+            self.resume_round()
+            
             # 永久循环
             while self.is_running:
                 try:
-                    # 清空串口缓存
-                    self.serial_manager.clear_queue()
+                    self.profiler.poll()
+                    
+                    # 失去租约后回到待命，重新取得后按临时表恢复进行中的牌局
+                    if self.lease and not self.lease.poll():
+                        self._on_lease_lost()
+                        if not self._wait_for_lease(reload=True):
+                            break
+                        self.resume_round()
+                    
+                    # 等待下一局开始
+                    self.wait_for_round_start()
                     
                     # 运行一局游戏
                     self.run_game()
@@ -363,8 +1030,8 @@ class BaccaratSystem:
                 except Exception as e:
                     logger.error(f"游戏循环出错: {e}")
                     print(f"\n❌ 游戏循环出错: {e}")
-                    print("10秒后自动重试...")
-                    time.sleep(10)
+                    print(f"{ERROR_RETRY_DELAY}秒后自动重试...")
+                    time.sleep(ERROR_RETRY_DELAY)
                     
         except KeyboardInterrupt:
             print("\n\n" + "⚠️"*25)
@@ -376,14 +1043,43 @@ class BaccaratSystem:
     
     def cleanup(self):
         """清理资源"""
+        self.console.stop()
         print("\n正在清理资源...")
         
+        for watchdog in self.watchdogs:
+            watchdog.stop()
+        
+        if self.tracer:
+            # 控制台渲染线程已停止，直接输出
+            self.dump_latency_trace(echo=print)
+        
+        self.profiler.close()
+        if self.profiling_server:
+            self.profiling_server.stop()
+        
         if self.serial_manager:
             self.serial_manager.disconnect()
         
         if self.db_manager:
+            if self.table_stats and self.db_ready.is_set():
+                self.table_stats.flush(self.db_manager)
+            # 释放租约，备机可立即接管
+            if self.lease and self.db_ready.is_set():
+                self.lease.release()
             self.db_manager.disconnect()
         
+        if self.metrics_server:
+            self.metrics_server.stop()
+        
+        if self.event_feed:
+            self.event_feed.stop()
+        
+        if self.read_server:
+            self.read_server.stop()
+        
+        if self.journal:
+            self.journal.close()
+        
         print("资源清理完成，程序退出")
 
 
@@ -404,25 +1100,103 @@ def main():
                        nargs='?',
                        default='1',
                        help='桌号 (默认: 1)')
+    parser.add_argument('--trace',
+                       action='store_true',
+                       default=LATENCY_TRACE_ENABLED,
+                       help=f'启用分阶段延迟追踪，退出或收到信号时导出到 {LATENCY_TRACE_FILE}')
+    parser.add_argument('--metrics-port',
+                       type=int,
+                       default=METRICS_PORT if METRICS_ENABLED else None,
+                       help=f'启动 HTTP /metrics 指标端点的端口 (如 {METRICS_PORT})')
+    parser.add_argument('--event-port',
+                       type=int,
+                       default=EVENT_FEED_PORT if EVENT_FEED_ENABLED else None,
+                       help=f'启动本地事件推送服务的端口 (如 {EVENT_FEED_PORT})')
+    parser.add_argument('--read-port',
+                       type=int,
+                       default=READ_MODEL_PORT if READ_MODEL_ENABLED else None,
+                       help=f'启动本地结果查询服务（ETag / 长轮询）的端口 (如 {READ_MODEL_PORT})')
+    parser.add_argument('--profile-port',
+                       type=int,
+                       default=PROFILING_PORT if PROFILING_ENABLED else None,
+                       help=f'启动本地性能分析控制端口 (如 {PROFILING_PORT})，Linux 也可用 kill -USR2 触发')
+    parser.add_argument('--table-stats',
+                       action='store_true',
+                       default=TABLE_STATS_ENABLED,
+                       help='按(桌号, 小时)累加统计，定期写入 tu_bjl_stats_hourly')
+    parser.add_argument('--lease',
+                       action='store_true',
+                       default=TABLE_LEASE_ENABLED,
+                       help=f'启用桌台租约：多台主机可待命同一桌号，持有者故障后约 {LEASE_TTL} 秒内由备机接管')
+    parser.add_argument('--take-lease',
+                       action='store_true',
+                       help='启动时不等租约过期，强制接管桌号（原持有者的写入将被拒绝）')
+    parser.add_argument('--headless',
+                       action='store_true',
+                       default=CONSOLE_HEADLESS,
+                       help='无界面模式：不输出发牌画面和等待状态（日志照常输出）')
+    parser.add_argument('--log-json',
+                       default=LOG_JSON_FILE,
+                       help='额外写入 JSON Lines 滚动日志文件的路径')
+    parser.add_argument('--journal',
+                       default=JOURNAL_PATH if JOURNAL_ENABLED else None,
+                       help=f'记录审计用事件日志的文件路径 (如 {JOURNAL_PATH})')
+    parser.add_argument('--backup-port',
+                       default=BACKUP_COM_PORT,
+                       help='备用扫描枪串口号，主备同时读取，主用设备故障时自动切换')
+    parser.add_argument('--decoder',
+                       choices=sorted(DECODERS),
+                       help='主扫描枪协议解码器 (默认按 SCANNER_DECODERS / SCANNER_DECODER 配置)')
+    parser.add_argument('--backup-decoder',
+                       choices=sorted(DECODERS),
+                       help='备用扫描枪协议解码器 (默认按配置)')
+    parser.add_argument('--reader-mode',
+                       choices=['thread', 'process'],
+                       default=SERIAL_READER_MODE,
+                       help='串口读取方式: thread 读取线程 / process 独立子进程 (默认: %(default)s)')
     
     args = parser.parse_args()
     
+    # 配置日志 - 通过队列由后台线程输出，不阻塞游戏线程
+    log_listener = setup_logging(json_file=args.log_json)
+    
     # 显示启动信息
     print("\n" + "🎲"*25)
     print("百家乐发牌系统 v1.0 - 永久循环版")
     print("🎲"*25)
     print(f"\n配置信息:")
     print(f"  串口: {args.com_port}")
+    if args.backup_port:
+        print(f"  备用串口: {args.backup_port}")
     print(f"  波特率: {args.baud_rate}")
     print(f"  桌号: {args.table_id}")
+    if args.lease or args.take_lease:
+        print(f"  桌台租约: 启用 (有效期 {LEASE_TTL}秒{'，强制接管' if args.take_lease else ''})")
     print(f"  游戏超时: {GAME_TIMEOUT}秒")
     print(f"  单牌超时: {CARD_SCAN_TIMEOUT}秒")
     print(f"\n⚠️  系统将永久运行，游戏自动循环")
     print(f"⚠️  无需人工确认，按 Ctrl+C 退出")
     
     # 创建并运行系统
-    system = BaccaratSystem(args.com_port, args.baud_rate, args.table_id)
-    system.run()
+    system = BaccaratSystem(args.com_port, args.baud_rate, args.table_id,
+                            trace_latency=args.trace,
+                            metrics_port=args.metrics_port,
+                            event_port=args.event_port,
+                            headless=args.headless,
+                            journal_path=args.journal,
+                            reader_mode=args.reader_mode,
+                            backup_port=args.backup_port,
+                            decoder=args.decoder,
+                            backup_decoder=args.backup_decoder,
+                            read_port=args.read_port,
+                            table_stats=args.table_stats,
+                            profile_port=args.profile_port,
+                            table_lease=args.lease or args.take_lease,
+                            take_lease=args.take_lease)
+    try:
+        system.run()
+    finally:
+        log_listener.stop()
 
 
 if __name__ == '__main__':
@@ -0,0 +1,364 @@
+# metrics.py
+"""
+运行指标
+提供计数器、仪表盘、直方图，以及可选的内嵌 HTTP /metrics 端点（Prometheus 文本格式）
+指标更新只做加锁累加，渲染和网络I/O都在独立线程中完成，不阻塞游戏线程
+"""
+
+import time
+import threading
+import logging
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+# 默认直方图分桶（秒）
+DEFAULT_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _format_value(value):
+    """格式化指标数值"""
+    if value == float('inf'):
+        return '+Inf'
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+def _escape_label_value(value):
+    """按 Prometheus 文本格式转义标签值中的反斜杠、双引号和换行"""
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_labels(labelnames, labelvalues, extra=None):
+    """格式化标签，如 {table_id="1"}"""
+    pairs = list(zip(labelnames, labelvalues))
+    if extra:
+        pairs.append(extra)
+    if not pairs:
+        return ''
+    body = ','.join(f'{name}="{_escape_label_value(value)}"' for name, value in pairs)
+    return '{' + body + '}'
+
+
+class _Metric:
+    """指标基类"""
+    
+    metric_type = 'untyped'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.lock = threading.Lock()
+    
+    def _key(self, labels):
+        """将标签参数转换为有序元组"""
+        if set(labels) != set(self.labelnames):
+            raise ValueError(f"指标 {self.name} 标签不匹配: {sorted(labels)} != {list(self.labelnames)}")
+        return tuple(str(labels[name]) for name in self.labelnames)
+    
+    def render(self):
+        """渲染为文本行"""
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.metric_type}",
+        ]
+        lines.extend(self._render_samples())
+        return lines
+    
+    def _render_samples(self):
+        raise NotImplementedError
+
+
+class Counter(_Metric):
+    """单调递增计数器"""
+    
+    metric_type = 'counter'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+    
+    def inc(self, amount=1, **labels):
+        """增加计数"""
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = self.values.get(key, 0) + amount
+    
+    def get(self, **labels):
+        """获取当前计数"""
+        with self.lock:
+            return self.values.get(self._key(labels), 0)
+    
+    def _render_samples(self):
+        with self.lock:
+            items = list(self.values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items]
+
+
+class Gauge(_Metric):
+    """可增可减的仪表盘，支持在采集时通过回调取值"""
+    
+    metric_type = 'gauge'
+    
+    def __init__(self, name, documentation, labelnames=()):
+        super().__init__(name, documentation, labelnames)
+        self.values = {}
+        self.functions = {}
+    
+    def set(self, value, **labels):
+        """设置数值"""
+        key = self._key(labels)
+        with self.lock:
+            self.values[key] = value
+    
+    def set_function(self, func, **labels):
+        """设置采集时调用的取值函数"""
+        key = self._key(labels)
+        with self.lock:
+            self.functions[key] = func
+    
+    def _render_samples(self):
+        with self.lock:
+            items = dict(self.values)
+            functions = list(self.functions.items())
+        for key, func in functions:
+            try:
+                items[key] = func()
+            except Exception as e:
+                logger.debug(f"指标 {self.name} 取值失败: {e}")
+        return [f"{self.name}{_format_labels(self.labelnames, key)} {_format_value(value)}"
+                for key, value in items.items()]
+
+
+class _HistogramTimer:
+    """直方图计时上下文"""
+    
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+        self.start = None
+    
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+    
+    def __exit__(self, exc_type, exc_value, tb):
+        self.histogram.observe(time.perf_counter() - self.start, **self.labels)
+        return False
+
+
+class Histogram(_Metric):
+    """固定分桶直方图"""
+    
+    metric_type = 'histogram'
+    
+    def __init__(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+        self.values = {}  # key -> [各桶计数..., 总和, 总数]
+    
+    def observe(self, value, **labels):
+        """记录一个观测值"""
+        key = self._key(labels)
+        with self.lock:
+            data = self.values.get(key)
+            if data is None:
+                data = self.values[key] = [0] * (len(self.buckets) + 2)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    data[i] += 1
+                    break
+            data[-2] += value
+            data[-1] += 1
+    
+    def time(self, **labels):
+        """
+        计时上下文管理器
+        
+        用法:
+            with DB_STATEMENT_SECONDS.time(operation='insert_result'):
+                ...
+        """
+        return _HistogramTimer(self, labels)
+    
+    def _render_samples(self):
+        with self.lock:
+            items = [(key, list(data)) for key, data in self.values.items()]
+        lines = []
+        for key, data in items:
+            cumulative = 0
+            for bound, count in zip(self.buckets, data):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', _format_value(float(bound))))} {cumulative}")
+            lines.append(f"{self.name}_bucket{_format_labels(self.labelnames, key, ('le', '+Inf'))} {data[-1]}")
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {_format_value(data[-2])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {data[-1]}")
+        return lines
+
+
+class MetricsRegistry:
+    """指标注册表"""
+    
+    def __init__(self):
+        self.metrics = {}
+        self.lock = threading.Lock()
+    
+    def _register(self, metric):
+        with self.lock:
+            if metric.name in self.metrics:
+                raise ValueError(f"指标重复注册: {metric.name}")
+            self.metrics[metric.name] = metric
+        return metric
+    
+    def counter(self, name, documentation, labelnames=()):
+        """注册计数器"""
+        return self._register(Counter(name, documentation, labelnames))
+    
+    def gauge(self, name, documentation, labelnames=()):
+        """注册仪表盘"""
+        return self._register(Gauge(name, documentation, labelnames))
+    
+    def histogram(self, name, documentation, labelnames=(), buckets=DEFAULT_BUCKETS):
+        """注册直方图"""
+        return self._register(Histogram(name, documentation, labelnames, buckets))
+    
+    def render(self):
+        """
+        渲染所有指标
+        
+        Returns:
+            str: Prometheus 文本格式
+        """
+        with self.lock:
+            metrics = list(self.metrics.values())
+        lines = []
+        for metric in metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+# 全局注册表
+REGISTRY = MetricsRegistry()
+
+# ========== 系统指标定义 ==========
+SCAN_QUEUE_DEPTH = REGISTRY.gauge(
+    'baccarat_scan_queue_depth', '串口数据队列中待处理的数据数量', ('table_id',))
+SCAN_QUEUE_HIGH_WATER = REGISTRY.gauge(
+    'baccarat_scan_queue_high_water', '串口数据队列的历史最大长度', ('port',))
+SCAN_QUEUE_DROPPED = REGISTRY.counter(
+    'baccarat_scan_queue_dropped_total',
+    '串口数据队列丢弃的扫描数量 (overflow 队列满 / spilled 队列满并写入事件日志 / cleared 清空队列)', ('port', 'reason'))
+INVALID_CARDS = REGISTRY.counter(
+    'baccarat_invalid_cards_total', '被拒绝的无效卡片代码数量', ('table_id',))
+SERIAL_RECONNECTS = REGISTRY.counter(
+    'baccarat_serial_reconnects_total', '串口重连尝试次数', ('port',))
+SERIAL_READER_RESTARTS = REGISTRY.counter(
+    'baccarat_serial_reader_restarts_total', '看门狗重启串口读取的次数', ('port', 'reason'))
+SERIAL_RECOVERY_SECONDS = REGISTRY.histogram(
+    'baccarat_serial_recovery_seconds', '串口读取从发现故障到恢复正常的耗时(秒)', ('port',),
+    buckets=(0.1, 0.25, 0.5, 1, 2, 5, 10, 30, 60, 120, 300, 900))
+SCAN_DECODE_ERRORS = REGISTRY.counter(
+    'baccarat_scan_decode_errors_total', '扫描数据解码失败次数（校验错误、未知 UID 等）', ('port', 'reason'))
+SCANNER_FAILOVERS = REGISTRY.counter(
+    'baccarat_scanner_failovers_total', '主备扫描枪切换次数（标签为切换后的主用设备）', ('port',))
+DUPLICATE_SCANS = REGISTRY.counter(
+    'baccarat_duplicate_scans_total', '主备扫描枪重复报告而被丢弃的扫描数量', ('port',))
+DB_RECONNECTS = REGISTRY.counter(
+    'baccarat_db_reconnects_total', '数据库重连尝试次数')
+DB_STATEMENT_SECONDS = REGISTRY.histogram(
+    'baccarat_db_statement_seconds', '数据库操作耗时(秒)，含提交', ('operation',))
+ROUND_DURATION_SECONDS = REGISTRY.histogram(
+    'baccarat_round_duration_seconds', '单局耗时(秒)，从开局到结果保存', ('table_id',),
+    buckets=(5, 10, 15, 20, 30, 45, 60, 90, 120, 180, 300))
+ROUND_CYCLE_SECONDS = REGISTRY.histogram(
+    'baccarat_round_cycle_seconds', '相邻两局开局时间间隔(秒)，反映桌台吞吐', ('table_id',),
+    buckets=(10, 15, 20, 25, 30, 40, 50, 60, 90, 120, 180, 300, 600))
+ROUNDS = REGISTRY.counter(
+    'baccarat_rounds_total', '已完成局数', ('table_id',))
+TIMEOUT_RESETS = REGISTRY.counter(
+    'baccarat_game_timeout_resets_total', '游戏超时重置次数', ('table_id',))
+GAME_COUNT = REGISTRY.gauge(
+    'baccarat_game_count', '本进程启动以来开始的局数', ('table_id',))
+EVENT_FEED_SUBSCRIBERS = REGISTRY.gauge(
+    'baccarat_event_feed_subscribers', '事件推送订阅者数量')
+LOG_RECORDS_DROPPED = REGISTRY.counter(
+    'baccarat_log_records_dropped_total', '因日志队列已满而丢弃的日志条数')
+EVENT_FEED_DROPPED = REGISTRY.counter(
+    'baccarat_event_feed_dropped_total', '因订阅者缓冲已满而丢弃的事件数量')
+STARTUP_PHASE_SECONDS = REGISTRY.gauge(
+    'baccarat_startup_phase_seconds', '启动各阶段耗时(秒)', ('phase',))
+READ_API_REQUESTS = REGISTRY.counter(
+    'baccarat_read_api_requests_total', '结果查询接口请求数', ('endpoint', 'status'))
+LEASE_HELD = REGISTRY.gauge(
+    'baccarat_table_lease_held', '本进程是否持有桌台租约 (1 持有 / 0 未持有)', ('table_id',))
+LEASE_ACQUISITIONS = REGISTRY.counter(
+    'baccarat_table_lease_acquisitions_total', '取得桌台租约的次数 (token 加1)', ('table_id',))
+LEASE_FENCED_WRITES = REGISTRY.counter(
+    'baccarat_table_lease_fenced_writes_total', '因租约失效被拒绝的写库次数', ('table_id', 'operation'))
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """/metrics 请求处理"""
+    
+    registry = REGISTRY
+    
+    def do_GET(self):
+        if self.path.split('?', 1)[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = self.registry.render().encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # 不向控制台输出访问日志
+        pass
+
+
+class MetricsServer:
+    """内嵌 HTTP 指标服务（在后台守护线程中运行）"""
+    
+    def __init__(self, host='127.0.0.1', port=9108, registry=REGISTRY):
+        """
+        初始化指标服务
+        
+        Args:
+            host: 监听地址
+            port: 监听端口
+            registry: 指标注册表
+        """
+        self.host = host
+        self.port = port
+        self.registry = registry
+        self.server = None
+        self.thread = None
+    
+    def start(self):
+        """启动服务"""
+        try:
+            handler = type('MetricsHandler', (_MetricsHandler,), {'registry': self.registry})
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.server.daemon_threads = True
+        except Exception as e:
+            logger.error(f"指标服务启动失败: {e}")
+            return False
+        
+        self.thread = threading.Thread(target=self.server.serve_forever, name='metrics-server')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"指标服务已启动: http://{self.host}:{self.port}/metrics")
+        return True
+    
+    def stop(self):
+        """停止服务"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            logger.info("指标服务已停止")
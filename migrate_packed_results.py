@@ -0,0 +1,165 @@
+# migrate_packed_results.py
+"""
+结果表紧凑编码迁移
+为 tu_bjl_result 添加紧凑编码和汇总列（已存在的列跳过），并按 id 分批回填已有记录；
+可重复运行，只回填 cards_packed 为空的记录。迁移完成后在 config.py 中打开 RESULT_PACKED_COLUMNS
+含无法识别的牌的记录只写 cards_packed（该位置为63），汇总列保持 NULL
+
+新增列:
+    cards_packed   BIGINT UNSIGNED  6张牌的紧凑编码（card_codec.pack_cards / unpack_cards）
+    winner         TINYINT          1闲 2庄 3和
+    player_total   TINYINT          闲家点数
+    banker_total   TINYINT          庄家点数
+    is_natural     TINYINT          是否天牌
+    player_pair    TINYINT          闲对子
+    banker_pair    TINYINT          庄对子
+原有 result JSON 列保持不变，旧的读取方式不受影响
+
+用法:
+    python migrate_packed_results.py
+    python migrate_packed_results.py --batch 5000 --ddl-only
+"""
+
+import sys
+import time
+import argparse
+import logging
+
+from card_codec import decode_result, packed_columns, PACK_BITS, PACK_INVALID
+from database_manager import DatabaseManager, PACKED_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+COLUMN_TYPES = {
+    'cards_packed': 'BIGINT UNSIGNED NULL',
+    'winner': 'TINYINT NULL',
+    'player_total': 'TINYINT NULL',
+    'banker_total': 'TINYINT NULL',
+    'is_natural': 'TINYINT NULL',
+    'player_pair': 'TINYINT NULL',
+    'banker_pair': 'TINYINT NULL',
+}
+INDEXES = {
+    'idx_table_winner': '(tableId, winner)',
+    'idx_table_natural': '(tableId, is_natural)',
+}
+
+
+def add_columns(db):
+    """
+    添加缺少的列和索引
+    
+    Returns:
+        list: 本次添加的列和索引名称
+    """
+    db.cursor.execute(
+        "SELECT COLUMN_NAME FROM information_schema.COLUMNS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tu_bjl_result'")
+    existing = {row[0] for row in db.cursor.fetchall()}
+    db.cursor.execute(
+        "SELECT DISTINCT INDEX_NAME FROM information_schema.STATISTICS "
+        "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = 'tu_bjl_result'")
+    existing |= {row[0] for row in db.cursor.fetchall()}
+    
+    clauses = [f"ADD COLUMN {name} {COLUMN_TYPES[name]}" for name in PACKED_COLUMNS if name not in existing]
+    clauses += [f"ADD INDEX {name} {columns}" for name, columns in INDEXES.items() if name not in existing]
+    if clauses:
+        # 一条 ALTER 完成全部修改，只重建一次表
+        db.cursor.execute(f"ALTER TABLE tu_bjl_result {', '.join(clauses)}")
+        db.connection.commit()
+    return [clause.split()[2] for clause in clauses]
+
+
+def backfill(db, batch_size=2000, progress_every=100000):
+    """
+    回填 cards_packed 为空的记录（按 id 分批，每批一次提交）
+    
+    Returns:
+        tuple: (回填行数, 无法解析跳过的行数)
+    """
+    select = ("SELECT id, result FROM tu_bjl_result WHERE id > %s AND cards_packed IS NULL "
+              "ORDER BY id LIMIT %s")
+    update = (f"UPDATE tu_bjl_result SET {', '.join(f'{name} = %s' for name in PACKED_COLUMNS)} "
+              f"WHERE id = %s")
+    last_id = 0
+    updated = skipped = 0
+    next_report = progress_every
+    started = time.monotonic()
+    while True:
+        db.cursor.execute(select, (last_id, batch_size))
+        rows = db.cursor.fetchall()
+        if not rows:
+            break
+        params = []
+        for result_id, result in rows:
+            try:
+                params.append(packed_columns(decode_result(result)) + (result_id,))
+            except (ValueError, TypeError, AttributeError) as e:
+                logger.warning(f"跳过无法解析的结果 id={result_id}: {e}")
+                skipped += 1
+        if params:
+            db.cursor.executemany(update, params)
+            db.connection.commit()
+        updated += len(params)
+        last_id = rows[-1][0]
+        if updated >= next_report:
+            elapsed = time.monotonic() - started
+            print(f"已回填 {updated} 行 (id ≤ {last_id}, {updated / elapsed:.0f} 行/秒)", file=sys.stderr)
+            next_report += progress_every
+    return updated, skipped
+
+
+def clear_invalid_summaries(db):
+    """
+    清空含无法识别的牌的记录的汇总列（早期回填曾跳过这些牌照常计算点数和胜负）
+    
+    Returns:
+        int: 清空的行数
+    """
+    slots = ' OR '.join(f"(cards_packed >> {slot * PACK_BITS}) & {PACK_INVALID} = {PACK_INVALID}"
+                        for slot in range(6))
+    summaries = ', '.join(f"{name} = NULL" for name in PACKED_COLUMNS[1:])
+    db.cursor.execute(f"UPDATE tu_bjl_result SET {summaries} "
+                      f"WHERE cards_packed IS NOT NULL AND winner IS NOT NULL AND ({slots})")
+    cleared = db.cursor.rowcount
+    db.connection.commit()
+    return cleared
+
+
+def main():
+    """命令行迁移"""
+    parser = argparse.ArgumentParser(description='结果表紧凑编码迁移 (tu_bjl_result)')
+    parser.add_argument('--batch', type=int, default=2000, help='每批回填行数')
+    parser.add_argument('--ddl-only', action='store_true', help='只添加列和索引，不回填')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    db = DatabaseManager()
+    if not db.connect():
+        print("❌ 数据库连接失败!")
+        return 1
+    try:
+        added = add_columns(db)
+        print(f"✅ 添加: {', '.join(added)}" if added else "✅ 列和索引已存在")
+        if not args.ddl_only:
+            started = time.monotonic()
+            updated, skipped = backfill(db, args.batch)
+            print(f"✅ 回填完成: {updated} 行，跳过 {skipped} 行，耗时 {time.monotonic() - started:.1f}秒")
+            cleared = clear_invalid_summaries(db)
+            if cleared:
+                print(f"✅ 含无法识别的牌的记录已清空汇总列: {cleared} 行")
+    except Exception as e:
+        logger.error(f"迁移出错: {e}")
+        try:
+            db.connection.rollback()
+        except Exception:
+            pass
+        return 1
+    finally:
+        db.disconnect()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
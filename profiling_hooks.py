@@ -0,0 +1,452 @@
+# profiling_hooks.py
+"""
+按需性能分析
+运行中的系统收到信号 (Linux: SIGUSR2) 或本地控制端口的命令后，在不中断游戏循环的情况下
+运行 N 秒性能分析，结束后把热点函数、线程栈写入文件，并在控制台显示最热的几个函数
+
+两种方式:
+    sample    采样分析：独立线程每隔几毫秒抓取所有线程的调用栈，开销低，可在营业中使用；
+              另存折叠栈文件 (.folded)，可用 flamegraph.pl / speedscope 生成火焰图
+    cprofile  确定性分析：统计游戏线程每个函数的调用次数和耗时，开销较高；
+              另存 .prof 文件，可用 pstats / snakeviz 查看
+cProfile 只能在被分析的线程中启停，因此由游戏线程在等待扫描的循环中调用 poll() 完成
+
+控制端口协议（每行一条命令，返回一行或多行文本）:
+    profile [sample|cprofile] [秒数]   开始分析
+    stop                              提前结束并输出
+    stacks                            立即导出所有线程的调用栈
+    status                            当前状态
+
+用法（客户端）:
+    python profiling_hooks.py profile sample 30 --port 9111
+    python profiling_hooks.py stacks
+"""
+
+import io
+import os
+import sys
+import time
+import socket
+import pstats
+import cProfile
+import argparse
+import threading
+import traceback
+import logging
+from collections import Counter
+from datetime import datetime
+
+logger = logging.getLogger(__name__)
+
+MODES = ('sample', 'cprofile')
+
+
+def _label(code):
+    """函数标识: 名称 (文件:行号)"""
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})"
+
+
+def format_thread_stacks():
+    """
+    所有线程当前的调用栈
+    
+    Returns:
+        list: 文本行
+    """
+    names = {thread.ident: thread.name for thread in threading.enumerate()}
+    lines = []
+    for ident, frame in sys._current_frames().items():
+        lines.append(f"--- 线程 {names.get(ident, '?')} ({ident}) ---")
+        lines.extend(line.rstrip('\n') for line in traceback.format_stack(frame))
+        lines.append('')
+    return lines
+
+
+class SamplingProfiler:
+    """采样分析器：定期抓取所有线程的调用栈并计数"""
+    
+    def __init__(self, interval=0.005):
+        """
+        Args:
+            interval: 采样间隔（秒）
+        """
+        self.interval = interval
+        self.stacks = Counter()  # {(线程ident, (外层函数, ..., 当前函数)): 次数}
+        self.samples = 0
+        self.names = {}          # {线程ident: 线程名}
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='sampling-profiler')
+        self.thread.daemon = True
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread and self.thread is not threading.current_thread():
+            self.thread.join(timeout=2)
+    
+    def _loop(self):
+        own = threading.get_ident()
+        while not self.stop_event.wait(self.interval):
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                stack = []
+                while frame is not None:
+                    stack.append(_label(frame.f_code))
+                    frame = frame.f_back
+                self.stacks[(ident, tuple(reversed(stack)))] += 1
+            self.samples += 1
+            if self.samples % 200 == 1:
+                self.names.update((thread.ident, thread.name) for thread in threading.enumerate())
+    
+    def hot_functions(self, thread_ident=None, top=20):
+        """
+        热点函数
+        
+        Args:
+            thread_ident: 只统计该线程（None表示所有线程）
+            top: 返回条数
+        
+        Returns:
+            list: [(函数, 自身采样数, 累计采样数)]，按自身采样数降序
+        """
+        own, total = Counter(), Counter()
+        for (ident, stack), count in self.stacks.items():
+            if thread_ident is not None and ident != thread_ident:
+                continue
+            own[stack[-1]] += count
+            for label in set(stack):
+                total[label] += count
+        return [(label, count, total[label]) for label, count in own.most_common(top)]
+    
+    def collapsed(self):
+        """折叠栈格式（线程名;外层函数;...;当前函数 次数）"""
+        for (ident, stack), count in sorted(self.stacks.items(), key=lambda item: -item[1]):
+            yield f"{self.names.get(ident, ident)};{';'.join(stack)} {count}"
+
+
+class ProfilingControl:
+    """性能分析控制：一次只运行一个分析，结束后写文件并显示热点"""
+    
+    def __init__(self, directory='.', table_id='', sample_interval=0.005, top=20, echo=print):
+        """
+        初始化（须在游戏线程中创建，cProfile 分析的是创建它的线程）
+        
+        Args:
+            directory: 输出目录
+            table_id: 桌号（用于文件名）
+            sample_interval: 采样间隔（秒）
+            top: 报告的热点函数条数
+            echo: 显示热点的函数（如控制台输出）
+        """
+        self.directory = directory
+        self.table_id = table_id
+        self.sample_interval = sample_interval
+        self.top = top
+        self.echo = echo
+        self.owner = threading.get_ident()
+        self.lock = threading.Lock()
+        self.session = None  # {'mode', 'seconds', 'until', 'profiler', 'started'}，cprofile 未启动时 profiler 为None
+        self.timer = None
+        self.last_report = None
+    
+    @property
+    def active(self):
+        return self.session is not None
+    
+    def start(self, mode='sample', seconds=30):
+        """
+        开始分析
+        
+        Args:
+            mode: sample / cprofile
+            seconds: 分析时长
+        
+        Returns:
+            str: 结果说明
+        """
+        if mode not in MODES:
+            return f"未知的分析方式: {mode} (可选: {', '.join(MODES)})"
+        with self.lock:
+            if self.session:
+                return f"已有 {self.session['mode']} 分析在运行"
+            self.session = {'mode': mode, 'seconds': seconds, 'until': time.monotonic() + seconds,
+                            'profiler': None, 'started': time.monotonic()}
+            if mode == 'sample':
+                profiler = SamplingProfiler(self.sample_interval)
+                profiler.start()
+                self.session['profiler'] = profiler
+                self.timer = threading.Timer(seconds, self.finish)
+                self.timer.daemon = True
+                self.timer.start()
+        if mode == 'cprofile' and threading.get_ident() == self.owner:
+            self.poll()
+        logger.info(f"性能分析开始: {mode} {seconds}秒")
+        return f"已开始 {mode} 分析 {seconds}秒"
+    
+    def poll(self):
+        """游戏线程定期调用：启动等待中的 cProfile、结束到期的 cProfile"""
+        session = self.session
+        if not session or session['mode'] != 'cprofile' or threading.get_ident() != self.owner:
+            return
+        if session['profiler'] is None:
+            profiler = cProfile.Profile()
+            session['profiler'] = profiler
+            session['started'] = time.monotonic()
+            session['until'] = session['started'] + session['seconds']
+            profiler.enable()
+        elif time.monotonic() >= session['until']:
+            session['profiler'].disable()
+            self.finish()
+    
+    def stop(self):
+        """
+        提前结束分析
+        
+        Returns:
+            str: 结果说明
+        """
+        with self.lock:
+            session = self.session
+            if not session:
+                return "没有正在运行的分析"
+            if session['mode'] == 'cprofile':
+                if session['profiler'] is None:
+                    self.session = None
+                    return "已取消尚未开始的 cprofile 分析"
+                if threading.get_ident() != self.owner:
+                    # 由游戏线程在下一次 poll() 时停止并输出
+                    session['until'] = 0
+                    return "将在游戏线程下一次检查时结束 cprofile 分析"
+                session['profiler'].disable()
+        self.finish()
+        return f"已结束，报告: {self.last_report}"
+    
+    def toggle(self, mode='sample', seconds=30):
+        """未运行时开始，运行中时提前结束（信号请求线程调用；不能在信号处理函数中调用，会取锁和写文件）"""
+        return self.stop() if self.active else self.start(mode, seconds)
+    
+    def close(self):
+        """退出前结束正在运行的分析并输出报告（在游戏线程中调用）"""
+        session = self.session
+        if not session:
+            return
+        if session['mode'] == 'cprofile' and session['profiler'] is not None:
+            session['profiler'].disable()
+        self.finish()
+    
+    def finish(self):
+        """结束当前分析，写入报告并显示热点"""
+        with self.lock:
+            session, self.session = self.session, None
+            if self.timer:
+                self.timer.cancel()
+                self.timer = None
+        if not session or session['profiler'] is None:
+            return None
+        profiler = session['profiler']
+        elapsed = time.monotonic() - session['started']
+        stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+        base = os.path.join(self.directory, f"profile_{self.table_id}_{stamp}_{session['mode']}")
+        
+        try:
+            if session['mode'] == 'sample':
+                profiler.stop()
+                hot, extra = self._sample_report(profiler, base)
+            else:
+                hot, extra = self._cprofile_report(profiler, base)
+            lines = [f"性能分析 {session['mode']} {elapsed:.1f}秒 ({datetime.now():%Y-%m-%d %H:%M:%S})", ''] + extra
+            lines += ['', '线程调用栈（结束时）:', ''] + format_thread_stacks()
+            with open(base + '.txt', 'w', encoding='utf-8') as f:
+                f.write('\n'.join(lines) + '\n')
+        except Exception as e:
+            logger.error(f"性能分析报告输出失败: {e}")
+            return None
+        
+        self.last_report = base + '.txt'
+        logger.info(f"性能分析报告: {self.last_report}")
+        self.echo(f"\n🔥 性能分析 ({session['mode']}, {elapsed:.0f}秒) 游戏线程热点:")
+        for line in hot[:5]:
+            self.echo(f"   {line}")
+        self.echo(f"   报告: {self.last_report}")
+        return self.last_report
+    
+    def _sample_report(self, profiler, base):
+        """采样分析报告；返回 (游戏线程热点行, 报告正文行)"""
+        with open(base + '.folded', 'w', encoding='utf-8') as f:
+            for line in profiler.collapsed():
+                f.write(line + '\n')
+        samples = max(profiler.samples, 1)
+        
+        def rows(ident):
+            return [f"{own / samples:>6.1%} 自身 {total / samples:>6.1%} 累计  {label}"
+                    for label, own, total in profiler.hot_functions(ident, self.top)]
+        
+        hot = rows(self.owner)
+        lines = [f"采样 {profiler.samples} 次，间隔 {profiler.interval * 1000:.0f}ms，折叠栈: {base}.folded", '',
+                 '游戏线程热点:'] + hot
+        for ident in sorted({ident for ident, _ in profiler.stacks} - {self.owner}):
+            lines += ['', f"线程 {profiler.names.get(ident, ident)} 热点:"] + rows(ident)
+        return hot, lines
+    
+    def _cprofile_report(self, profiler, base):
+        """cProfile 报告；返回 (游戏线程热点行, 报告正文行)"""
+        profiler.dump_stats(base + '.prof')
+        stats = pstats.Stats(profiler)
+        ordered = sorted(stats.stats.items(), key=lambda item: -item[1][2])[:self.top]
+        hot = [f"{tt * 1000:>8.1f}ms 自身 {ct * 1000:>8.1f}ms 累计 {nc:>7}次  "
+               f"{name} ({os.path.basename(filename)}:{line})"
+               for (filename, line, name), (cc, nc, tt, ct, callers) in ordered]
+        text = io.StringIO()
+        pstats.Stats(profiler, stream=text).sort_stats('cumulative').print_stats(self.top)
+        return hot, [f"pstats 文件: {base}.prof", '', '按自身耗时:'] + hot + ['', '按累计耗时:', text.getvalue()]
+    
+    def dump_stacks(self):
+        """
+        立即导出所有线程的调用栈
+        
+        Returns:
+            str: 文件路径，失败时返回None
+        """
+        path = os.path.join(self.directory, f"stacks_{self.table_id}_{datetime.now():%Y%m%d_%H%M%S}.txt")
+        try:
+            with open(path, 'w', encoding='utf-8') as f:
+                f.write('\n'.join(format_thread_stacks()) + '\n')
+        except OSError as e:
+            logger.error(f"导出线程栈失败: {e}")
+            return None
+        logger.info(f"线程栈已导出: {path}")
+        return path
+    
+    def status(self):
+        """当前状态说明"""
+        session = self.session
+        if not session:
+            return f"空闲，上次报告: {self.last_report or '无'}"
+        if session['profiler'] is None:
+            return f"{session['mode']} 分析等待游戏线程启动"
+        return f"{session['mode']} 分析进行中，剩余 {max(0, session['until'] - time.monotonic()):.0f}秒"
+    
+    def handle_command(self, line, default_mode='sample', default_seconds=30):
+        """
+        执行一条控制命令
+        
+        Returns:
+            str: 回复文本
+        """
+        parts = line.split()
+        if not parts:
+            return ''
+        command = parts[0].lower()
+        if command == 'profile':
+            mode = parts[1] if len(parts) > 1 else default_mode
+            try:
+                seconds = float(parts[2]) if len(parts) > 2 else default_seconds
+            except ValueError:
+                return f"无效的秒数: {parts[2]}"
+            return self.start(mode, seconds)
+        if command == 'stop':
+            return self.stop()
+        if command == 'stacks':
+            path = self.dump_stacks()
+            return f"已导出: {path}" if path else "导出失败"
+        if command == 'status':
+            return self.status()
+        return f"未知命令: {command} (可用: profile, stop, stacks, status)"
+
+
+class ProfilingServer:
+    """本地控制端口（逐行文本命令）"""
+    
+    def __init__(self, control, host='127.0.0.1', port=9111, default_mode='sample', default_seconds=30):
+        """
+        Args:
+            control: ProfilingControl
+            host: 监听地址（只应监听本机）
+            port: 监听端口
+            default_mode: profile 命令未指定方式时使用
+            default_seconds: profile 命令未指定秒数时使用
+        """
+        self.control = control
+        self.host = host
+        self.port = port
+        self.default_mode = default_mode
+        self.default_seconds = default_seconds
+        self.server_socket = None
+        self.thread = None
+        self.running = False
+    
+    def start(self):
+        """启动服务"""
+        try:
+            self.server_socket = socket.create_server((self.host, self.port))
+        except OSError as e:
+            logger.error(f"性能分析控制端口启动失败: {e}")
+            return False
+        self.port = self.server_socket.getsockname()[1]
+        self.running = True
+        self.thread = threading.Thread(target=self._accept_loop, name='profiling-control')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"性能分析控制端口已启动: tcp://{self.host}:{self.port}")
+        return True
+    
+    def _accept_loop(self):
+        while self.running:
+            try:
+                conn, address = self.server_socket.accept()
+            except OSError:
+                break
+            try:
+                self._serve(conn)
+            except OSError as e:
+                logger.info(f"控制连接断开: {address} ({e})")
+            finally:
+                conn.close()
+    
+    def _serve(self, conn):
+        """逐行执行命令，直到对方关闭连接"""
+        conn.settimeout(60)
+        stream = conn.makefile('rw', encoding='utf-8', newline='\n')
+        for line in stream:
+            reply = self.control.handle_command(line.strip(), self.default_mode, self.default_seconds)
+            stream.write(reply + '\n')
+            stream.flush()
+    
+    def stop(self):
+        """停止服务"""
+        self.running = False
+        if self.server_socket:
+            try:
+                self.server_socket.close()
+            except OSError:
+                pass
+            self.server_socket = None
+
+
+def main():
+    """命令行客户端：向运行中的系统发送一条命令"""
+    parser = argparse.ArgumentParser(description='性能分析控制客户端')
+    parser.add_argument('command', nargs='+', help='命令，如: profile sample 30 / stop / stacks / status')
+    parser.add_argument('--host', default='127.0.0.1', help='控制端口地址')
+    parser.add_argument('--port', type=int, default=9111, help='控制端口')
+    args = parser.parse_args()
+    
+    try:
+        with socket.create_connection((args.host, args.port), timeout=10) as conn:
+            stream = conn.makefile('rw', encoding='utf-8', newline='\n')
+            stream.write(' '.join(args.command) + '\n')
+            stream.flush()
+            print(stream.readline().rstrip('\n'))
+    except OSError as e:
+        print(f"❌ 无法连接控制端口 {args.host}:{args.port}: {e}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
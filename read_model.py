@@ -0,0 +1,328 @@
+# read_model.py
+"""
+结果读模型与查询服务
+在进程内按桌号保存最近 N 局结果和当前临时表的牌，由 DatabaseManager 写库成功后同步更新、
+clear_table_data 后失效重置；看板通过本地 HTTP 接口读取，不再查询 MySQL
+
+接口（均为 GET，返回 JSON）:
+    /tables/<桌号>                  最近结果和临时牌，支持 ETag / If-None-Match；
+                                    带 ?wait=秒 且 ETag 未变化时等待变化（长轮询），超时返回 304
+    /tables/<桌号>/latest           最新一局
+    /tables/<桌号>/rounds?after=id  id 之后的各局；带 ?wait=秒 且没有新局时等待下一局（长轮询）
+只保存本进程写入的数据，启动时由 DatabaseManager.load_read_model() 从数据库加载一次
+"""
+
+import json
+import time
+import threading
+import logging
+from collections import deque
+from urllib.parse import urlsplit, parse_qs
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from metrics import READ_API_REQUESTS
+
+logger = logging.getLogger(__name__)
+
+
+class _TableView:
+    """单个桌号的数据"""
+    
+    def __init__(self, history):
+        self.rounds = deque(maxlen=history)  # [{'id', 'result', 'table_id'}]，旧 -> 新
+        self.temp = {}                       # {位置: 数据库格式的牌}
+        self.version = 0
+
+
+class ReadModel:
+    """按桌号的结果读模型（线程安全）"""
+    
+    def __init__(self, history=100):
+        """
+        初始化读模型
+        
+        Args:
+            history: 每个桌号保留的最近局数
+        """
+        self.history = history
+        self.tables = {}
+        self.condition = threading.Condition()
+        # ETag 中包含启动时间，进程重启后旧的 ETag 不会误判为未变化
+        self.epoch = int(time.time())
+    
+    def _changed(self, view):
+        """数据变化：版本号加一并唤醒等待者（调用方持有锁）"""
+        view.version += 1
+        self.condition.notify_all()
+    
+    def load(self, table_id, rounds, temp):
+        """
+        加载初始数据
+        
+        Args:
+            table_id: 桌号
+            rounds: 最近各局 [{'id', 'result', 'table_id'}]，按 id 升序
+            temp: 临时表的牌 {位置: 数据库格式}
+        """
+        view = _TableView(self.history)
+        view.rounds.extend(rounds)
+        view.temp = dict(temp)
+        with self.condition:
+            old = self.tables.get(str(table_id))
+            view.version = old.version if old else 0
+            self.tables[str(table_id)] = view
+            self._changed(view)
+    
+    def is_loaded(self, table_id):
+        """是否已加载该桌号"""
+        with self.condition:
+            return str(table_id) in self.tables
+    
+    def set_temp_card(self, table_id, position, db_card):
+        """临时表写入一张牌"""
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            if view:
+                view.temp[position] = db_card
+                self._changed(view)
+    
+    def clear_temp(self, table_id):
+        """临时表已清理"""
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            if view and view.temp:
+                view.temp = {}
+                self._changed(view)
+    
+    def add_round(self, table_id, result_id, result):
+        """
+        结果表新增一局
+        
+        Args:
+            table_id: 桌号
+            result_id: 记录 id
+            result: 结果字典 {"1": "12|f", ...}
+        """
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            if view:
+                view.rounds.append({'id': result_id, 'result': result, 'table_id': str(table_id)})
+                self._changed(view)
+    
+    def remove_round(self, result_id):
+        """结果表删除一局"""
+        with self.condition:
+            for view in self.tables.values():
+                kept = [item for item in view.rounds if item['id'] != result_id]
+                if len(kept) != len(view.rounds):
+                    view.rounds = deque(kept, maxlen=self.history)
+                    self._changed(view)
+    
+    def invalidate(self, table_id):
+        """该桌号的临时表和结果表已全部清理"""
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            if view:
+                view.rounds.clear()
+                view.temp = {}
+                self._changed(view)
+    
+    def latest(self, table_id):
+        """
+        最新一局
+        
+        Returns:
+            dict: 与 DatabaseManager.get_latest_result 格式相同，没有时返回None
+        """
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            if view and view.rounds:
+                return dict(view.rounds[-1])
+            return None
+    
+    def has_rounds(self, table_id):
+        """该桌号是否有结果"""
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            return bool(view and view.rounds)
+    
+    def etag(self, table_id, version):
+        return f'"{self.epoch}-{table_id}-{version}"'
+    
+    def snapshot(self, table_id):
+        """
+        当前数据
+        
+        Returns:
+            tuple: (ETag, 数据字典)，桌号未加载时返回None
+        """
+        with self.condition:
+            view = self.tables.get(str(table_id))
+            if view is None:
+                return None
+            return self.etag(table_id, view.version), {
+                'table_id': str(table_id),
+                'version': view.version,
+                'temp': dict(view.temp),
+                'rounds': list(view.rounds),
+            }
+    
+    def wait_for_change(self, table_id, etag, timeout):
+        """
+        等待数据变化（ETag 与 etag 不同）
+        
+        Returns:
+            bool: 是否已变化
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                view = self.tables.get(str(table_id))
+                if view is None or self.etag(table_id, view.version) != etag:
+                    return True
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                self.condition.wait(remaining)
+    
+    def rounds_after(self, table_id, after_id, timeout=0):
+        """
+        id 之后的各局，没有时最多等待 timeout 秒
+        
+        Returns:
+            list: 各局（按 id 升序），超时返回空列表；桌号未加载时返回None
+        """
+        deadline = time.monotonic() + timeout
+        with self.condition:
+            while True:
+                view = self.tables.get(str(table_id))
+                if view is None:
+                    return None
+                rounds = [item for item in view.rounds if item['id'] > after_id]
+                remaining = deadline - time.monotonic()
+                if rounds or remaining <= 0:
+                    return rounds
+                self.condition.wait(remaining)
+
+
+class _ReadModelHandler(BaseHTTPRequestHandler):
+    """查询请求处理"""
+    
+    model = None
+    max_wait = 30
+    
+    def do_GET(self):
+        url = urlsplit(self.path)
+        parts = [part for part in url.path.split('/') if part]
+        query = parse_qs(url.query)
+        try:
+            wait = min(float(query.get('wait', ['0'])[0]), self.max_wait)
+            after = int(query.get('after', ['0'])[0])
+        except ValueError:
+            self._send(400, {'error': '参数格式错误'}, endpoint='invalid')
+            return
+        
+        if len(parts) == 2 and parts[0] == 'tables':
+            self._table(parts[1], wait)
+        elif len(parts) == 3 and parts[0] == 'tables' and parts[2] == 'latest':
+            self._latest(parts[1])
+        elif len(parts) == 3 and parts[0] == 'tables' and parts[2] == 'rounds':
+            self._rounds(parts[1], after, wait)
+        else:
+            self._send(404, {'error': '未知的接口'}, endpoint='invalid')
+    
+    def _table(self, table_id, wait):
+        etag = self.headers.get('If-None-Match')
+        if etag and wait > 0:
+            self.model.wait_for_change(table_id, etag, wait)
+        snapshot = self.model.snapshot(table_id)
+        if snapshot is None:
+            self._send(404, {'error': f'桌号 {table_id} 未加载'}, endpoint='table')
+        elif snapshot[0] == etag:
+            self._send(304, None, etag, endpoint='table')
+        else:
+            self._send(200, snapshot[1], snapshot[0], endpoint='table')
+    
+    def _latest(self, table_id):
+        if not self.model.is_loaded(table_id):
+            self._send(404, {'error': f'桌号 {table_id} 未加载'}, endpoint='latest')
+            return
+        latest = self.model.latest(table_id)
+        etag = self.model.etag(table_id, f"r{latest['id']}" if latest else 'r0')
+        if self.headers.get('If-None-Match') == etag:
+            self._send(304, None, etag, endpoint='latest')
+        else:
+            self._send(200, latest, etag, endpoint='latest')
+    
+    def _rounds(self, table_id, after, wait):
+        rounds = self.model.rounds_after(table_id, after, wait)
+        if rounds is None:
+            self._send(404, {'error': f'桌号 {table_id} 未加载'}, endpoint='rounds')
+            return
+        last_id = rounds[-1]['id'] if rounds else after
+        self._send(200, {'table_id': table_id, 'last_id': last_id, 'rounds': rounds}, endpoint='rounds')
+    
+    def _send(self, status, data, etag=None, endpoint=''):
+        READ_API_REQUESTS.inc(endpoint=endpoint, status=str(status))
+        self.send_response(status)
+        if etag:
+            self.send_header('ETag', etag)
+        self.send_header('Cache-Control', 'no-cache')
+        if status == 304:
+            self.end_headers()
+            return
+        body = json.dumps(data, ensure_ascii=False).encode('utf-8')
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+    
+    def log_message(self, format, *args):
+        # 不向控制台输出访问日志
+        pass
+
+
+class ReadModelServer:
+    """本地 HTTP 查询服务（在后台守护线程中运行）"""
+    
+    def __init__(self, model, host='127.0.0.1', port=9110, max_wait=30):
+        """
+        初始化查询服务
+        
+        Args:
+            model: ReadModel
+            host: 监听地址
+            port: 监听端口
+            max_wait: 长轮询最长等待时间（秒）
+        """
+        self.model = model
+        self.host = host
+        self.port = port
+        self.max_wait = max_wait
+        self.server = None
+        self.thread = None
+    
+    def start(self):
+        """启动服务"""
+        try:
+            handler = type('ReadModelHandler', (_ReadModelHandler,),
+                           {'model': self.model, 'max_wait': self.max_wait})
+            self.server = ThreadingHTTPServer((self.host, self.port), handler)
+            self.server.daemon_threads = True
+        except Exception as e:
+            logger.error(f"查询服务启动失败: {e}")
+            return False
+        
+        self.thread = threading.Thread(target=self.server.serve_forever, name='read-model-server')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"查询服务已启动: http://{self.host}:{self.port}/tables/")
+        return True
+    
+    def stop(self):
+        """停止服务"""
+        if self.server:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+            logger.info("查询服务已停止")
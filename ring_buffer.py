@@ -0,0 +1,117 @@
+# ring_buffer.py
+"""
+共享内存环形缓冲
+单生产者/单消费者，在 multiprocessing.shared_memory 上存放定长的卡片帧，
+用于串口读取进程向游戏进程传递扫描数据
+
+布局:
+    头部 64 字节: 写入计数 head, 读取计数 tail, 容量, 丢弃计数
+    帧 32 字节: 序号, 到达时间(perf_counter_ns), 卡片代码
+"""
+
+import struct
+import logging
+from multiprocessing import shared_memory
+
+logger = logging.getLogger(__name__)
+
+# 头部: head, tail, 容量, 丢弃计数（各占8字节，对齐写入）
+HEADER = struct.Struct('<QQQQ32x')
+HEAD_OFFSET = 0
+TAIL_OFFSET = 8
+DROPPED_OFFSET = 24
+# 帧: 序号, 到达时间, 卡片代码
+FRAME = struct.Struct('<Qq16s')
+_U64 = struct.Struct('<Q')
+
+
+class SharedRingBuffer:
+    """共享内存环形缓冲（生产者和消费者各自持有一个实例）"""
+    
+    def __init__(self, name=None, capacity=1024, create=False):
+        """
+        创建或连接环形缓冲
+        
+        Args:
+            name: 共享内存名称（连接已有缓冲时必填）
+            capacity: 帧容量（仅创建时有效）
+            create: True 创建新的共享内存，False 连接已有的
+        """
+        if create:
+            self.shm = shared_memory.SharedMemory(create=True, size=HEADER.size + capacity * FRAME.size)
+            HEADER.pack_into(self.shm.buf, 0, 0, 0, capacity, 0)
+        else:
+            # 连接方是创建方的子进程，与之共用资源跟踪器，由创建方负责释放
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.buf = self.shm.buf
+        self.capacity = HEADER.unpack_from(self.buf, 0)[2]
+        self.owner = create
+    
+    @property
+    def name(self):
+        """共享内存名称（传给另一个进程）"""
+        return self.shm.name
+    
+    def _load(self, offset):
+        return _U64.unpack_from(self.buf, offset)[0]
+    
+    def _store(self, offset, value):
+        _U64.pack_into(self.buf, offset, value)
+    
+    def push(self, code, arrival_ns):
+        """
+        写入一帧（生产者调用）
+        
+        Args:
+            code: 卡片代码
+            arrival_ns: 到达时间 (perf_counter_ns)
+        
+        Returns:
+            bool: 是否写入，缓冲已满时丢弃并返回False
+        """
+        head = self._load(HEAD_OFFSET)
+        if head - self._load(TAIL_OFFSET) >= self.capacity:
+            self._store(DROPPED_OFFSET, self._load(DROPPED_OFFSET) + 1)
+            return False
+        slot = HEADER.size + (head % self.capacity) * FRAME.size
+        FRAME.pack_into(self.buf, slot, head + 1, arrival_ns, code.encode('utf-8')[:16])
+        # 帧写完后再发布 head，消费者看到 head 时帧一定完整
+        self._store(HEAD_OFFSET, head + 1)
+        return True
+    
+    def pop(self):
+        """
+        读取一帧（消费者调用）
+        
+        Returns:
+            tuple: (序号, 卡片代码, 到达时间)，缓冲为空时返回None
+        """
+        tail = self._load(TAIL_OFFSET)
+        if tail >= self._load(HEAD_OFFSET):
+            return None
+        slot = HEADER.size + (tail % self.capacity) * FRAME.size
+        seq, arrival_ns, code = FRAME.unpack_from(self.buf, slot)
+        self._store(TAIL_OFFSET, tail + 1)
+        return seq, code.rstrip(b'\x00').decode('utf-8', errors='replace'), arrival_ns
+    
+    def size(self):
+        """缓冲中未读取的帧数"""
+        return self._load(HEAD_OFFSET) - self._load(TAIL_OFFSET)
+    
+    def dropped(self):
+        """因缓冲已满丢弃的帧数"""
+        return self._load(DROPPED_OFFSET)
+    
+    def clear(self):
+        """丢弃所有未读取的帧（消费者调用）"""
+        self._store(TAIL_OFFSET, self._load(HEAD_OFFSET))
+    
+    def close(self):
+        """断开共享内存，创建者同时释放"""
+        self.buf = None
+        try:
+            self.shm.close()
+            if self.owner:
+                self.shm.unlink()
+        except Exception as e:
+            logger.debug(f"释放共享内存时出错: {e}")
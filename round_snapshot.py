@@ -0,0 +1,102 @@
+# round_snapshot.py
+"""
+牌局快照
+每发一张牌就把进行中的牌局写入本地快照文件（写临时文件后原子替换），
+进程意外退出后重启时据此恢复牌局，避免已发的牌被作废
+"""
+
+import os
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class RoundSnapshot:
+    """进行中牌局的本地快照"""
+    
+    def __init__(self, directory, table_id, fsync=True):
+        """
+        初始化快照
+        
+        Args:
+            directory: 快照目录
+            table_id: 桌号（每张桌一个快照文件）
+            fsync: 每次写入后是否刷盘
+        """
+        self.table_id = str(table_id)
+        self.path = os.path.join(directory, f'round_snapshot_{self.table_id}.json')
+        self.tmp_path = self.path + '.tmp'
+        self.fsync = fsync
+    
+    def save(self, game_count, round_start, cards):
+        """
+        保存快照
+        
+        Args:
+            game_count: 局数
+            round_start: 开局时间戳
+            cards: [{'position': 'xian_1', 'card': 'D12', 'ts': 1700000000.0}, ...]
+        
+        Returns:
+            bool: 是否成功
+        """
+        data = {
+            'table_id': self.table_id,
+            'game_count': game_count,
+            'round_start': round_start,
+            'saved_at': time.time(),
+            'cards': cards,
+        }
+        try:
+            with open(self.tmp_path, 'w', encoding='utf-8') as f:
+                json.dump(data, f, ensure_ascii=False)
+                if self.fsync:
+                    f.flush()
+                    os.fsync(f.fileno())
+            os.replace(self.tmp_path, self.path)
+            return True
+        except Exception as e:
+            logger.error(f"保存牌局快照失败: {e}")
+            return False
+    
+    def load(self, max_age=None):
+        """
+        读取快照
+        
+        Args:
+            max_age: 最长有效时间（秒），超过则视为过期
+        
+        Returns:
+            dict: 快照数据，不存在、损坏、过期或桌号不符时返回None
+        """
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error(f"读取牌局快照失败: {e}")
+            return None
+        
+        if data.get('table_id') != self.table_id:
+            logger.warning(f"牌局快照桌号不符: {data.get('table_id')} != {self.table_id}")
+            return None
+        
+        age = time.time() - data.get('saved_at', 0)
+        if max_age is not None and age > max_age:
+            logger.warning(f"牌局快照已过期 ({age:.0f}秒前)，不再恢复")
+            return None
+        
+        return data
+    
+    def clear(self):
+        """删除快照（一局结束或作废时调用）"""
+        for path in (self.path, self.tmp_path):
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            except Exception as e:
+                logger.error(f"删除牌局快照失败: {e}")
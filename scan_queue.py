@@ -0,0 +1,187 @@
+# scan_queue.py
+"""
+有界扫描队列
+串口读取线程与游戏线程之间的数据队列，容量固定；每条扫描带序号和到达时间，
+队列满时按策略处理:
+    drop_oldest  丢弃最旧的扫描（读取线程从不阻塞）
+    block        读取线程阻塞等待空位（反压），超过 block_timeout 仍满时丢弃新扫描
+    spill        最旧的扫描交给 spill 回调（写入事件日志留档）后丢弃；
+                 留档只用于事后核对，被丢弃的扫描不会重新交付，没有回调时与 drop_oldest 相同
+清空队列时被丢弃的扫描同样交给 spill 回调并记录日志，不再无声丢失；
+历史最大长度和各原因的丢弃数量通过指标导出
+"""
+
+import time
+import threading
+import logging
+from collections import deque
+
+from metrics import SCAN_QUEUE_HIGH_WATER, SCAN_QUEUE_DROPPED
+
+logger = logging.getLogger(__name__)
+
+POLICY_DROP_OLDEST = 'drop_oldest'
+POLICY_BLOCK = 'block'
+POLICY_SPILL = 'spill'
+POLICIES = (POLICY_DROP_OLDEST, POLICY_BLOCK, POLICY_SPILL)
+
+# 丢弃原因（指标标签）
+REASON_OVERFLOW = 'overflow'  # 队列满，直接丢弃
+REASON_SPILLED = 'spilled'    # 队列满，写入事件日志后丢弃
+REASON_CLEARED = 'cleared'    # 清空队列时丢弃
+
+
+class ScanEntry:
+    """一条扫描"""
+    
+    __slots__ = ('seq', 'data', 'arrival_ns', 'received_at', 'trace')
+    
+    def __init__(self, seq, data, arrival_ns, trace=None):
+        self.seq = seq                  # 队列内序号（从1开始连续递增，跳号说明有丢弃）
+        self.data = data                # 卡片代码
+        self.arrival_ns = arrival_ns    # 收到字节时的 perf_counter_ns
+        self.received_at = time.time()  # 入队时的时间戳
+        self.trace = trace              # 延迟追踪记录（可选）
+    
+    def age(self):
+        """入队至今的秒数"""
+        return time.time() - self.received_at
+
+
+class ScanQueue:
+    """有界扫描队列（单生产者/单消费者，线程安全）"""
+    
+    def __init__(self, capacity=256, policy=POLICY_DROP_OLDEST, block_timeout=1.0, name='', spill=None):
+        """
+        初始化队列
+        
+        Args:
+            capacity: 容量（条）
+            policy: 队列满时的策略 drop_oldest / block / spill
+            block_timeout: block 策略下读取线程最长等待（秒）
+            name: 队列名称（指标标签，如串口号）
+            spill: 回调 spill(entry, reason)，被丢弃的扫描交给它留档（如写入事件日志）
+        """
+        if policy not in POLICIES:
+            raise ValueError(f"未知的队列策略: {policy} (可选: {', '.join(POLICIES)})")
+        self.capacity = capacity
+        self.policy = policy
+        self.block_timeout = block_timeout
+        self.name = str(name)
+        self.spill = spill
+        self.entries = deque()
+        self.condition = threading.Condition()
+        self.seq = 0
+        self.high_water = 0
+        self.dropped = {REASON_OVERFLOW: 0, REASON_SPILLED: 0, REASON_CLEARED: 0}
+        SCAN_QUEUE_HIGH_WATER.set_function(lambda: self.high_water, port=self.name)
+    
+    def put(self, data, arrival_ns, trace=None):
+        """
+        放入一条扫描（读取线程调用）
+        
+        Args:
+            data: 卡片代码
+            arrival_ns: 收到字节时的 perf_counter_ns
+            trace: 延迟追踪记录（可选）
+        
+        Returns:
+            ScanEntry: 入队的条目，被丢弃时返回None
+        """
+        removed = None
+        with self.condition:
+            self.seq += 1
+            entry = ScanEntry(self.seq, data, arrival_ns, trace)
+            if len(self.entries) >= self.capacity:
+                if self.policy == POLICY_BLOCK:
+                    # 反压：等游戏线程取走；超时仍满则丢弃新扫描，保证已入队的顺序不变
+                    deadline = time.monotonic() + self.block_timeout
+                    while len(self.entries) >= self.capacity:
+                        remaining = deadline - time.monotonic()
+                        if remaining <= 0:
+                            break
+                        self.condition.wait(remaining)
+                    if len(self.entries) >= self.capacity:
+                        removed, entry = entry, None
+                else:
+                    removed = self.entries.popleft()
+            if entry:
+                self.entries.append(entry)
+                if len(self.entries) > self.high_water:
+                    self.high_water = len(self.entries)
+                self.condition.notify_all()
+        
+        if removed:
+            reason = REASON_SPILLED if self.policy == POLICY_SPILL else REASON_OVERFLOW
+            self._discard([removed], reason)
+        return entry
+    
+    def get(self, timeout=None):
+        """
+        取出最早的一条扫描（游戏线程调用）
+        
+        Args:
+            timeout: 最长等待秒数（None表示一直等待）
+        
+        Returns:
+            ScanEntry: 条目，超时返回None
+        """
+        with self.condition:
+            if not self.entries:
+                self.condition.wait_for(lambda: self.entries, timeout)
+            if not self.entries:
+                return None
+            entry = self.entries.popleft()
+            self.condition.notify_all()
+            return entry
+    
+    def clear(self):
+        """
+        清空队列，被丢弃的扫描记录日志并交给 spill 回调
+        
+        Returns:
+            list: 被丢弃的条目
+        """
+        with self.condition:
+            entries = list(self.entries)
+            self.entries.clear()
+            self.condition.notify_all()
+        if entries:
+            self._discard(entries, REASON_CLEARED)
+        return entries
+    
+    def _discard(self, entries, reason):
+        """统计并留档被丢弃的扫描"""
+        with self.condition:
+            self.dropped[reason] += len(entries)
+        SCAN_QUEUE_DROPPED.inc(len(entries), port=self.name, reason=reason)
+        codes = ', '.join(f"#{entry.seq} {entry.data} ({entry.age():.1f}秒前)" for entry in entries[:10])
+        more = f" 等{len(entries)}条" if len(entries) > 10 else ''
+        logger.warning("扫描队列 %s 丢弃 (%s): %s%s", self.name, reason, codes, more)
+        if self.spill and reason != REASON_OVERFLOW:
+            for entry in entries:
+                try:
+                    self.spill(entry, reason)
+                except Exception as e:
+                    logger.error("扫描留档失败: %s", e)
+    
+    def qsize(self):
+        """当前长度"""
+        return len(self.entries)
+    
+    def stats(self):
+        """
+        队列统计
+        
+        Returns:
+            dict: size, capacity, policy, high_water, seq, dropped {原因: 数量}
+        """
+        with self.condition:
+            return {
+                'size': len(self.entries),
+                'capacity': self.capacity,
+                'policy': self.policy,
+                'high_water': self.high_water,
+                'seq': self.seq,
+                'dropped': dict(self.dropped),
+            }
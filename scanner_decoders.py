@@ -0,0 +1,303 @@
+# scanner_decoders.py
+"""
+扫描枪协议解码器
+把串口收到的字节流解码为卡片代码，不同型号的扫描枪使用不同解码器，可按串口选择:
+    text    换行结尾的 UTF-8 文本，如 'D12\\r\\n'（默认，原有扫描枪）
+    binary  二进制帧: 0x02 | 长度 | 内容 | CRC16，内容为卡片代码或1字节牌序号
+    rfid    RFID 读卡器输出的十六进制 UID 文本行，通过 UID 对照表映射为卡片代码
+
+新解码器继承 ScannerDecoder 实现 feed()，并用 register_decoder() 注册
+"""
+
+import csv
+import logging
+import binascii
+
+from config import CARD_MAPPING, SCANNER_DECODER, SCANNER_DECODERS, RFID_UID_MAP_FILE
+from metrics import SCAN_DECODE_ERRORS
+
+logger = logging.getLogger(__name__)
+
+STX = 0x02
+MAX_FRAME_PAYLOAD = 32  # 二进制帧内容最大长度，超出说明帧头是噪声
+MAX_LINE = 256          # 文本行最大长度，超出视为噪声丢弃
+
+# 1字节牌序号 -> 卡片代码（按 CARD_MAPPING 定义顺序: 黑桃、红桃、梅花、方块，各 A-K）
+CARD_BY_INDEX = tuple(CARD_MAPPING)
+
+
+def _build_crc16_table(poly):
+    """生成反射型 CRC16 查找表"""
+    table = []
+    for byte in range(256):
+        crc = byte
+        for _ in range(8):
+            crc = (crc >> 1) ^ poly if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
+CRC16_MODBUS_TABLE = _build_crc16_table(0xA001)
+
+
+def crc16_modbus(data, crc=0xFFFF):
+    """CRC-16/MODBUS（查表法）"""
+    table = CRC16_MODBUS_TABLE
+    for byte in data:
+        crc = (crc >> 8) ^ table[(crc ^ byte) & 0xFF]
+    return crc
+
+
+def crc16_ccitt(data, crc=0xFFFF):
+    """CRC-16/CCITT-FALSE（binascii 内置查表实现）"""
+    return binascii.crc_hqx(data, crc)
+
+
+# 校验算法: (函数, 校验值字节序)
+CRC_ALGORITHMS = {
+    'ccitt': (crc16_ccitt, 'big'),
+    'modbus': (crc16_modbus, 'little'),
+}
+
+
+class ScannerDecoder:
+    """解码器基类"""
+    
+    name = ''
+    
+    def __init__(self, port=''):
+        """
+        Args:
+            port: 串口号（用于日志和指标）
+        """
+        self.port = port
+        self.buffer = bytearray()
+    
+    def feed(self, data):
+        """
+        输入新收到的字节
+        
+        Args:
+            data: bytes
+        
+        Returns:
+            list: 解码出的卡片代码（可能为空）
+        """
+        raise NotImplementedError
+    
+    def reset(self):
+        """丢弃未完成的数据（串口重连后调用）"""
+        self.buffer.clear()
+    
+    def _error(self, reason, detail=''):
+        SCAN_DECODE_ERRORS.inc(port=self.port, reason=reason)
+        logger.warning(f"扫描数据解码失败 ({self.port}, {reason}): {detail}")
+
+
+class TextLineDecoder(ScannerDecoder):
+    """换行结尾的文本"""
+    
+    name = 'text'
+    
+    def feed(self, data):
+        self.buffer += data
+        codes = []
+        while True:
+            end = self.buffer.find(b'\n')
+            if end < 0:
+                break
+            line = bytes(self.buffer[:end])
+            del self.buffer[:end + 1]
+            text = line.decode('utf-8', errors='replace').strip()
+            if text:
+                codes.append(self.convert(text))
+        if len(self.buffer) > MAX_LINE:
+            self._error('overflow', f"{len(self.buffer)}字节无换行")
+            self.buffer.clear()
+        return [code for code in codes if code]
+    
+    def convert(self, text):
+        """一行文本转换为卡片代码（子类可覆盖）"""
+        return text
+
+
+class BinaryFrameDecoder(ScannerDecoder):
+    """0x02 | 长度 | 内容 | CRC16 二进制帧，CRC 覆盖长度和内容"""
+    
+    name = 'binary'
+    
+    def __init__(self, port='', crc='ccitt'):
+        """
+        Args:
+            port: 串口号
+            crc: 校验算法 ccitt / modbus
+        """
+        super().__init__(port)
+        self.crc, self.crc_byteorder = CRC_ALGORITHMS[crc]
+    
+    def feed(self, data):
+        self.buffer += data
+        buffer = self.buffer
+        codes = []
+        while True:
+            start = buffer.find(STX)
+            if start < 0:
+                buffer.clear()
+                break
+            if start:
+                # 帧头之前的字节是噪声
+                del buffer[:start]
+            if len(buffer) < 2:
+                break
+            length = buffer[1]
+            if not length or length > MAX_FRAME_PAYLOAD:
+                del buffer[:1]
+                continue
+            total = 2 + length + 2
+            if len(buffer) < total:
+                break
+            body = bytes(buffer[1:2 + length])
+            expected = int.from_bytes(buffer[2 + length:total], self.crc_byteorder)
+            if self.crc(body) != expected:
+                # 校验失败：只丢弃帧头，从下一个字节重新寻找帧头
+                self._error('crc', body.hex())
+                del buffer[:1]
+                continue
+            del buffer[:total]
+            code = self.decode_payload(body[1:])
+            if code:
+                codes.append(code)
+        return codes
+    
+    def decode_payload(self, payload):
+        """帧内容转换为卡片代码: 1字节为牌序号，否则为卡片代码文本"""
+        if len(payload) == 1:
+            if payload[0] < len(CARD_BY_INDEX):
+                return CARD_BY_INDEX[payload[0]]
+            self._error('index', str(payload[0]))
+            return None
+        return payload.decode('ascii', errors='replace').strip()
+
+
+def encode_frame(code, crc='ccitt'):
+    """
+    编码一个二进制帧（用于测试和模拟器）
+    
+    Args:
+        code: 卡片代码，或 int 牌序号
+        crc: 校验算法
+    
+    Returns:
+        bytes: 帧
+    """
+    payload = bytes([code]) if isinstance(code, int) else code.encode('ascii')
+    body = bytes([len(payload)]) + payload
+    func, byteorder = CRC_ALGORITHMS[crc]
+    return bytes([STX]) + body + func(body).to_bytes(2, byteorder)
+
+
+def normalize_uid(uid):
+    """UID 统一为无分隔符的大写十六进制"""
+    return ''.join(ch for ch in uid.upper() if ch in '0123456789ABCDEF')
+
+
+class RfidUidIndex:
+    """RFID UID -> 卡片代码 对照表"""
+    
+    def __init__(self, mapping=None):
+        """
+        Args:
+            mapping: {uid: 卡片代码}
+        """
+        self.index = {}
+        for uid, code in (mapping or {}).items():
+            self.add(uid, code)
+    
+    def add(self, uid, code):
+        """添加一条对照"""
+        code = code.strip().upper()
+        if code not in CARD_MAPPING:
+            raise ValueError(f"无效的卡片代码: {code}")
+        self.index[normalize_uid(uid)] = code
+    
+    def lookup(self, uid):
+        """查找 UID 对应的卡片代码，找不到时返回None"""
+        return self.index.get(normalize_uid(uid))
+    
+    def __len__(self):
+        return len(self.index)
+    
+    @classmethod
+    def load(cls, path):
+        """
+        从 CSV 文件加载（每行: uid,卡片代码；# 开头为注释）
+        
+        Returns:
+            RfidUidIndex: 对照表，文件不存在时为空
+        """
+        index = cls()
+        try:
+            with open(path, 'r', encoding='utf-8', newline='') as f:
+                for row in csv.reader(f):
+                    if not row or row[0].startswith('#') or len(row) < 2:
+                        continue
+                    try:
+                        index.add(row[0], row[1])
+                    except ValueError as e:
+                        logger.warning(f"RFID 对照表 {path} 跳过无效行 {row}: {e}")
+        except FileNotFoundError:
+            logger.error(f"RFID 对照表不存在: {path}")
+        logger.info(f"RFID 对照表已加载: {len(index)} 条")
+        return index
+
+
+class RfidUidDecoder(TextLineDecoder):
+    """RFID 读卡器输出的 UID 文本行"""
+    
+    name = 'rfid'
+    
+    def __init__(self, port='', index=None):
+        """
+        Args:
+            port: 串口号
+            index: RfidUidIndex，默认加载 RFID_UID_MAP_FILE
+        """
+        super().__init__(port)
+        self.index = index if index is not None else RfidUidIndex.load(RFID_UID_MAP_FILE)
+    
+    def convert(self, text):
+        code = self.index.lookup(text)
+        if not code:
+            self._error('unknown_uid', text)
+        return code
+
+
+DECODERS = {}
+
+
+def register_decoder(cls):
+    """注册解码器类（按 cls.name）"""
+    DECODERS[cls.name] = cls
+    return cls
+
+
+for _decoder in (TextLineDecoder, BinaryFrameDecoder, RfidUidDecoder):
+    register_decoder(_decoder)
+
+
+def create_decoder(name=None, port='', **options):
+    """
+    创建解码器
+    
+    Args:
+        name: 解码器名称，None 时按串口查 SCANNER_DECODERS，再退回 SCANNER_DECODER
+        port: 串口号
+        **options: 传给解码器的参数
+    
+    Returns:
+        ScannerDecoder: 解码器实例
+    """
+    name = name or SCANNER_DECODERS.get(port, SCANNER_DECODER)
+    if name not in DECODERS:
+        raise ValueError(f"未知的扫描枪解码器: {name} (可选: {', '.join(DECODERS)})")
+    return DECODERS[name](port, **options)
@@ -0,0 +1,88 @@
+# scanner_simulator.py
+"""
+扫描枪模拟器（仅限 Linux/macOS）
+用伪终端 (pty) 模拟一个串口扫描枪，系统以普通串口方式打开其设备路径，
+便于在没有硬件时测试读取、主备切换和看门狗
+
+用法:
+    python scanner_simulator.py                  # 打印设备路径，从标准输入逐行发送卡片代码
+    python scanner_simulator.py --count 2        # 模拟两把扫描枪（主备），同时发送
+    python scanner_simulator.py --count 2 --mute 0   # 第1把静默，只有第2把发送
+"""
+
+import os
+import sys
+import argparse
+
+
+class PtyScanner:
+    """基于伪终端的模拟扫描枪"""
+    
+    def __init__(self):
+        """创建伪终端，port 为供系统打开的设备路径"""
+        import pty
+        import tty
+        self.master_fd, self.slave_fd = pty.openpty()
+        # 原始模式：不回显、不转换换行
+        tty.setraw(self.slave_fd)
+        self.port = os.ttyname(self.slave_fd)
+        self.muted = False
+    
+    def scan(self, code, terminator='\r\n'):
+        """
+        发送一次扫描
+        
+        Args:
+            code: 卡片代码
+            terminator: 行结束符（多数扫描枪发送 CR LF）
+        
+        Returns:
+            bool: 是否发送（静默时不发送）
+        """
+        if self.muted:
+            return False
+        os.write(self.master_fd, (code + terminator).encode('utf-8'))
+        return True
+    
+    def send_raw(self, data):
+        """发送原始字节（用于测试二进制协议）"""
+        os.write(self.master_fd, data)
+    
+    def close(self):
+        """关闭伪终端（读取方会收到串口错误，相当于拔出设备）"""
+        for fd in (self.master_fd, self.slave_fd):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+
+def main():
+    """命令行模拟扫描枪"""
+    parser = argparse.ArgumentParser(description='扫描枪模拟器 (pty)')
+    parser.add_argument('--count', type=int, default=1, help='模拟的扫描枪数量')
+    parser.add_argument('--mute', type=int, action='append', default=[], help='静默的扫描枪序号（从0开始，可重复）')
+    args = parser.parse_args()
+    
+    scanners = [PtyScanner() for _ in range(args.count)]
+    for index, scanner in enumerate(scanners):
+        scanner.muted = index in args.mute
+        print(f"扫描枪{index + 1}: {scanner.port}{' (静默)' if scanner.muted else ''}")
+    print("逐行输入卡片代码发送，Ctrl+D 结束")
+    
+    try:
+        for line in sys.stdin:
+            code = line.strip()
+            if code:
+                for scanner in scanners:
+                    scanner.scan(code)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for scanner in scanners:
+            scanner.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
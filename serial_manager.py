@@ -4,12 +4,20 @@
 负责串口连接、数据读取和自动重连
 """
 
-import serial
 import time
 import threading
 import logging
-from queue import Queue, Empty
-from config import SERIAL_RECONNECT_INTERVAL, MAX_RECONNECT_ATTEMPTS
+from config import (
+    SERIAL_RECONNECT_INTERVAL, MAX_RECONNECT_ATTEMPTS,
+    SCAN_QUEUE_CAPACITY, SCAN_QUEUE_POLICY, SCAN_QUEUE_BLOCK_TIMEOUT
+)
+from metrics import SERIAL_RECONNECTS
+from event_journal import RAW_SCAN, SCAN_SPILLED, SCAN_CLEARED
+from scanner_decoders import create_decoder
+from scan_queue import ScanQueue, REASON_SPILLED
+
+# 被丢弃的扫描在事件日志中的记录类型
+SPILL_RECORD_TYPES = {REASON_SPILLED: SCAN_SPILLED}
 
 logger = logging.getLogger(__name__)
 
@@ -17,7 +25,7 @@ logger = logging.getLogger(__name__)
 class SerialManager:
     """串口管理器类"""
     
-    def __init__(self, port, baudrate, timeout=1):
+    def __init__(self, port, baudrate, timeout=1, sink=None, decoder=None):
         """
         初始化串口管理器
         
@@ -25,19 +33,36 @@ class SerialManager:
             port: 串口号，如 'COM3'
             baudrate: 波特率，如 9600
             timeout: 超时时间（秒）
+            sink: 接收数据的回调 sink(data, arrival_ns)，默认放入本地数据队列
+            decoder: 扫描枪协议解码器名称 (text/binary/rfid)，None 时按串口取配置
         """
         self.port = port
         self.baudrate = baudrate
         self.timeout = timeout
         self.serial_connection = None
         self.is_connected = False
-        self.data_queue = Queue()
+        # 有 sink 时数据直接交给 sink，不使用本地队列
+        self.data_queue = None if sink else ScanQueue(
+            SCAN_QUEUE_CAPACITY, SCAN_QUEUE_POLICY, SCAN_QUEUE_BLOCK_TIMEOUT, name=port, spill=self._spill)
+        self.last_entry = None  # 最近一次 read_card 取出的条目（序号、到达时间）
         self.running = False
         self.read_thread = None
         self.reconnect_count = 0
+        self.tracer = None      # 延迟追踪器（可选）
+        self.last_trace = None  # 最近一次 read_card 取出的追踪记录
+        self.journal = None     # 事件日志（可选），记录每一条原始扫描
+        self.sink = sink
+        self.decoder = create_decoder(decoder, port)
+        
+        # 看门狗用：读取线程代数、心跳和当前读取调用的开始时间（time.monotonic）
+        self.generation = 0
+        self.last_heartbeat = None
+        self.read_started = None
         
     def connect(self):
         """连接串口"""
+        # 首次连接时才导入 pyserial，缩短程序启动时间
+        import serial
         try:
             self.serial_connection = serial.Serial(
                 port=self.port,
@@ -49,6 +74,7 @@ class SerialManager:
             )
             self.is_connected = True
             self.reconnect_count = 0
+            self.decoder.reset()
             logger.info(f"串口连接成功: {self.port} @ {self.baudrate}")
             return True
         except Exception as e:
@@ -74,6 +100,9 @@ class SerialManager:
                 return False
         
         self.running = True
+        # 新线程启动后，仍在运行的旧线程（如果有）会自行退出
+        self.generation += 1
+        self.last_heartbeat = time.monotonic()
         self.read_thread = threading.Thread(target=self._read_loop)
         self.read_thread.daemon = True
         self.read_thread.start()
@@ -82,33 +111,76 @@ class SerialManager:
     
     def _read_loop(self):
         """串口读取循环（在独立线程中运行）"""
-        while self.running:
+        from serial import SerialException
+        generation = self.generation
+        # 被看门狗替换后（代数变化）旧线程自行退出
+        while self.running and generation == self.generation:
+            self.last_heartbeat = time.monotonic()
             try:
                 if not self.is_connected:
-                    self._try_reconnect()
+                    self._try_reconnect(generation)
                     continue
                 
-                if self.serial_connection and self.serial_connection.in_waiting > 0:
-                    # 读取数据直到遇到换行符
-                    data = self.serial_connection.readline()
-                    if data:
-                        # 解码并去除换行符
-                        decoded_data = data.decode('utf-8').strip()
-                        if decoded_data:
-                            logger.debug(f"接收到数据: {decoded_data}")
-                            self.data_queue.put(decoded_data)
+                waiting = self.serial_connection.in_waiting if self.serial_connection else 0
+                if waiting > 0:
+                    # 读出已到达的全部字节，由解码器拼帧（不完整的部分留在解码器中）
+                    self.read_started = self.last_heartbeat
+                    data = self.serial_connection.read(waiting)
+                    self.read_started = None
+                    self.feed(data, time.perf_counter_ns())
                             
-            except serial.SerialException as e:
+            except (SerialException, OSError) as e:
+                # 设备拔出时 in_waiting 抛出的是 OSError (EIO)，同样按断开处理
+                self.read_started = None
+                if generation != self.generation:
+                    break
                 logger.error(f"串口读取错误: {e}")
                 self.is_connected = False
-                self._try_reconnect()
+                self._try_reconnect(generation)
             except Exception as e:
+                self.read_started = None
                 logger.error(f"未知错误: {e}")
                 time.sleep(0.1)
             
             time.sleep(0.01)  # 避免CPU占用过高
     
-    def _try_reconnect(self):
+    def feed(self, data, arrival_ns):
+        """
+        处理从串口读到的字节：解码器拼帧，解出的卡片交给 sink 或放入本地数据队列
+        
+        Args:
+            data: 读到的字节
+            arrival_ns: 读到字节时的 perf_counter_ns
+        
+        Returns:
+            int: 解出的卡片数量
+        """
+        codes = self.decoder.feed(data)
+        for card_code in codes:
+            logger.debug("接收到数据: %s", card_code)
+            if self.sink:
+                self.sink(card_code, arrival_ns)
+            else:
+                self._enqueue(card_code, arrival_ns)
+        return len(codes)
+    
+    def _enqueue(self, data, arrival_ns):
+        """把一条扫描数据放入本地数据队列"""
+        if self.journal:
+            self.journal.append(RAW_SCAN, data)
+        trace = None
+        if self.tracer:
+            # 追踪记录随条目入队，队列丢弃条目时不会与后续扫描错位
+            trace = self.tracer.start(data, arrival_ns)
+            trace.mark('enqueue')
+        self.data_queue.put(data, arrival_ns, trace)
+    
+    def _spill(self, entry, reason):
+        """被丢弃的扫描写入事件日志"""
+        if self.journal:
+            self.journal.append(SPILL_RECORD_TYPES.get(reason, SCAN_CLEARED), f"#{entry.seq} {entry.data}")
+    
+    def _try_reconnect(self, generation=None):
         """尝试重新连接串口"""
         if self.reconnect_count >= MAX_RECONNECT_ATTEMPTS:
             logger.error(f"重连失败次数超过限制 ({MAX_RECONNECT_ATTEMPTS}次)")
@@ -116,15 +188,56 @@ class SerialManager:
             return
         
         self.reconnect_count += 1
+        SERIAL_RECONNECTS.inc(port=self.port)
         logger.info(f"尝试重新连接串口... (第{self.reconnect_count}次)")
         
         time.sleep(SERIAL_RECONNECT_INTERVAL)
         
+        # 等待期间已被看门狗重启，不再重复连接
+        if generation is not None and generation != self.generation:
+            return
+        
         if self.connect():
             logger.info("串口重连成功")
         else:
             logger.warning(f"串口重连失败，{SERIAL_RECONNECT_INTERVAL}秒后重试...")
     
+    def restart_reading(self):
+        """
+        丢弃当前读取线程，立即重新连接串口并启动新线程（看门狗调用）
+        
+        Returns:
+            bool: 是否重启成功
+        """
+        self.generation += 1  # 先让旧线程知道自己已被替换，再关闭连接
+        self.read_started = None
+        if self.serial_connection:
+            # 关闭旧连接，使卡住的读取调用尽快返回
+            try:
+                self.serial_connection.close()
+            except Exception as e:
+                logger.debug(f"关闭旧串口连接时出错: {e}")
+        self.is_connected = False
+        self.reconnect_count = 0
+        return self.start_reading()
+    
+    def get_health(self):
+        """
+        读取线程健康状态（供看门狗检查）
+        
+        Returns:
+            dict: alive 线程是否存活, connected 串口是否连接,
+                  heartbeat_age 距上次心跳秒数, read_blocked 当前读取调用已阻塞秒数
+        """
+        now = time.monotonic()
+        heartbeat, read_started = self.last_heartbeat, self.read_started
+        return {
+            'alive': bool(self.running and self.read_thread and self.read_thread.is_alive()),
+            'connected': self.is_connected,
+            'heartbeat_age': now - heartbeat if heartbeat else 0.0,
+            'read_blocked': now - read_started if read_started else 0.0,
+        }
+    
     def read_card(self, timeout=30):
         """
         读取一张卡片数据
@@ -135,22 +248,23 @@ class SerialManager:
         Returns:
             str: 卡片代码，如 'D12'
         """
-        try:
-            data = self.data_queue.get(timeout=timeout)
-            logger.info(f"读取到卡片: {data}")
-            return data
-        except Empty:
-            logger.warning(f"等待卡片超时 ({timeout}秒)")
+        entry = self.data_queue.get(timeout=timeout)
+        self.last_entry = entry
+        if entry is None:
+            self.last_trace = None
+            # 等待循环按截止时间等待，超时属于正常情况
+            logger.debug("等待卡片超时 (%s秒)", timeout)
             return None
+        self.last_trace = entry.trace
+        if entry.trace:
+            entry.trace.mark('dequeue')
+        logger.info("读取到卡片: %s (#%s)", entry.data, entry.seq)
+        return entry.data
     
     def clear_queue(self):
-        """清空数据队列"""
-        while not self.data_queue.empty():
-            try:
-                self.data_queue.get_nowait()
-            except Empty:
-                break
-        logger.debug("数据队列已清空")
+        """清空数据队列（丢弃的扫描记录日志并写入事件日志）"""
+        discarded = self.data_queue.clear()
+        logger.debug("数据队列已清空 (丢弃%s条)", len(discarded))
     
     def is_running(self):
         """检查串口是否正在运行"""
@@ -158,4 +272,8 @@ class SerialManager:
     
     def get_queue_size(self):
         """获取队列中待处理的数据数量"""
-        return self.data_queue.qsize()
\ No newline at end of file
+        return self.data_queue.qsize() if self.data_queue else 0
+    
+    def get_queue_stats(self):
+        """获取队列统计（容量、策略、历史最大长度、各原因丢弃数量）"""
+        return self.data_queue.stats() if self.data_queue else None
\ No newline at end of file
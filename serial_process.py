@@ -0,0 +1,250 @@
+# serial_process.py
+"""
+独立进程的串口读取
+串口读取在子进程中运行，不与游戏进程的数据库、控制台和日志争抢 GIL；
+扫描数据以定长帧写入共享内存环形缓冲，游戏进程通过信号量等待，无需轮询
+对外接口与 SerialManager 一致，可直接替换
+"""
+
+import time
+import logging
+import threading
+import multiprocessing
+
+from config import LOG_LEVEL, LOG_FORMAT
+from ring_buffer import SharedRingBuffer
+from event_journal import RAW_SCAN
+from scan_queue import REASON_OVERFLOW, REASON_CLEARED
+from metrics import SCAN_QUEUE_HIGH_WATER, SCAN_QUEUE_DROPPED
+
+logger = logging.getLogger(__name__)
+
+
+def _reader_process_main(port, baudrate, decoder, ring_name, semaphore, stop_flag, connected, health):
+    """子进程入口：读取串口并写入环形缓冲"""
+    # 子进程不继承主进程的日志配置
+    logging.basicConfig(level=getattr(logging, LOG_LEVEL), format=LOG_FORMAT)
+    
+    from serial_manager import SerialManager
+    
+    ring = SharedRingBuffer(ring_name)
+    
+    def sink(data, arrival_ns):
+        if ring.push(data, arrival_ns):
+            semaphore.release()
+        else:
+            logger.warning(f"环形缓冲已满，丢弃扫描数据: {data}")
+    
+    manager = SerialManager(port, baudrate, sink=sink, decoder=decoder)
+    if not manager.connect():
+        ring.close()
+        return
+    
+    manager.running = True
+    read_thread = threading.Thread(target=manager._read_loop, name='serial-reader')
+    read_thread.daemon = True
+    read_thread.start()
+    
+    # 同步连接状态和心跳，直到收到停止信号或读取线程退出（重连次数用尽）
+    while not stop_flag.value and read_thread.is_alive():
+        connected.value = 1 if manager.is_connected else 0
+        health[0] = manager.last_heartbeat or 0.0
+        health[1] = manager.read_started or 0.0
+        time.sleep(0.1)
+    
+    connected.value = 0
+    manager.disconnect()
+    ring.close()
+
+
+class ProcessSerialManager:
+    """在子进程中读取串口的串口管理器"""
+    
+    def __init__(self, port, baudrate, ring_capacity=1024, start_timeout=5, decoder=None):
+        """
+        初始化
+        
+        Args:
+            port: 串口号，如 'COM3'
+            baudrate: 波特率，如 9600
+            ring_capacity: 环形缓冲帧容量
+            start_timeout: 等待子进程连上串口的最长时间（秒）
+            decoder: 扫描枪协议解码器名称，None 时按串口取配置
+        """
+        self.port = port
+        self.baudrate = baudrate
+        self.ring_capacity = ring_capacity
+        self.start_timeout = start_timeout
+        self.decoder = decoder
+        # Windows 只支持 spawn，统一使用以保证行为一致
+        self.context = multiprocessing.get_context('spawn')
+        self.ring = None
+        self.semaphore = None
+        self.stop_flag = None   # 停止标志（不用 Event：子进程被强杀后 Event.set 会卡死）
+        self.connected = None
+        self.health = None      # 子进程上报的 [心跳, 读取调用开始时间] (time.monotonic)
+        self.process = None
+        self.tracer = None
+        self.last_trace = None
+        self.journal = None
+        self.high_water = 0         # 游戏进程读取时观察到的缓冲最大长度
+        self.dropped_reported = 0   # 已计入指标的丢弃帧数
+        self.cleared = 0            # 清空缓冲时丢弃的帧数
+        SCAN_QUEUE_HIGH_WATER.set_function(lambda: self.high_water, port=self.port)
+    
+    def start_reading(self):
+        """启动读取子进程"""
+        if self.process and self.process.is_alive():
+            return True
+        
+        if self.ring is None:
+            self.ring = SharedRingBuffer(capacity=self.ring_capacity, create=True)
+            self.semaphore = self.context.Semaphore(0)
+            self.dropped_reported = 0
+        
+        self.stop_flag = self.context.Value('b', 0)
+        self.connected = self.context.Value('b', 0)
+        self.health = self.context.Array('d', 2)
+        self.process = self.context.Process(
+            target=_reader_process_main,
+            args=(self.port, self.baudrate, self.decoder, self.ring.name, self.semaphore, self.stop_flag,
+                  self.connected, self.health),
+            name=f'serial-reader-{self.port}'
+        )
+        self.process.daemon = True
+        self.process.start()
+        
+        deadline = time.monotonic() + self.start_timeout
+        while time.monotonic() < deadline and self.process.is_alive() and not self.connected.value:
+            time.sleep(0.05)
+        
+        if not self.connected.value:
+            logger.error(f"串口读取进程启动失败: {self.port}")
+            return False
+        logger.info(f"串口读取进程已启动: {self.port} (pid {self.process.pid})")
+        return True
+    
+    def restart_reading(self):
+        """
+        结束当前读取进程并立即启动新进程（看门狗调用），缓冲中未读的数据保留
+        
+        Returns:
+            bool: 是否重启成功
+        """
+        self._stop_process()
+        return self.start_reading()
+    
+    def get_health(self):
+        """
+        读取进程健康状态（供看门狗检查），字段同 SerialManager.get_health
+        """
+        now = time.monotonic()
+        heartbeat, read_started = (self.health[0], self.health[1]) if self.health else (0.0, 0.0)
+        return {
+            'alive': bool(self.process and self.process.is_alive()),
+            'connected': bool(self.connected and self.connected.value),
+            'heartbeat_age': now - heartbeat if heartbeat else 0.0,
+            'read_blocked': now - read_started if read_started else 0.0,
+        }
+    
+    def read_card(self, timeout=30):
+        """
+        读取一张卡片数据
+        
+        Args:
+            timeout: 超时时间（秒）
+        
+        Returns:
+            str: 卡片代码，如 'D12'
+        """
+        self.last_trace = None
+        if not self.semaphore or not self.semaphore.acquire(timeout=timeout):
+            self._sync_ring_stats()
+            logger.debug("等待卡片超时 (%s秒)", timeout)
+            return None
+        
+        self._sync_ring_stats()
+        frame = self.ring.pop()
+        if frame is None:
+            return None
+        seq, data, arrival_ns = frame
+        
+        if self.journal:
+            self.journal.append(RAW_SCAN, data)
+        if self.tracer:
+            # 到达时间由子进程记录 (perf_counter 为系统级单调时钟，跨进程可比)
+            self.last_trace = self.tracer.start(data, arrival_ns)
+            self.last_trace.mark('dequeue')
+        logger.info("读取到卡片: %s", data)
+        return data
+    
+    def clear_queue(self):
+        """清空数据队列"""
+        if not self.ring:
+            return
+        discarded = 0
+        while self.semaphore.acquire(block=False):
+            if self.ring.pop():
+                discarded += 1
+        if discarded:
+            self.cleared += discarded
+            SCAN_QUEUE_DROPPED.inc(discarded, port=self.port, reason=REASON_CLEARED)
+            logger.warning("扫描缓冲 %s 清空时丢弃%s条", self.port, discarded)
+        logger.debug("数据队列已清空")
+    
+    def is_running(self):
+        """检查读取进程是否正在运行且串口已连接"""
+        return bool(self.process and self.process.is_alive() and self.connected.value)
+    
+    def get_queue_size(self):
+        """获取缓冲中待处理的数据数量"""
+        return self.ring.size() if self.ring else 0
+    
+    def get_dropped_count(self):
+        """获取因缓冲已满丢弃的数据数量"""
+        return self.ring.dropped() if self.ring else 0
+    
+    def get_queue_stats(self):
+        """获取缓冲统计，字段同 SerialManager.get_queue_stats（缓冲满时固定丢弃新扫描）"""
+        self._sync_ring_stats()
+        return {
+            'size': self.get_queue_size(),
+            'capacity': self.ring_capacity,
+            'policy': 'drop_newest',
+            'high_water': self.high_water,
+            'seq': None,
+            'dropped': {REASON_OVERFLOW: self.dropped_reported, REASON_CLEARED: self.cleared},
+        }
+    
+    def _sync_ring_stats(self):
+        """
+        把子进程记录的丢弃帧数和当前缓冲长度同步到指标
+        （丢弃计数在共享内存中，由游戏进程读取时计入 SCAN_QUEUE_DROPPED）
+        """
+        if not self.ring:
+            return
+        size = self.ring.size()
+        if size > self.high_water:
+            self.high_water = size
+        dropped = self.ring.dropped()
+        if dropped > self.dropped_reported:
+            SCAN_QUEUE_DROPPED.inc(dropped - self.dropped_reported, port=self.port, reason=REASON_OVERFLOW)
+            self.dropped_reported = dropped
+    
+    def _stop_process(self):
+        """停止读取进程"""
+        if self.process:
+            self.stop_flag.value = 1
+            self.process.join(timeout=3)
+            if self.process.is_alive():
+                self.process.terminate()
+            self.process = None
+            logger.info("串口读取进程已停止")
+    
+    def disconnect(self):
+        """停止读取进程并释放共享内存"""
+        self._stop_process()
+        if self.ring:
+            self._sync_ring_stats()
+            self.ring.close()
+            self.ring = None
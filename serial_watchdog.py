@@ -0,0 +1,177 @@
+# serial_watchdog.py
+"""
+串口看门狗
+定时检查读取线程的心跳，发现以下情况时立即重启读取并记录恢复耗时:
+    - 读取线程已退出（如重连次数用尽）
+    - 串口读取调用长时间阻塞或读取线程无心跳（驱动卡死）
+    - 设备被拔出后重新插入（不等读取线程的重连间隔）
+"""
+
+import time
+import threading
+import logging
+
+from config import SERIAL_RECONNECT_INTERVAL
+from metrics import SERIAL_READER_RESTARTS, SERIAL_RECOVERY_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# 故障原因
+REASON_THREAD_DEAD = 'thread_dead'
+REASON_READ_STALLED = 'read_stalled'
+REASON_NO_HEARTBEAT = 'no_heartbeat'
+REASON_DISCONNECTED = 'disconnected'
+
+REASON_TEXT = {
+    REASON_THREAD_DEAD: '读取线程已退出',
+    REASON_READ_STALLED: '串口读取阻塞',
+    REASON_NO_HEARTBEAT: '读取线程无心跳',
+    REASON_DISCONNECTED: '串口已断开',
+}
+
+
+def port_present(port):
+    """
+    检查串口设备是否存在（用于热插拔检测）
+    
+    Args:
+        port: 串口号
+    
+    Returns:
+        bool: 是否存在，无法枚举串口时返回None
+    """
+    try:
+        from serial.tools import list_ports
+        return any(info.device == port for info in list_ports.comports())
+    except Exception:
+        return None
+
+
+class SerialWatchdog:
+    """串口读取看门狗（独立线程）"""
+    
+    def __init__(self, manager, interval=0.5, stall_timeout=5, retry_interval=SERIAL_RECONNECT_INTERVAL):
+        """
+        初始化看门狗
+        
+        Args:
+            manager: 串口管理器（SerialManager 或 ProcessSerialManager）
+            interval: 检查间隔（秒）
+            stall_timeout: 无心跳或读取调用阻塞超过该秒数视为卡死
+            retry_interval: 设备状态未知时两次重启尝试的最小间隔（秒）
+        """
+        self.manager = manager
+        self.port = manager.port
+        self.interval = interval
+        self.stall_timeout = stall_timeout
+        self.retry_interval = retry_interval
+        self.hotplug = False         # 串口能否被枚举（虚拟串口、pty 等不能）
+        self.failed_since = None     # 本次故障开始时间
+        self.failure_reason = None
+        self.last_attempt = 0.0
+        self.last_present = None
+        self.stop_event = threading.Event()
+        self.thread = None
+    
+    def start(self):
+        """启动看门狗线程"""
+        self.last_present = port_present(self.port)
+        self.hotplug = bool(self.last_present)
+        self.stop_event.clear()
+        self.thread = threading.Thread(target=self._loop, name='serial-watchdog')
+        self.thread.daemon = True
+        self.thread.start()
+        logger.info(f"串口看门狗已启动 (热插拔检测: {'开启' if self.hotplug else '关闭'})")
+    
+    def stop(self):
+        """停止看门狗线程"""
+        self.stop_event.set()
+        if self.thread:
+            self.thread.join(timeout=2)
+            self.thread = None
+    
+    def _loop(self):
+        while not self.stop_event.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                logger.error(f"串口看门狗检查出错: {e}")
+    
+    def diagnose(self, health):
+        """
+        根据健康状态判断故障原因
+        
+        Args:
+            health: manager.get_health() 的结果
+        
+        Returns:
+            str: 故障原因，正常时返回None
+        """
+        if not health['alive']:
+            return REASON_THREAD_DEAD
+        if health['read_blocked'] > self.stall_timeout:
+            return REASON_READ_STALLED
+        if health['heartbeat_age'] > self.stall_timeout:
+            return REASON_NO_HEARTBEAT
+        if not health['connected']:
+            return REASON_DISCONNECTED
+        return None
+    
+    def check(self):
+        """
+        检查一次，必要时重启读取
+        
+        Returns:
+            str: 故障原因，正常时返回None
+        """
+        now = time.monotonic()
+        health = self.manager.get_health()
+        reason = self.diagnose(health)
+        if reason is None:
+            if self.failed_since is not None:
+                self._recovered(now)
+            return None
+        
+        if self.failed_since is None or reason != self.failure_reason:
+            logger.warning(f"串口看门狗发现故障: {REASON_TEXT[reason]} ({self.port})")
+            if self.failed_since is None:
+                # 故障从最后一次心跳（或读取调用开始阻塞）算起，而不是从被发现时算起
+                if reason == REASON_READ_STALLED:
+                    self.failed_since = now - health['read_blocked']
+                elif reason == REASON_DISCONNECTED:
+                    self.failed_since = now
+                else:
+                    self.failed_since = now - health['heartbeat_age']
+            self.failure_reason = reason
+        
+        present = port_present(self.port) if self.hotplug else None
+        reappeared = present and self.last_present is False
+        self.last_present = present
+        
+        if present is False:
+            # 设备已拔出，等它重新出现再重启
+            return reason
+        if reappeared:
+            logger.info(f"检测到串口设备重新插入: {self.port}")
+        elif reason == REASON_DISCONNECTED:
+            # 读取线程仍在按间隔重连，只有设备重新插入时才抢先重启
+            return reason
+        elif now - self.last_attempt < self.retry_interval:
+            return reason
+        
+        self.last_attempt = now
+        SERIAL_READER_RESTARTS.inc(port=self.port, reason=reason)
+        logger.info(f"串口看门狗重启读取: {self.port}")
+        if self.manager.restart_reading():
+            self._recovered(time.monotonic())
+        else:
+            logger.warning(f"串口看门狗重启失败: {self.port}")
+        return reason
+    
+    def _recovered(self, now):
+        """记录恢复耗时"""
+        elapsed = now - self.failed_since
+        SERIAL_RECOVERY_SECONDS.observe(elapsed, port=self.port)
+        logger.info(f"串口读取已恢复: {self.port} (耗时 {elapsed:.2f}秒)")
+        self.failed_since = None
+        self.failure_reason = None
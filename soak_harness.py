@@ -0,0 +1,378 @@
+# soak_harness.py
+"""
+浸泡测试
+用模拟扫描枪、本地数据库 (local_db) 和虚拟时钟驱动 BaccaratSystem 连续运行大量牌局，
+定期采样常驻内存、按类型的对象数、各队列/缓冲区长度和每张牌处理耗时的分位数；
+结束后对预热之后的采样做线性回归，按每百万局的增长量判断是否有缓慢泄漏，超过阈值时返回 1
+
+模拟扫描枪是真实的 SerialManager，只把串口读取线程换成按虚拟时钟送出的字节，解码器、扫描队列、
+事件日志和延迟追踪照常运行；按 8 副牌的牌靴送牌，牌间隔 1-4 秒（虚拟时间，不真正等待），按比例插入
+无效代码、换靴卡、连续到达的多张牌和长时间停顿（触发单张牌超时和游戏超时重置）；
+本地数据库可按比例模拟连接断开
+
+用法:
+    python soak_harness.py                                   # 20万局，每5000局采样一次
+    python soak_harness.py --rounds 2000000 --sample-every 20000 --csv soak.csv
+    python soak_harness.py --trace --table-stats --console --db-drop-rate 0.0001
+"""
+
+import os
+import gc
+import sys
+import time
+import random
+import tempfile
+import argparse
+from collections import Counter
+
+from config import GAME_TIMEOUT, SHOE_CARD_CODE, CARD_MAPPING, CONSOLE_MAX_FPS
+from main import BaccaratSystem
+from serial_manager import SerialManager
+from metrics import SCAN_QUEUE_DEPTH
+from local_db import LocalDatabaseManager
+from deadline_scheduler import VirtualClock
+from latency_tracer import LatencyHistogram
+from console_renderer import ConsoleRenderer
+from round_snapshot import RoundSnapshot
+from log_setup import setup_logging
+
+# 采样中需要保持有界的长度（名称: 说明）
+BOUNDED_SIZES = {
+    'scheduler_heap': '调度器堆（含已取消条目）',
+    'console_pending': '控制台待输出',
+    'log_queue': '日志队列',
+    'scan_queue': '扫描队列',
+    'tracer_completed': '追踪已完成',
+    'temp_rows': '临时表行数',
+    'result_rows': '结果表行数',
+}
+
+
+class SimulatedScanner(SerialManager):
+    """
+    模拟扫描枪：真实的 SerialManager（解码器、扫描队列、事件日志、延迟追踪、指标），
+    只把 pyserial 读取线程换成按虚拟时钟送出的字节
+    """
+    
+    def __init__(self, clock, seed=1, interval=(1.0, 4.0), stall_rate=0.002, invalid_rate=0.001, decks=8,
+                 burst_rate=0.01):
+        """
+        初始化模拟扫描枪
+        
+        Args:
+            clock: 虚拟时钟（读取等待时推进）
+            seed: 随机种子
+            interval: 两张牌的间隔范围（秒）
+            stall_rate: 每张牌后停顿超过 GAME_TIMEOUT 的概率
+            invalid_rate: 送出无效代码的概率
+            decks: 牌靴副数（发完后送换靴卡并重新洗牌）
+            burst_rate: 一次读取中连续到达 2-4 张牌的概率（在扫描队列中排队）
+        """
+        super().__init__('SIM', 9600)
+        self.clock = clock
+        self.rng = random.Random(seed)
+        self.interval = interval
+        self.stall_rate = stall_rate
+        self.invalid_rate = invalid_rate
+        self.burst_rate = burst_rate
+        self.decks = decks
+        self.shoe = []
+        self.next_at = clock.now() + self.rng.uniform(*interval)
+        self.handed_ns = None              # 上一张牌交给系统的时刻
+        self.latency = LatencyHistogram()  # 每张牌的处理耗时（微秒）：交出后到系统再次读取
+        self.cards = 0
+        self.stalls = 0
+    
+    def connect(self):
+        self.is_connected = True
+        return True
+    
+    def start_reading(self):
+        # 不启动读取线程，字节在 read_card 中按虚拟时钟送入
+        self.connect()
+        self.running = True
+        return True
+    
+    def get_health(self):
+        return {'alive': self.running, 'connected': self.is_connected, 'heartbeat_age': 0.0, 'read_blocked': 0.0}
+    
+    def _next_code(self):
+        """下一个扫描代码"""
+        if not self.shoe:
+            self.shoe = list(CARD_MAPPING) * self.decks
+            self.rng.shuffle(self.shoe)
+            return SHOE_CARD_CODE
+        if self.rng.random() < self.invalid_rate:
+            return 'X99'
+        return self.shoe.pop()
+    
+    def _deliver(self):
+        """送出下一次读取的字节（一张或一串牌，随机切成两段，走解码器拼帧）"""
+        count = self.rng.randint(2, 4) if self.rng.random() < self.burst_rate else 1
+        data = b''.join((self._next_code() + '\r\n').encode('ascii') for _ in range(count))
+        cut = self.rng.randint(1, len(data))
+        arrival_ns = time.perf_counter_ns()
+        self.feed(data[:cut], arrival_ns)
+        self.feed(data[cut:], arrival_ns)
+        self.cards += count
+    
+    def read_card(self, timeout=30):
+        """
+        读取一张卡片：队列为空时，下一次扫描在超时内到达则把时钟推进到到达时刻并送出字节，
+        否则推进 timeout 后返回None
+        
+        Returns:
+            str: 卡片代码，或None（超时）
+        """
+        if self.handed_ns is not None:
+            self.latency.record((time.perf_counter_ns() - self.handed_ns) // 1000)
+            self.handed_ns = None
+        if not self.get_queue_size():
+            if self.next_at > self.clock.now() + timeout:
+                self.clock.sleep(timeout)
+                return super().read_card(timeout=0)
+            self.clock.set(self.next_at)
+            self.next_at += self.rng.uniform(*self.interval)
+            if self.rng.random() < self.stall_rate:
+                self.next_at += GAME_TIMEOUT + self.rng.uniform(1, 30)
+                self.stalls += 1
+            self._deliver()
+        code = super().read_card(timeout=0)
+        if code:
+            self.handed_ns = time.perf_counter_ns()
+        return code
+
+
+def read_rss():
+    """
+    当前进程的常驻内存
+    
+    Returns:
+        int: 字节数，无法读取时返回None
+    """
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+def count_objects():
+    """按类型统计 gc 跟踪的对象数（先做一次完整回收）"""
+    gc.collect()
+    return Counter(type(obj).__name__ for obj in gc.get_objects())
+
+
+def slope(xs, ys):
+    """最小二乘斜率"""
+    n = len(xs)
+    mean_x = sum(xs) / n
+    mean_y = sum(ys) / n
+    var = sum((x - mean_x) ** 2 for x in xs)
+    if not var:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in zip(xs, ys)) / var
+
+
+class SoakSampler:
+    """定期采样并判断增长趋势"""
+    
+    def __init__(self, system, scanner, listener=None):
+        self.system = system
+        self.scanner = scanner
+        self.listener = listener
+        self.samples = []      # [{指标: 值}]
+        self.type_counts = []  # 与 samples 对应的 Counter
+        self.started = time.perf_counter()
+    
+    def sample(self):
+        """采样一次"""
+        system, scanner = self.system, self.scanner
+        latency, scanner.latency = scanner.latency, LatencyHistogram()
+        types = count_objects()
+        rows = system.db_manager.row_counts()
+        tracer = system.tracer
+        row = {
+            'rounds': system.game_count,
+            'cards': scanner.cards,
+            'virtual_days': system.clock.now() / 86400,
+            'wall_seconds': time.perf_counter() - self.started,
+            'rss': read_rss() or 0,
+            'objects': sum(types.values()),
+            'scheduler': len(system.scheduler),
+            'scheduler_heap': len(system.scheduler.heap),
+            'console_pending': len(system.console.pending),
+            'log_queue': self.listener.queue.qsize() if self.listener else 0,
+            'scan_queue': scanner.get_queue_size(),
+            'scan_queue_high_water': scanner.data_queue.high_water,
+            'tracer_completed': len(tracer.completed) if tracer else 0,
+            'temp_rows': rows['tu_bjl_temp'],
+            'result_rows': rows['tu_bjl_result'],
+            'db_drops': system.db_manager.drops,
+            'p50_us': latency.percentile(50),
+            'p99_us': latency.percentile(99),
+            'max_us': latency.max_seen,
+        }
+        self.samples.append(row)
+        self.type_counts.append(types)
+        print(f"{row['rounds']:>9} 局 {row['virtual_days']:>7.1f}天 {row['wall_seconds']:>7.0f}秒  "
+              f"RSS {row['rss'] / 1048576:>7.1f}MB  对象 {row['objects']:>8}  调度堆 {row['scheduler_heap']:>4}  "
+              f"处理耗时 p50/p99/max {row['p50_us']}/{row['p99_us']}/{row['max_us']}µs", flush=True)
+        return row
+    
+    def check(self, warmup, max_rss_mb, max_objects, max_size, max_latency_ratio):
+        """
+        对预热之后的采样做线性回归，增长量按每百万局计算
+        
+        Args:
+            warmup: 跳过的前几次采样（导入、缓存填充等一次性增长）
+            max_rss_mb: 常驻内存增长上限（MB/百万局）
+            max_objects: 对象总数及单一类型对象数的增长上限（个/百万局）
+            max_size: BOUNDED_SIZES 中各长度的增长上限（/百万局）
+            max_latency_ratio: 后三分之一采样与前三分之一采样的 p99 均值之比上限
+        
+        Returns:
+            tuple: (报告行列表, 失败原因列表)
+        """
+        samples = self.samples[warmup:]
+        types = self.type_counts[warmup:]
+        if len(samples) < 3:
+            return [], [f"预热后的采样不足3次 ({len(samples)})，无法判断趋势"]
+        
+        lines, failures = [], []
+        xs = [row['rounds'] / 1e6 for row in samples]
+        third = max(1, len(samples) // 3)
+        
+        def growing(values, limit):
+            # 斜率超过上限，且后三分之一的均值高于前三分之一的最大值（排除有界的周期性波动）
+            growth = slope(xs, values)
+            return growth, growth > limit and sum(values[-third:]) / third > max(values[:third])
+        
+        def trend(name, values, limit, unit, scale=1):
+            growth, failed = growing([value / scale for value in values], limit)
+            lines.append(f"   {name:<20} {growth:>+12.1f} {unit}/百万局 (上限 {limit})")
+            if failed:
+                failures.append(f"{name} 增长 {growth:+.1f} {unit}/百万局，超过 {limit}")
+        
+        trend('常驻内存', [row['rss'] for row in samples], max_rss_mb, 'MB', 1048576)
+        trend('对象总数', [row['objects'] for row in samples], max_objects, '个')
+        for name, label in BOUNDED_SIZES.items():
+            trend(label, [row[name] for row in samples], max_size, '')
+        
+        # 增长最快的对象类型
+        growth_by_type = {name: growing([counts.get(name, 0) for counts in types], max_objects)
+                          for name in set(types[0]) | set(types[-1])}
+        for name, (growth, failed) in sorted(growth_by_type.items(), key=lambda item: -item[1][0])[:5]:
+            lines.append(f"   类型 {name:<15} {growth:>+12.1f} 个/百万局")
+            if failed:
+                failures.append(f"{name} 对象增长 {growth:+.1f} 个/百万局，超过 {max_objects}")
+        
+        early = sum(row['p99_us'] for row in samples[:third]) / third
+        late = sum(row['p99_us'] for row in samples[-third:]) / third
+        ratio = late / early if early else 1.0
+        lines.append(f"   处理耗时 p99          {early:.0f}µs → {late:.0f}µs (x{ratio:.2f}，上限 x{max_latency_ratio})")
+        if ratio > max_latency_ratio:
+            failures.append(f"处理耗时 p99 从 {early:.0f}µs 升到 {late:.0f}µs (x{ratio:.2f})")
+        return lines, failures
+    
+    def write_csv(self, path):
+        """采样写入 CSV"""
+        import csv
+        with open(path, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=list(self.samples[0]))
+            writer.writeheader()
+            writer.writerows(self.samples)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='浸泡测试：长时间运行的内存和延迟漂移')
+    parser.add_argument('--rounds', type=int, default=200000, help='运行局数')
+    parser.add_argument('--sample-every', type=int, default=5000, help='每多少局采样一次')
+    parser.add_argument('--warmup', type=int, default=2, help='不参与趋势判断的前几次采样')
+    parser.add_argument('--table', default='1', help='桌号')
+    parser.add_argument('--seed', type=int, default=1, help='随机种子')
+    parser.add_argument('--stall-rate', type=float, default=0.002, help='每张牌后停顿（触发游戏超时）的概率')
+    parser.add_argument('--invalid-rate', type=float, default=0.001, help='无效代码的概率')
+    parser.add_argument('--burst-rate', type=float, default=0.01, help='一次读取连续到达多张牌的概率')
+    parser.add_argument('--db-drop-rate', type=float, default=0.0, help='每条语句模拟数据库断开的概率')
+    parser.add_argument('--trace', action='store_true', help='启用分阶段延迟追踪')
+    parser.add_argument('--table-stats', action='store_true', help='启用按小时的桌台统计')
+    parser.add_argument('--journal', action='store_true', help='启用事件日志（写入临时目录）')
+    parser.add_argument('--console', action='store_true', help='启用控制台渲染（输出到空设备）')
+    parser.add_argument('--log-level', default='ERROR', help='日志级别')
+    parser.add_argument('--max-rss-mb', type=float, default=8, help='常驻内存增长上限 (MB/百万局)')
+    parser.add_argument('--max-objects', type=float, default=5000, help='对象数增长上限 (个/百万局)')
+    parser.add_argument('--max-size', type=float, default=100, help='队列/缓冲区/表行数增长上限 (/百万局)')
+    parser.add_argument('--max-latency-ratio', type=float, default=2.0, help='处理耗时 p99 后期/前期之比上限')
+    parser.add_argument('--csv', help='采样写入 CSV 文件')
+    args = parser.parse_args()
+    
+    listener = setup_logging(level=args.log_level, json_file=None)
+    workdir = tempfile.TemporaryDirectory(prefix='soak_')
+    
+    clock = VirtualClock()
+    scanner = SimulatedScanner(clock, args.seed, stall_rate=args.stall_rate, invalid_rate=args.invalid_rate,
+                               burst_rate=args.burst_rate)
+    system = BaccaratSystem(scanner.port, 9600, args.table, trace_latency=args.trace, headless=not args.console,
+                            journal_path=os.path.join(workdir.name, 'journal.bin') if args.journal else None,
+                            table_stats=args.table_stats, clock=clock)
+    system.serial_manager = scanner
+    scanner.tracer = system.tracer
+    SCAN_QUEUE_DEPTH.set_function(scanner.get_queue_size, table_id=args.table)
+    system.db_manager = LocalDatabaseManager(drop_rate=args.db_drop_rate, seed=args.seed)
+    if system.snapshot:
+        # 快照照常写入，但放在临时目录且不刷盘
+        system.snapshot = RoundSnapshot(workdir.name, args.table, fsync=False)
+    if args.console:
+        devnull = open(os.devnull, 'w', encoding='utf-8')
+        system.console = ConsoleRenderer(max_fps=CONSOLE_MAX_FPS, stream=devnull)
+    
+    sampler = SoakSampler(system, scanner, listener)
+    if not system.initialize():
+        return 1
+    try:
+        system.serial_manager.clear_queue()
+        system.resume_round()
+        print(f"\n浸泡测试: {args.rounds} 局，每 {args.sample_every} 局采样")
+        next_sample = 0
+        while system.game_count < args.rounds:
+            if system.game_count >= next_sample:
+                sampler.sample()
+                next_sample += args.sample_every
+            system.wait_for_round_start()
+            system.run_game()
+        sampler.sample()
+    except KeyboardInterrupt:
+        print("\n已中断，按已有采样判断")
+    finally:
+        system.cleanup()
+        listener.stop()
+        workdir.cleanup()
+    
+    if args.csv and sampler.samples:
+        sampler.write_csv(args.csv)
+    
+    lines, failures = sampler.check(args.warmup, args.max_rss_mb, args.max_objects, args.max_size,
+                                    args.max_latency_ratio)
+    queue_stats = scanner.get_queue_stats()
+    print(f"\n模拟扫描 {scanner.cards} 张，停顿 {scanner.stalls} 次，数据库断开 {system.db_manager.drops} 次")
+    print(f"扫描队列历史最大长度 {queue_stats['high_water']}，丢弃 {queue_stats['dropped']}")
+    print("增长趋势:")
+    for line in lines:
+        print(line)
+    if failures:
+        print("❌ 浸泡测试未通过:")
+        for reason in failures:
+            print(f"   {reason}")
+        return 1
+    print("✅ 浸泡测试通过")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
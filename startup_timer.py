@@ -0,0 +1,69 @@
+# startup_timer.py
+"""
+启动耗时统计
+记录启动各阶段（模块导入、串口、数据库等，可在不同线程中并行）的起止时间，启动完成后输出明细
+"""
+
+import time
+import threading
+import logging
+from contextlib import contextmanager
+
+from metrics import STARTUP_PHASE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+
+class StartupTimer:
+    """启动各阶段计时"""
+    
+    def __init__(self, origin=None):
+        """
+        Args:
+            origin: 计时起点 (time.perf_counter)，默认为创建时刻
+        """
+        self.origin = origin if origin is not None else time.perf_counter()
+        self.phases = []  # [(阶段, 开始, 结束, 线程)]，相对起点的秒数
+        self.lock = threading.Lock()
+    
+    def record(self, name, start, end):
+        """
+        记录一个阶段
+        
+        Args:
+            name: 阶段名称
+            start: 开始时刻 (time.perf_counter)
+            end: 结束时刻 (time.perf_counter)
+        """
+        with self.lock:
+            self.phases.append((name, start - self.origin, end - self.origin, threading.current_thread().name))
+        STARTUP_PHASE_SECONDS.set(end - start, phase=name)
+        logger.info(f"启动阶段 {name}: {(end - start) * 1000:.0f}ms")
+    
+    @contextmanager
+    def phase(self, name):
+        """计时一个阶段（with 语句）"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(name, start, time.perf_counter())
+    
+    def elapsed(self):
+        """从起点到现在的秒数"""
+        return time.perf_counter() - self.origin
+    
+    def report(self):
+        """
+        各阶段明细
+        
+        Returns:
+            list: 文本行，按开始时间排序
+        """
+        with self.lock:
+            phases = sorted(self.phases, key=lambda item: item[1])
+        lines = []
+        for name, start, end, thread in phases:
+            lines.append(f"   {name:<12} {start * 1000:>7.0f} → {end * 1000:>7.0f}ms  "
+                         f"({(end - start) * 1000:.0f}ms, {thread})")
+        return lines
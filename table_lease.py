@@ -0,0 +1,157 @@
+# table_lease.py
+"""
+桌台租约
+同一桌号可以有多台主机（或重启后的新进程）待命，只有持有租约的一方写库:
+    - 租约记录在数据库 tu_bjl_lease，有效期 LEASE_TTL 秒，持有者在游戏循环中每 LEASE_RENEW_INTERVAL 秒续约
+    - 每次易主 token 加1；每次写库都在同一事务中核对 token（DatabaseManager._fence），
+      被接管的旧主机（包括暂停后恢复的僵死进程）的写入一律被拒绝
+    - 正常退出时释放租约，备机在下一次尝试时立即接管；持有者故障时租约过期后接管，
+      也可以用 force 不等过期强制接管
+"""
+
+import os
+import time
+import socket
+import logging
+
+from config import LEASE_TTL, LEASE_RENEW_INTERVAL
+from metrics import LEASE_HELD, LEASE_ACQUISITIONS
+
+logger = logging.getLogger(__name__)
+
+
+def default_owner():
+    """默认持有者标识: 主机名:进程号"""
+    return f"{socket.gethostname()}:{os.getpid()}"
+
+
+class TableLease:
+    """一个桌号的租约（由游戏线程调用）"""
+    
+    def __init__(self, db_manager, table_id, owner=None, ttl=LEASE_TTL, renew_interval=LEASE_RENEW_INTERVAL,
+                 clock=time.time):
+        """
+        初始化租约
+        
+        Args:
+            db_manager: DatabaseManager（或 LocalDatabaseManager）
+            table_id: 桌号
+            owner: 持有者标识（None表示 主机名:进程号）
+            ttl: 有效期（秒）
+            renew_interval: 续约间隔（秒）
+            clock: 取当前时间的函数（各主机共用的墙上时间，测试可传入虚拟时钟）
+        """
+        self.db = db_manager
+        self.table_id = str(table_id)
+        self.owner = owner or default_owner()
+        self.ttl = ttl
+        self.renew_interval = renew_interval
+        self.clock = clock
+        self.token = None       # 持有的 fencing token，未持有时为None
+        self.expires = 0.0      # 本地记录的过期时间
+        self.next_renew = 0.0   # 下一次续约时间
+        self.holder = None      # 最近一次未能取得租约时的持有者 {'owner', 'token', 'expires', 'writes'}
+        LEASE_HELD.set_function(lambda: 1 if self.held else 0, table_id=self.table_id)
+    
+    @property
+    def held(self):
+        """是否持有租约（数据库不可用期间按本地记录的过期时间判断）"""
+        return self.token is not None and self.clock() < self.expires
+    
+    def acquire(self, force=False):
+        """
+        取得租约（已持有时续约）
+        
+        Args:
+            force: 不等过期，强制接管
+        
+        Returns:
+            bool: 是否持有租约
+        """
+        if self.token is not None and self.renew():
+            return True
+        now = self.clock()
+        token = self.db.acquire_lease(self.table_id, self.owner, now, self.ttl, force)
+        if token is None:
+            self.token = None
+            self.holder = self.db.get_lease(self.table_id)
+            return False
+        self.token = token
+        self.expires = now + self.ttl
+        self.next_renew = now + self.renew_interval
+        self.holder = None
+        LEASE_ACQUISITIONS.inc(table_id=self.table_id)
+        logger.info(f"已取得桌号 {self.table_id} 的租约 - 持有者: {self.owner}, token: {token}"
+                    f"{' (强制接管)' if force else ''}")
+        return True
+    
+    def renew(self):
+        """
+        续约
+        
+        Returns:
+            bool: 是否仍持有租约
+        """
+        if self.token is None:
+            return False
+        now = self.clock()
+        renewed = self.db.renew_lease(self.table_id, self.owner, self.token, now, self.ttl)
+        if renewed:
+            self.expires = now + self.ttl
+            self.next_renew = now + self.renew_interval
+            return True
+        if renewed is False:
+            self._lost("续约失败，租约已被接管")
+            return False
+        # 数据库暂时不可用：按本地记录的过期时间继续持有，1秒后重试
+        self.next_renew = now + min(1, self.renew_interval)
+        if not self.held:
+            logger.warning(f"桌号 {self.table_id} 的租约已过期（数据库不可用，无法续约）")
+        return self.held
+    
+    def poll(self):
+        """
+        到期时续约（游戏循环中调用）
+        
+        Returns:
+            bool: 是否持有租约
+        """
+        if self.token is not None and self.clock() >= self.next_renew:
+            self.renew()
+        return self.held
+    
+    def fenced(self):
+        """写库时发现 token 已变（由 DatabaseManager._fence 调用）"""
+        self._lost("写入被拒绝，租约已被接管")
+    
+    def release(self):
+        """
+        释放租约（正常退出时调用），备机可立即接管
+        
+        Returns:
+            bool: 是否释放成功
+        """
+        if self.token is None:
+            return False
+        released = self.db.release_lease(self.table_id, self.owner, self.token)
+        if released:
+            logger.info(f"已释放桌号 {self.table_id} 的租约 (token {self.token})")
+        self.token = None
+        return released
+    
+    def _lost(self, reason):
+        """失去租约"""
+        logger.error(f"桌号 {self.table_id} 失去租约 (token {self.token}): {reason}")
+        self.token = None
+    
+    def describe_holder(self):
+        """
+        当前持有者的说明（用于提示）
+        
+        Returns:
+            str: 如 "host-a:1234 (token 3, 剩余 12秒)"
+        """
+        if not self.holder:
+            return '未知'
+        remaining = max(0, self.holder['expires'] - self.clock())
+        return f"{self.holder['owner']} (token {self.holder['token']}, 剩余 {remaining:.0f}秒)"
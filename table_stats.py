@@ -0,0 +1,155 @@
+# table_stats.py
+"""
+按桌号、小时的汇总统计
+每局结束时在内存中累加（局数、庄/闲/和、天牌、对子、牌数），定期一次性写入统计表
+tu_bjl_stats_hourly（同一桌号同一小时在原值上累加），管理报表直接按小时读取，不再扫描结果表
+
+用法（报表）:
+    python table_stats.py --table 1 --hours 24
+"""
+
+import sys
+import time
+import argparse
+import logging
+from datetime import datetime, timedelta
+
+from card_codec import decode_game_result, evaluate, WINNER_PLAYER, WINNER_BANKER
+from database_manager import DatabaseManager, STATS_FIELDS
+
+logger = logging.getLogger(__name__)
+
+
+def hour_of(timestamp):
+    """时间戳所在的整点（本地时间）"""
+    return datetime.fromtimestamp(timestamp).replace(minute=0, second=0, microsecond=0)
+
+
+class TableStats:
+    """按 (桌号, 小时) 累加的统计，定期写入数据库"""
+    
+    def __init__(self, flush_interval=60):
+        """
+        初始化统计
+        
+        Args:
+            flush_interval: 写入数据库的间隔（秒）
+        """
+        self.flush_interval = flush_interval
+        self.pending = {}  # {(桌号, 小时): {字段: 增量}}
+        self.last_flush = time.monotonic()
+    
+    def record_round(self, table_id, result_data, timestamp=None):
+        """
+        累加一局
+        
+        Args:
+            table_id: 桌号
+            result_data: 游戏结果字典 (包含 PLAYER1, PLAYER2, PLAYER3, BANKER1, BANKER2, BANKER3)
+            timestamp: 结束时间（默认当前时间）
+        """
+        cards = decode_game_result(result_data)
+        summary = evaluate(cards)
+        if summary is None:
+            logger.warning("结果含无法识别的牌，不计入统计 - Table: %s, 结果: %s", table_id, result_data)
+            return
+        _, _, winner, natural, player_pair, banker_pair = summary
+        key = (str(table_id), hour_of(timestamp if timestamp is not None else time.time()))
+        counts = self.pending.setdefault(key, dict.fromkeys(STATS_FIELDS, 0))
+        counts['rounds'] += 1
+        if winner == WINNER_PLAYER:
+            counts['player_wins'] += 1
+        elif winner == WINNER_BANKER:
+            counts['banker_wins'] += 1
+        else:
+            counts['ties'] += 1
+        counts['naturals'] += natural
+        counts['player_pairs'] += player_pair
+        counts['banker_pairs'] += banker_pair
+        counts['cards'] += sum(1 for index in cards if index >= 0)
+    
+    def due(self):
+        """是否到了写入时间"""
+        return bool(self.pending) and time.monotonic() - self.last_flush >= self.flush_interval
+    
+    def flush(self, db):
+        """
+        写入数据库，失败时保留增量，下次一起写入
+        
+        Args:
+            db: 已连接的 DatabaseManager
+        
+        Returns:
+            bool: 是否成功
+        """
+        self.last_flush = time.monotonic()
+        if not self.pending:
+            return True
+        rows = [(table_id, hour, counts) for (table_id, hour), counts in self.pending.items()]
+        if not db.upsert_table_stats(rows):
+            logger.warning(f"统计写入失败，{len(rows)}条保留到下次写入")
+            return False
+        self.pending = {}
+        logger.info(f"统计已写入: {len(rows)}条")
+        return True
+
+
+def summarize(row):
+    """
+    一行统计转换为报表指标
+    
+    Returns:
+        dict: rounds, banker/player/tie 比例, natural_rate, avg_cards
+    """
+    rounds = row['rounds'] or 0
+    ratio = (lambda value: value / rounds) if rounds else (lambda value: 0.0)
+    return {
+        'rounds': rounds,
+        'banker': ratio(row['banker_wins']),
+        'player': ratio(row['player_wins']),
+        'tie': ratio(row['ties']),
+        'natural_rate': ratio(row['naturals']),
+        'avg_cards': ratio(row['cards']),
+    }
+
+
+def main():
+    """命令行报表"""
+    parser = argparse.ArgumentParser(description='按小时的桌台统计报表')
+    parser.add_argument('--table', help='只显示指定桌号')
+    parser.add_argument('--hours', type=int, default=24, help='显示最近多少小时')
+    args = parser.parse_args()
+    
+    logging.basicConfig(level=logging.WARNING, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    
+    db = DatabaseManager()
+    if not db.connect():
+        print("❌ 数据库连接失败!")
+        return 1
+    try:
+        since = hour_of(time.time()) - timedelta(hours=args.hours - 1)
+        rows = db.get_table_stats(args.table, since)
+    finally:
+        db.disconnect()
+    if rows is None:
+        return 1
+    
+    print(f"{'桌号':<6}{'小时':<18}{'局数':>6}{'庄':>8}{'闲':>8}{'和':>8}{'天牌率':>8}{'平均牌数':>8}")
+    totals = {}
+    for row in rows:
+        stats = summarize(row)
+        print(f"{row['table_id']:<8}{row['hour']:%Y-%m-%d %H:00}  {stats['rounds']:>6}{stats['banker']:>9.1%}"
+              f"{stats['player']:>9.1%}{stats['tie']:>9.1%}{stats['natural_rate']:>9.1%}{stats['avg_cards']:>10.2f}")
+        total = totals.setdefault(row['table_id'], dict.fromkeys(STATS_FIELDS, 0))
+        for field in STATS_FIELDS:
+            total[field] += row[field]
+    for table_id, total in totals.items():
+        stats = summarize(total)
+        print(f"桌号 {table_id} 合计: {stats['rounds']}局 ({stats['rounds'] / args.hours:.1f} 局/小时)，"
+              f"庄 {stats['banker']:.1%} 闲 {stats['player']:.1%} 和 {stats['tie']:.1%}，"
+              f"天牌率 {stats['natural_rate']:.1%}，平均 {stats['avg_cards']:.2f} 张/局")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,7 @@
+# tests/conftest.py
+"""测试从仓库根目录导入模块（各模块为平铺的顶层模块）"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
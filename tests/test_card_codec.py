@@ -0,0 +1,50 @@
+# tests/test_card_codec.py
+"""
+牌面编解码测试
+空位与无法识别的牌要区分开: 空位按无牌计算，含无法识别的牌时汇总列为 NULL
+"""
+
+import unittest
+
+from card_codec import (
+    code_to_index, db_card_to_index, decode_game_result, evaluate, packed_columns,
+    EMPTY, INVALID, INDEX_BY_CODE
+)
+
+
+class CardCodecTest(unittest.TestCase):
+    
+    def test_code_to_index(self):
+        """已知代码返回牌序号，空返回 EMPTY，无法识别返回 INVALID"""
+        self.assertEqual(code_to_index('D12'), INDEX_BY_CODE['D12'])
+        self.assertEqual(code_to_index(' d12 '), INDEX_BY_CODE['D12'])
+        self.assertEqual(code_to_index(''), EMPTY)
+        self.assertEqual(code_to_index('  '), EMPTY)
+        self.assertEqual(code_to_index(None), EMPTY)
+        self.assertEqual(code_to_index('X99'), INVALID)
+    
+    def test_matches_db_card_to_index(self):
+        """无法识别的卡片代码与无法识别的数据库格式同样返回 INVALID"""
+        self.assertEqual(code_to_index('X99'), db_card_to_index('99|x'))
+    
+    def test_unknown_card_gets_null_summary(self):
+        """实时写入路径: 游戏结果含无法识别的牌时不计算胜负，汇总列为 NULL"""
+        result_data = {'PLAYER1': 'D12', 'PLAYER2': 'X99', 'PLAYER3': '',
+                       'BANKER1': 'H01', 'BANKER2': 'C05', 'BANKER3': ''}
+        cards = decode_game_result(result_data)
+        self.assertEqual(cards[1], INVALID)
+        self.assertEqual(cards[2], EMPTY)
+        self.assertIsNone(evaluate(cards))
+        self.assertEqual(packed_columns(cards)[1:], (None,) * 6)
+    
+    def test_empty_slots_still_evaluated(self):
+        """只有空位（没有补牌）时照常计算"""
+        result_data = {'PLAYER1': 'D12', 'PLAYER2': 'H01', 'PLAYER3': '',
+                       'BANKER1': 'C05', 'BANKER2': 'C03', 'BANKER3': ''}
+        summary = evaluate(decode_game_result(result_data))
+        self.assertIsNotNone(summary)
+        self.assertEqual(summary[:2], (1, 8))
+
+
+if __name__ == '__main__':
+    unittest.main()
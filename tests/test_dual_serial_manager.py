@@ -0,0 +1,84 @@
+# tests/test_dual_serial_manager.py
+"""
+双扫描枪热备测试
+两把扫描枪都用伪终端 (scanner_simulator.PtyScanner) 模拟，走真实的 pyserial 读取线程:
+去重窗口内两路报告的同一张牌只交付一次、主用设备静默时切换、主用设备断开时切换
+"""
+
+import sys
+import time
+import unittest
+
+try:
+    import serial  # noqa: F401
+except ImportError:
+    serial = None
+
+from dual_serial_manager import DualSerialManager
+from scanner_simulator import PtyScanner
+
+DEDUP_WINDOW = 0.3
+
+
+def wait_until(condition, timeout=5.0):
+    """等待条件成立，超时返回False"""
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if condition():
+            return True
+        time.sleep(0.02)
+    return condition()
+
+
+@unittest.skipIf(serial is None or sys.platform == 'win32', "需要 pyserial 和伪终端 (Linux/macOS)")
+class DualSerialManagerTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.primary = PtyScanner()
+        self.backup = PtyScanner()
+        self.manager = DualSerialManager(self.primary.port, self.backup.port, 9600,
+                                         dedup_window=DEDUP_WINDOW, silence_threshold=2)
+        self.assertTrue(self.manager.start_reading())
+    
+    def tearDown(self):
+        self.manager.disconnect()
+        self.primary.close()
+        self.backup.close()
+    
+    def test_dedup_within_window(self):
+        """两路都扫到同一张牌时只交付一次，主用设备不变"""
+        self.primary.scan('D12')
+        self.backup.scan('D12')
+        self.assertEqual(self.manager.read_card(timeout=2), 'D12')
+        self.assertIsNone(self.manager.read_card(timeout=DEDUP_WINDOW * 2))
+        self.assertEqual(self.manager.active_port, self.primary.port)
+        
+        # 窗口外再扫到同一张牌（下一局的同一牌面）照常交付
+        self.primary.scan('D12')
+        self.assertEqual(self.manager.read_card(timeout=2), 'D12')
+    
+    def test_failover_on_primary_silence(self):
+        """连续 silence_threshold 张牌只有备用设备扫到时切换到备用设备，且不丢牌"""
+        self.primary.muted = True
+        for code in ('H01', 'C05'):
+            self.primary.scan(code)
+            self.backup.scan(code)
+            self.assertEqual(self.manager.read_card(timeout=2), code)
+            time.sleep(DEDUP_WINDOW * 1.5)
+        # 去重窗口过期后在下一次读取时统计漏扫
+        self.assertIsNone(self.manager.read_card(timeout=0.1))
+        self.assertEqual(self.manager.active_port, self.backup.port)
+    
+    def test_failover_on_primary_disconnect(self):
+        """主用设备拔出后立即切换，备用设备扫到的牌照常交付"""
+        self.primary.close()
+        self.assertTrue(wait_until(lambda: not self.manager.managers[0].is_running()))
+        self.assertTrue(self.manager.is_running())
+        
+        self.backup.scan('A13')
+        self.assertEqual(self.manager.read_card(timeout=2), 'A13')
+        self.assertEqual(self.manager.active_port, self.backup.port)
+
+
+if __name__ == '__main__':
+    unittest.main()
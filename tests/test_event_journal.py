@@ -0,0 +1,61 @@
+# tests/test_event_journal.py
+"""
+事件日志测试
+按靴定位的范围从换靴记录开始，包括第一局开局前的原始扫描，到下一靴的换靴记录为止
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from event_journal import EventJournal, JournalReader, RAW_SCAN
+
+
+class EventJournalTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        self.path = os.path.join(self.workdir, 'journal.bin')
+        journal = EventJournal(self.path, '8')
+        self.assertTrue(journal.open())
+        for _ in range(2):
+            journal.new_shoe()
+            # 换靴后、开局前扫到的牌
+            journal.append(RAW_SCAN, 'X99')
+            for _ in range(2):
+                journal.begin_round()
+                journal.append(RAW_SCAN, 'D12')
+                journal.end_round('PLAYER')
+        journal.close()
+        self.reader = JournalReader(self.path)
+    
+    def tearDown(self):
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def records(self, found):
+        return list(self.reader.iter_records(*found))
+    
+    def test_find_shoe_starts_at_shoe_start(self):
+        """第一靴: 从文件开头的换靴记录开始，到第二靴的换靴记录之前结束"""
+        records = self.records(self.reader.find_shoe(1))
+        self.assertEqual(records[0]['type'], 'shoe_start')
+        self.assertEqual(records[0]['index'], 0)
+        self.assertEqual(records[1]['payload'], 'X99')
+        self.assertTrue(all(record['shoe_no'] == 1 for record in records))
+        self.assertEqual(records[-1]['type'], 'round_end')
+    
+    def test_find_later_shoe(self):
+        """后续的靴: 包括换靴记录和开局前的扫描，不含上一靴的记录"""
+        records = self.records(self.reader.find_shoe(2))
+        self.assertEqual([record['type'] for record in records[:3]], ['shoe_start', 'raw_scan', 'round_start'])
+        self.assertTrue(all(record['shoe_no'] == 2 for record in records))
+        self.assertEqual(sum(record['type'] == 'round_start' for record in records), 2)
+        self.assertEqual(records[-1]['index'], self.reader.count - 1)
+    
+    def test_find_missing_shoe(self):
+        self.assertIsNone(self.reader.find_shoe(3))
+
+
+if __name__ == '__main__':
+    unittest.main()
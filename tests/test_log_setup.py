@@ -0,0 +1,75 @@
+# tests/test_log_setup.py
+"""
+日志队列测试
+队列满时停止监听器不抛异常且剩余日志全部输出；可变参数按记录时的状态输出
+"""
+
+import queue
+import logging
+import threading
+import unittest
+
+from log_setup import NonBlockingQueueHandler, FlushingQueueListener
+
+
+class CollectingHandler(logging.Handler):
+    """收集输出的消息；gate 未打开前阻塞，模拟输出跟不上"""
+    
+    def __init__(self):
+        super().__init__()
+        self.messages = []
+        self.gate = threading.Event()
+    
+    def emit(self, record):
+        self.gate.wait()
+        self.messages.append(record.getMessage())
+
+
+class LogQueueTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.queue = queue.Queue(maxsize=4)
+        self.output = CollectingHandler()
+        self.listener = FlushingQueueListener(self.queue, self.output, stop_timeout=5)
+        self.logger = logging.Logger('test_log_setup')
+        self.logger.addHandler(NonBlockingQueueHandler(self.queue))
+    
+    def test_stop_with_full_queue_flushes(self):
+        """队列满时 stop() 等待监听线程腾出空位，不抛 queue.Full，已入队的日志全部输出"""
+        self.listener.start()
+        for i in range(20):
+            self.logger.warning("记录 %s", i)
+        self.assertTrue(self.queue.full())
+        queued = self.queue.qsize()
+        
+        threading.Timer(0.2, self.output.gate.set).start()
+        self.listener.stop()
+        # 监听线程正在处理的一条加上队列中的记录
+        self.assertGreaterEqual(len(self.output.messages), queued)
+        first = int(self.output.messages[0].split()[1])
+        self.assertEqual(self.output.messages, ["记录 %s" % i for i in range(first, first + len(self.output.messages))])
+    
+    def test_mutable_args_rendered_at_log_time(self):
+        """dict/list 参数在记录时渲染，之后的修改不影响输出"""
+        state = {'round': 1}
+        cards = ['D12']
+        self.logger.info("状态: %s 牌: %s", state, cards)
+        state['round'] = 2
+        cards.append('H01')
+        self.logger.info("局号: %s", 3)
+        
+        self.output.gate.set()
+        self.listener.start()
+        self.listener.stop()
+        self.assertEqual(self.output.messages, ["状态: {'round': 1} 牌: ['D12']", "局号: 3"])
+    
+    def test_stop_twice(self):
+        """重复调用 stop() 不报错"""
+        self.output.gate.set()
+        self.listener.start()
+        self.listener.stop()
+        self.listener.stop()
+
+
+if __name__ == '__main__':
+    unittest.main()
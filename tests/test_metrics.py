@@ -0,0 +1,38 @@
+# tests/test_metrics.py
+"""
+指标导出测试
+标签值中的反斜杠、双引号和换行按 Prometheus 文本格式转义，整份输出仍可逐行解析
+"""
+
+import re
+import unittest
+
+from metrics import MetricsRegistry
+
+# 一行样本: 名称{标签="值",...} 数值；标签值只允许转义后的字符
+SAMPLE_LINE = re.compile(r'^[a-zA-Z_:][a-zA-Z0-9_:]*(\{([a-zA-Z_]\w*="(\\.|[^"\\\n])*",?)*\})? \S+$')
+
+
+class MetricsFormatTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.registry = MetricsRegistry()
+        self.counter = self.registry.counter('test_events_total', '测试计数', ('port', 'reason'))
+    
+    def test_label_values_escaped(self):
+        """特殊字符转义为 \\\\、\\" 和 \\n"""
+        self.counter.inc(port='C:\\COM3', reason='bad "frame"\nretry')
+        text = self.registry.render()
+        self.assertIn('test_events_total{port="C:\\\\COM3",reason="bad \\"frame\\"\\nretry"} 1', text)
+    
+    def test_output_parses_line_by_line(self):
+        """含特殊字符的标签值不会破坏其他行"""
+        self.counter.inc(port='/dev/ttyUSB0', reason='overflow')
+        self.counter.inc(port='a"b', reason='x\\y\nz')
+        for line in self.registry.render().splitlines():
+            if line and not line.startswith('#'):
+                self.assertRegex(line, SAMPLE_LINE)
+
+
+if __name__ == '__main__':
+    unittest.main()
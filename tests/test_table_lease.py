@@ -0,0 +1,122 @@
+# tests/test_table_lease.py
+"""
+桌台租约测试
+两台主机各用一个 LocalDatabaseManager 连接同一个 sqlite 文件，时间由虚拟时钟推进:
+互斥取得、过期后接管、被接管的旧主机写入被 fencing 拒绝、释放后立即接管
+"""
+
+import os
+import shutil
+import tempfile
+import unittest
+
+from local_db import LocalDatabaseManager
+from database_manager import FencingError
+from table_lease import TableLease
+
+TABLE_ID = '8'
+TTL = 15
+RENEW_INTERVAL = 5
+
+
+class VirtualClock:
+    """两台主机共用的墙上时间"""
+    
+    def __init__(self, now=1000.0):
+        self.now = now
+    
+    def __call__(self):
+        return self.now
+    
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class TableLeaseTest(unittest.TestCase):
+    
+    def setUp(self):
+        self.workdir = tempfile.mkdtemp()
+        path = os.path.join(self.workdir, 'lease.db')
+        self.clock = VirtualClock()
+        self.hosts = []
+        for owner in ('host-a:1', 'host-b:2'):
+            db = LocalDatabaseManager(path)
+            self.assertTrue(db.connect())
+            self.assertTrue(db.ensure_lease_table())
+            lease = TableLease(db, TABLE_ID, owner, ttl=TTL, renew_interval=RENEW_INTERVAL, clock=self.clock)
+            db.lease = lease
+            self.hosts.append((db, lease))
+        (self.db_a, self.lease_a), (self.db_b, self.lease_b) = self.hosts
+    
+    def tearDown(self):
+        for db, lease in self.hosts:
+            db.store.close()
+        shutil.rmtree(self.workdir, ignore_errors=True)
+    
+    def test_acquire_is_exclusive(self):
+        """先到者取得租约，另一台待命并能看到持有者"""
+        self.assertTrue(self.lease_a.acquire())
+        self.assertFalse(self.lease_b.acquire())
+        self.assertTrue(self.lease_a.held)
+        self.assertFalse(self.lease_b.held)
+        self.assertEqual(self.lease_b.holder['owner'], 'host-a:1')
+        self.assertEqual(self.lease_b.holder['token'], self.lease_a.token)
+    
+    def test_renew_keeps_lease_past_ttl(self):
+        """按时续约的持有者超过 TTL 仍持有，备机无法接管"""
+        self.assertTrue(self.lease_a.acquire())
+        token = self.lease_a.token
+        for _ in range(4):
+            self.clock.advance(RENEW_INTERVAL)
+            self.assertTrue(self.lease_a.poll())
+        self.assertFalse(self.lease_b.acquire())
+        self.assertEqual(self.lease_a.token, token)
+    
+    def test_takeover_after_expiry(self):
+        """持有者停止续约，过期后备机接管且 token 递增"""
+        self.assertTrue(self.lease_a.acquire())
+        token = self.lease_a.token
+        self.clock.advance(TTL - 1)
+        self.assertFalse(self.lease_b.acquire())
+        self.clock.advance(2)
+        self.assertFalse(self.lease_a.held)
+        self.assertTrue(self.lease_b.acquire())
+        self.assertGreater(self.lease_b.token, token)
+    
+    def test_stale_writer_is_fenced(self):
+        """被接管的旧主机写库被拒绝并失去租约，新持有者照常写入"""
+        self.assertTrue(self.lease_a.acquire())
+        self.assertTrue(self.db_a.insert_temp_card(TABLE_ID, 1, 'D12'))
+        
+        # A 暂停超过 TTL，B 接管；A 恢复后仍以为自己持有租约
+        self.clock.advance(TTL + 1)
+        self.assertTrue(self.lease_b.acquire())
+        self.lease_a.expires = self.clock() + TTL
+        self.assertTrue(self.lease_a.held)
+        
+        with self.assertRaises(FencingError):
+            self.db_a._fence(TABLE_ID, 'test')
+        self.assertIsNone(self.lease_a.token)
+        self.assertFalse(self.db_a.insert_temp_card(TABLE_ID, 2, 'H01'))
+        self.assertTrue(self.db_b.insert_temp_card(TABLE_ID, 2, 'H01'))
+    
+    def test_stale_renew_loses_lease(self):
+        """被接管的旧主机续约失败即失去租约"""
+        self.assertTrue(self.lease_a.acquire())
+        self.clock.advance(TTL + 1)
+        self.assertTrue(self.lease_b.acquire())
+        self.assertFalse(self.lease_a.renew())
+        self.assertIsNone(self.lease_a.token)
+    
+    def test_release_allows_immediate_takeover(self):
+        """释放后备机不等过期立即接管"""
+        self.assertTrue(self.lease_a.acquire())
+        self.assertFalse(self.lease_b.acquire())
+        self.assertTrue(self.lease_a.release())
+        self.assertFalse(self.lease_a.held)
+        self.assertTrue(self.lease_b.acquire())
+        self.assertTrue(self.lease_b.held)
+
+
+if __name__ == '__main__':
+    unittest.main()